@@ -0,0 +1,111 @@
+import asyncio
+import glob
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+BACKUP_PREFIX = "bot_backup_"
+
+# One backup at a time: a slow copy must not have the next job start a second one
+_backup_lock = asyncio.Lock()
+
+def _copy_database(db_path: str, target_path: str):
+    """Online copy with VACUUM INTO.
+
+    The whole copy reads from one snapshot (a single WAL read transaction),
+    so writers keep going and, unlike a stepped backup, their commits never
+    restart it.
+    """
+    source = sqlite3.connect(db_path)
+    try:
+        source.execute('VACUUM INTO ?', (target_path,))
+    finally:
+        source.close()
+    target = sqlite3.connect(target_path)
+    try:
+        result = target.execute('PRAGMA quick_check').fetchone()[0]
+        if result != 'ok':
+            raise sqlite3.DatabaseError(f"backup failed integrity check: {result}")
+    finally:
+        target.close()
+
+def _compress(path: str, target_path: str):
+    with open(path, 'rb') as raw, gzip.open(target_path, 'wb', compresslevel=6) as compressed:
+        shutil.copyfileobj(raw, compressed, 1024 * 1024)
+
+def _rotate(backup_dir: str, keep: int) -> int:
+    backups = sorted(glob.glob(os.path.join(backup_dir, f"{BACKUP_PREFIX}*.db.gz")))
+    expired = backups[:-keep] if keep > 0 else []
+    for path in expired:
+        os.remove(path)
+    return len(expired)
+
+def create_backup(db_path: str, backup_dir: str, keep: int = 7) -> Dict[str, Any]:
+    """Write a compressed snapshot of the database and drop the oldest ones beyond ``keep``"""
+    os.makedirs(backup_dir, exist_ok=True)
+    started = time.perf_counter()
+    name = f"{BACKUP_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
+    raw_path = os.path.join(backup_dir, name + '.tmp')
+    final_path = os.path.join(backup_dir, name + '.gz')
+
+    try:
+        _copy_database(db_path, raw_path)
+        database_size = os.path.getsize(raw_path)
+        _compress(raw_path, final_path + '.tmp')
+        os.replace(final_path + '.tmp', final_path)
+    finally:
+        for leftover in (raw_path, final_path + '.tmp'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    return {
+        'path': final_path,
+        'created_at': datetime.now().isoformat(),
+        'database_bytes': database_size,
+        'size_bytes': os.path.getsize(final_path),
+        'duration_seconds': round(time.perf_counter() - started, 3),
+        'rotated': _rotate(backup_dir, keep)
+    }
+
+async def run_backup(db_path: str, backup_dir: str, keep: int = 7) -> Dict[str, Any]:
+    """Run create_backup in a worker thread so message handling keeps going"""
+    return await asyncio.to_thread(create_backup, db_path, backup_dir, keep)
+
+async def backup_job(context):
+    """Back up the database when ``backup_interval_hours`` has passed since the last backup"""
+    db = context.bot_data['db']
+    interval_hours = await db.get_global_setting('backup_interval_hours', 24)
+    if not interval_hours or float(interval_hours) <= 0:
+        return
+
+    last_backup = await db.get_global_setting('last_backup')
+    if last_backup:
+        since_last = datetime.now() - datetime.fromisoformat(last_backup['created_at'])
+        if since_last < timedelta(hours=float(interval_hours)):
+            return
+
+    if _backup_lock.locked():
+        logger.warning("⚠️ Previous database backup is still running, skipping this one")
+        return
+
+    async with _backup_lock:
+        try:
+            backup = await run_backup(db.db_path, Config.BACKUP_DIR, Config.BACKUP_KEEP)
+        except (OSError, sqlite3.Error) as e:
+            logger.error(f"❌ Database backup failed: {e}")
+            return
+
+    await db.set_global_setting('last_backup', backup, "Most recent database backup")
+    logger.info(
+        f"💾 Database backup written to {backup['path']} "
+        f"({backup['size_bytes'] / 1024 / 1024:.1f} MB compressed from "
+        f"{backup['database_bytes'] / 1024 / 1024:.1f} MB in {backup['duration_seconds']:.1f}s)"
+    )
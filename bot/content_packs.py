@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+import random
+from array import array
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('truths', 'dares', 'words')
+ANY_DIFFICULTY = 'any'
+# Relative content directories are looked up here, not in the working directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class ContentPack:
+    """One list of prompts (or word/hint pairs) stored as flat tuples"""
+    
+    __slots__ = ('items', 'hints')
+    
+    def __init__(self, items: Tuple[str, ...], hints: Optional[Tuple[str, ...]] = None):
+        self.items = items
+        self.hints = hints
+    
+    def __len__(self):
+        return len(self.items)
+
+class ShuffleBag:
+    """Random permutation of ``range(size)``, drawn one index at a time.
+    
+    Each draw is one Fisher-Yates step, so every index comes up exactly once
+    per round in uniformly random order, and each round is shuffled anew.
+    The state is a compact array of ``size`` ints per chat and pack.
+    """
+    
+    __slots__ = ('order', 'drawn')
+    
+    def __init__(self, size: int):
+        self.order = array('I', range(size))
+        self.drawn = 0
+    
+    def next(self) -> int:
+        if self.drawn >= len(self.order):
+            self.drawn = 0
+        pick = random.randrange(self.drawn, len(self.order))
+        order = self.order
+        order[self.drawn], order[pick] = order[pick], order[self.drawn]
+        self.drawn += 1
+        return order[self.drawn - 1]
+
+class ContentLibrary:
+    """Truth/dare prompts and word game words per language and difficulty.
+    
+    Packs are read once from ``<directory>/<language>.json``; handlers draw
+    from per-chat shuffle bags, so nothing repeats in a chat until the pack
+    has been used up.
+    """
+    
+    def __init__(self, default_language: str = 'en', max_bags: int = 50000):
+        self.default_language = default_language
+        self.max_bags = max_bags
+        self.packs: Dict[Tuple[str, str, str], ContentPack] = {}
+        self._bags: Dict[Tuple[int, str, str, str], ShuffleBag] = {}
+    
+    def load(self, directory: str) -> int:
+        """Load every pack file in ``directory`` (relative to the project root);
+        returns the number of items loaded"""
+        if not os.path.isabs(directory):
+            directory = os.path.join(PROJECT_ROOT, directory)
+        if not os.path.isdir(directory):
+            logger.warning(f"⚠️ Content directory {directory} not found, games have no prompts")
+            return 0
+        total = 0
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith('.json'):
+                continue
+            language = filename[:-5]
+            with open(os.path.join(directory, filename), encoding='utf-8') as f:
+                data = json.load(f)
+            for kind in KINDS:
+                everything = []
+                for difficulty, entries in data.get(kind, {}).items():
+                    if not entries:
+                        continue
+                    self._add_pack(kind, language, difficulty, entries)
+                    everything.extend(entries)
+                if everything:
+                    self._add_pack(kind, language, ANY_DIFFICULTY, everything)
+                    total += len(everything)
+        self._bags.clear()
+        logger.info(f"📚 Loaded {total} game prompts from {directory}")
+        return total
+    
+    def _add_pack(self, kind: str, language: str, difficulty: str, entries: list):
+        if kind == 'words':
+            pack = ContentPack(tuple(e[0].lower() for e in entries), tuple(e[1] for e in entries))
+        else:
+            pack = ContentPack(tuple(entries))
+        self.packs[(kind, language, difficulty)] = pack
+    
+    def difficulties(self, kind: str, language: Optional[str] = None) -> list:
+        language = language or self.default_language
+        return sorted(d for k, l, d in self.packs if k == kind and l == language and d != ANY_DIFFICULTY)
+    
+    def _resolve(self, kind: str, language: Optional[str], difficulty: Optional[str]):
+        for lang in (language, self.default_language):
+            key = (kind, lang, difficulty or ANY_DIFFICULTY)
+            if key in self.packs:
+                return key
+            if difficulty and (kind, lang, ANY_DIFFICULTY) in self.packs:
+                return (kind, lang, ANY_DIFFICULTY)
+        return None
+    
+    def draw(self, chat_id: int, kind: str, language: Optional[str] = None,
+             difficulty: Optional[str] = None) -> Optional[Tuple[str, Optional[str]]]:
+        """Next (item, hint) for a chat, or None if no pack matches"""
+        key = self._resolve(kind, language, difficulty)
+        if key is None:
+            return None
+        pack = self.packs[key]
+        bag = self._bags.get((chat_id,) + key)
+        if bag is None:
+            if len(self._bags) >= self.max_bags:
+                del self._bags[next(iter(self._bags))]
+            bag = self._bags[(chat_id,) + key] = ShuffleBag(len(pack))
+        index = bag.next()
+        return pack.items[index], pack.hints[index] if pack.hints else None
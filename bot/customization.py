@@ -1,14 +1,13 @@
 from typing import Dict, Any, Optional, List
-from bot.database import BotDatabase
+from bot.storage import Storage
 
 class CustomizationSystem:
-    def __init__(self, database: BotDatabase):
+    def __init__(self, database: Storage):
         self.db = database
     
     async def get_feature_status(self, chat_id: int, feature: str) -> bool:
         """Check if feature is enabled"""
-        chat_settings = await self.db.get_chat_settings(chat_id)
-        return chat_settings['enabled_features'].get(feature, True)
+        return await self.db.is_feature_enabled(chat_id, feature)
     
     async def toggle_feature(self, chat_id: int, feature: str, enabled: bool):
         """Toggle feature on/off"""
@@ -1,15 +1,67 @@
+import asyncio
 import json
+import logging
 import aiosqlite
-from typing import Dict, List, Any, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Iterable, List, Any, Optional
+from bot.query_profiler import QueryProfiler, ProfiledConnection
+from bot.storage import (
+    Storage, QuotaExceeded, QUOTA_MEDIA, QUOTA_COMMANDS, XP_WINDOW_RETENTION, GAME_END_STATUSES,
+    window_periods, merge_media_tags, collapse_media_items,
+    ChatSettingsRecord, DEFAULT_CHAT_RECORD, DEFAULT_USER_RANK, default_user_settings, default_user_rank
+)
 
-class BotDatabase:
-    def __init__(self, db_path: str = "bot_database.db"):
+logger = logging.getLogger(__name__)
+
+class BotDatabase(Storage):
+    """SQLite storage backend"""
+    
+    # Chat settings (incl. ban lists) and custom commands are read on nearly
+    # every update, so they are cached per chat. Writes go through this class
+    # and update the cache; with sharding every chat lives in one process.
+    CACHE_MAX_CHATS = 20000
+    
+    def __init__(self, db_path: str = "bot_database.db", profiler: Optional[QueryProfiler] = None):
         self.db_path = db_path
+        self.profiler = profiler
+        self.metrics = None
+        self._chat_settings_cache: Dict[int, ChatSettingsRecord] = {}
+        self._custom_commands_cache: Dict[int, List[Dict[str, Any]]] = {}
+        self._quota_cache: Dict[tuple, int] = {}  # (scope, owner_id) -> last known usage
+    
+    def _cache_get(self, name: str, cache: Dict[int, Any], chat_id: int) -> Any:
+        value = cache.get(chat_id)
+        if self.metrics:
+            if value is None:
+                self.metrics.cache_miss(name)
+            else:
+                self.metrics.cache_hit(name)
+        return value
+    
+    def _cache_put(self, cache: Dict[int, Any], chat_id: int, value: Any):
+        if chat_id not in cache and len(cache) >= self.CACHE_MAX_CHATS:
+            del cache[next(iter(cache))]  # evict the oldest entry
+        cache[chat_id] = value
+    
+    def _connect(self) -> aiosqlite.Connection:
+        """Open a connection, profiled when a QueryProfiler is attached"""
+        if self.profiler:
+            return ProfiledConnection(self.db_path, self.profiler)
+        return aiosqlite.connect(self.db_path)
         
     async def initialize(self):
         """Initialize database tables with ALL features"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
+            # Lets apply_retention hand freed pages back. New databases pick this up
+            # directly, existing ones only after a full VACUUM, done here once
+            await db.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            cursor = await db.execute('PRAGMA auto_vacuum')
+            if (await cursor.fetchone())[0] != 2:  # INCREMENTAL
+                logger.warning("🧹 Converting the database to incremental auto_vacuum (one-time VACUUM)...")
+                await db.execute('VACUUM')
+            # WAL lets several processes (see bot/sharding.py) read while one writes
+            await db.execute('PRAGMA journal_mode=WAL')
+            
             # User settings table
             await db.execute('''
                 CREATE TABLE IF NOT EXISTS user_settings (
@@ -132,11 +184,186 @@ class BotDatabase:
                 )
             ''')
             
+            # Stats rollup tables (filled by StatsCollector.flush)
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS chat_stats_hourly (
+                    chat_id INTEGER,
+                    hour INTEGER,
+                    messages INTEGER DEFAULT 0,
+                    commands INTEGER DEFAULT 0,
+                    xp_earned INTEGER DEFAULT 0,
+                    active_users INTEGER DEFAULT 0,
+                    PRIMARY KEY (chat_id, hour)
+                )
+            ''')
+            
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS user_stats_daily (
+                    chat_id INTEGER,
+                    day INTEGER,
+                    user_id INTEGER,
+                    messages INTEGER DEFAULT 0,
+                    commands INTEGER DEFAULT 0,
+                    xp_earned INTEGER DEFAULT 0,
+                    PRIMARY KEY (chat_id, day, user_id)
+                )
+            ''')
+            await db.execute(
+                'CREATE INDEX IF NOT EXISTS idx_user_stats_daily_user ON user_stats_daily (chat_id, user_id, day)'
+            )
+            
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS command_stats_daily (
+                    chat_id INTEGER,
+                    day INTEGER,
+                    command TEXT,
+                    uses INTEGER DEFAULT 0,
+                    PRIMARY KEY (chat_id, day, command)
+                )
+            ''')
+            
+            # Seasons: current season per chat and archived final standings
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS chat_seasons (
+                    chat_id INTEGER PRIMARY KEY,
+                    season INTEGER DEFAULT 1,
+                    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS season_history (
+                    chat_id INTEGER,
+                    season INTEGER,
+                    user_id INTEGER,
+                    xp INTEGER,
+                    level INTEGER,
+                    messages_count INTEGER,
+                    prestige INTEGER,
+                    final_position INTEGER,
+                    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (chat_id, season, user_id)
+                )
+            ''')
+            await db.execute(
+                'CREATE INDEX IF NOT EXISTS idx_season_history_position ON season_history (chat_id, season, final_position)'
+            )
+            
+            # Cross-chat totals, maintained incrementally by save_user_rank
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS global_ranks (
+                    user_id INTEGER PRIMARY KEY,
+                    total_xp INTEGER DEFAULT 0,
+                    total_messages INTEGER DEFAULT 0,
+                    display_name TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor = await db.execute('PRAGMA table_info(global_ranks)')
+            if 'display_name' not in {row[1] for row in await cursor.fetchall()}:
+                await db.execute('ALTER TABLE global_ranks ADD COLUMN display_name TEXT')
+            await db.execute(
+                'CREATE INDEX IF NOT EXISTS idx_global_ranks_order ON global_ranks (total_xp DESC, total_messages DESC, user_id)'
+            )
+            # Time-bucketed XP counters for windowed leaderboards
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS xp_windows (
+                    chat_id INTEGER,
+                    window TEXT,
+                    period INTEGER,
+                    user_id INTEGER,
+                    xp INTEGER DEFAULT 0,
+                    PRIMARY KEY (chat_id, window, period, user_id)
+                )
+            ''')
+            await db.execute(
+                'CREATE INDEX IF NOT EXISTS idx_xp_windows_order ON xp_windows (chat_id, window, period, xp DESC)'
+            )
+            # Retention pruning deletes by (window, period) across all chats
+            await db.execute(
+                'CREATE INDEX IF NOT EXISTS idx_xp_windows_period ON xp_windows (window, period)'
+            )
+            
+            # Leaderboard ordering, used for top-N and keyset pagination
+            await db.execute('''
+                CREATE INDEX IF NOT EXISTS idx_user_ranks_leaderboard
+                ON user_ranks (chat_id, level DESC, xp DESC, messages_count DESC, user_id DESC)
+            ''')
+            
+            # Retention (see apply_retention): inactive users are moved here and
+            # restored by get_user_rank when they come back
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS user_ranks_archive (
+                    user_id INTEGER,
+                    chat_id INTEGER,
+                    xp INTEGER,
+                    level INTEGER,
+                    messages_count INTEGER,
+                    daily_streak INTEGER,
+                    last_active DATE,
+                    rank_card_style TEXT,
+                    prestige INTEGER,
+                    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (user_id, chat_id)
+                )
+            ''')
+            cursor = await db.execute('PRAGMA table_info(game_data)')
+            game_columns = {row[1] for row in await cursor.fetchall()}
+            if 'status' not in game_columns:
+                await db.execute("ALTER TABLE game_data ADD COLUMN status TEXT DEFAULT 'active'")
+            if 'finished_at' not in game_columns:
+                await db.execute('ALTER TABLE game_data ADD COLUMN finished_at TIMESTAMP')
+            # Quota usage, updated in the same transaction as the rows it counts
+            await db.execute('''
+                CREATE TABLE IF NOT EXISTS quota_counters (
+                    scope TEXT,
+                    owner_id INTEGER,
+                    used INTEGER DEFAULT 0,
+                    PRIMARY KEY (scope, owner_id)
+                )
+            ''')
+            # One-off backfill for databases created before quota counters existed
+            for scope, owner, table in ((QUOTA_MEDIA, 'user_id', 'media_storage'),
+                                        (QUOTA_COMMANDS, 'chat_id', 'custom_commands')):
+                await db.execute(f'''
+                    INSERT INTO quota_counters (scope, owner_id, used)
+                    SELECT ?, {owner}, COUNT(*) FROM {table}
+                    WHERE NOT EXISTS (SELECT 1 FROM quota_counters WHERE scope = ?)
+                    GROUP BY {owner}
+                ''', (scope, scope))
+            cursor = await db.execute('PRAGMA table_info(media_storage)')
+            if 'file_unique_id' not in {row[1] for row in await cursor.fetchall()}:
+                await db.execute('ALTER TABLE media_storage ADD COLUMN file_unique_id TEXT')
+                # One-off pass over rows stored before deduplication (same type and file_id);
+                # scripts/backfill_media_ids.py catches the rest through file_unique_id
+                merged = await self._dedupe_media_by_file_id(db)
+                if merged:
+                    logger.info(f"🧹 Merged {merged} duplicate media rows")
+            await db.execute(
+                'CREATE UNIQUE INDEX IF NOT EXISTS idx_media_file_unique_id ON media_storage (file_unique_id)'
+            )
+            # my_media paging (media_id is the implicit last column) and per-type counts
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_media_user ON media_storage (user_id)')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_media_user_type ON media_storage (user_id, media_type)')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_warnings_created ON warnings (created_at)')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_game_data_status ON game_data (status, finished_at)')
+            await db.execute('CREATE INDEX IF NOT EXISTS idx_user_ranks_last_active ON user_ranks (last_active)')
+            
+            # One-off backfill for databases created before global_ranks existed
+            # (lifetime XP = XP into current level + XP spent on previous levels)
+            await db.execute('''
+                INSERT INTO global_ranks (user_id, total_xp, total_messages)
+                SELECT user_id, SUM(xp + 500 * level * (level - 1)), SUM(messages_count)
+                FROM user_ranks
+                WHERE NOT EXISTS (SELECT 1 FROM global_ranks)
+                GROUP BY user_id
+            ''')
+            
             await db.commit()
     
     # User settings methods
     async def get_user_settings(self, user_id: int) -> Dict[str, Any]:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute('SELECT * FROM user_settings WHERE user_id = ?', (user_id,))
             row = await cursor.fetchone()
@@ -147,24 +374,10 @@ class BotDatabase:
                     if settings[key]:
                         settings[key] = json.loads(settings[key])
                 return settings
-            else:
-                default_settings = {
-                    'user_id': user_id,
-                    'username': '',
-                    'preferred_language': 'en',
-                    'custom_commands': {},
-                    'theme': 'default',
-                    'notification_preferences': {
-                        'game_notifications': True,
-                        'rank_updates': True,
-                        'daily_rewards': True
-                    }
-                }
-                await self.save_user_settings(user_id, default_settings)
-                return default_settings
+        return default_user_settings(user_id)
     
     async def save_user_settings(self, user_id: int, settings: Dict[str, Any]):
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             settings_copy = settings.copy()
             for key in ['custom_commands', 'notification_preferences']:
                 if key in settings_copy:
@@ -185,52 +398,37 @@ class BotDatabase:
             await db.commit()
     
     # Chat settings methods
-    async def get_chat_settings(self, chat_id: int) -> Dict[str, Any]:
-        async with aiosqlite.connect(self.db_path) as db:
+    @staticmethod
+    def _chat_settings_from_row(row: aiosqlite.Row) -> Dict[str, Any]:
+        settings = dict(row)
+        for key in ['settings', 'custom_responses', 'enabled_features', 'banned_words']:
+            if settings[key]:
+                settings[key] = json.loads(settings[key])
+        return settings
+    
+    async def _chat_record(self, chat_id: int) -> ChatSettingsRecord:
+        cached = self._cache_get('chat_settings', self._chat_settings_cache, chat_id)
+        if cached is not None:
+            return cached
+        
+        async with self._connect() as db:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute('SELECT * FROM chat_settings WHERE chat_id = ?', (chat_id,))
             row = await cursor.fetchone()
-            
-            if row:
-                settings = dict(row)
-                for key in ['settings', 'custom_responses', 'enabled_features', 'banned_words']:
-                    if settings[key]:
-                        settings[key] = json.loads(settings[key])
-                return settings
-            else:
-                default_settings = {
-                    'chat_id': chat_id,
-                    'chat_title': '',
-                    'settings': {
-                        'welcome_message': "👋 Welcome {name} to {chat}!",
-                        'goodbye_message': "👋 Goodbye {name}! We'll miss you!",
-                        'rules': "Be respectful to everyone!",
-                        'max_warnings': 3,
-                        'flood_limit': 5,
-                        'flood_window': 10,
-                        'mute_duration': 5,
-                        'xp_per_message': 10,
-                        'xp_per_level': 1000,
-                        'daily_bonus_xp': 50
-                    },
-                    'custom_responses': {},
-                    'enabled_features': {
-                        'anti_spam': True, 'auto_mute': True, 'keyword_filter': True,
-                        'flood_control': True, 'welcome_message': True, 'meme': True,
-                        'video': True, 'greet_users': True, 'anti_link': True,
-                        'report_system': True, 'message_counter': True, 'random_emoji': True,
-                        'ranking_system': True, 'truth_or_dare': True, 'word_games': True,
-                        'sticker_packs': True, 'gif_sharing': True, 'custom_commands': True,
-                        'auto_detect_admins': True, 'owner_controls': True,
-                        'rank_system': True, 'daily_rewards': True
-                    },
-                    'banned_words': ["badword1", "badword2", "spam"]
-                }
-                await self.save_chat_settings(chat_id, default_settings)
-                return default_settings
+        # No row yet: cache the shared default record until the first save
+        record = ChatSettingsRecord(self._chat_settings_from_row(row)) if row else DEFAULT_CHAT_RECORD
+        self._cache_put(self._chat_settings_cache, chat_id, record)
+        return record
+    
+    async def get_chat_settings(self, chat_id: int) -> Dict[str, Any]:
+        return (await self._chat_record(chat_id)).to_dict(chat_id)
+    
+    async def is_feature_enabled(self, chat_id: int, feature: str) -> bool:
+        return (await self._chat_record(chat_id)).has_feature(feature)
     
     async def save_chat_settings(self, chat_id: int, settings: Dict[str, Any]):
-        async with aiosqlite.connect(self.db_path) as db:
+        self._cache_put(self._chat_settings_cache, chat_id, ChatSettingsRecord(settings))
+        async with self._connect() as db:
             settings_copy = settings.copy()
             for key in ['settings', 'custom_responses', 'enabled_features', 'banned_words']:
                 if key in settings_copy:
@@ -255,7 +453,7 @@ class BotDatabase:
     
     # Rank system methods
     async def get_user_rank(self, user_id: int, chat_id: int) -> Dict[str, Any]:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute(
                 'SELECT * FROM user_ranks WHERE user_id = ? AND chat_id = ?',
@@ -265,23 +463,27 @@ class BotDatabase:
             
             if row:
                 return dict(row)
-            else:
-                default_rank = {
-                    'user_id': user_id,
-                    'chat_id': chat_id,
-                    'xp': 0,
-                    'level': 1,
-                    'messages_count': 0,
-                    'daily_streak': 0,
-                    'last_active': datetime.now().date().isoformat(),
-                    'rank_card_style': 'default',
-                    'prestige': 0
-                }
-                await self.save_user_rank(user_id, chat_id, default_rank)
-                return default_rank
-    
-    async def save_user_rank(self, user_id: int, chat_id: int, rank_data: Dict[str, Any]):
-        async with aiosqlite.connect(self.db_path) as db:
+            
+            # Archived by retention: read only here, save_user_rank moves it back
+            cursor = await db.execute('''
+                SELECT user_id, chat_id, xp, level, messages_count, daily_streak,
+                    last_active, rank_card_style, prestige
+                FROM user_ranks_archive WHERE user_id = ? AND chat_id = ?
+            ''', (user_id, chat_id))
+            archived = await cursor.fetchone()
+        
+        if archived:
+            return dict(archived)
+        return default_user_rank(user_id, chat_id)
+    
+    async def save_user_rank(self, user_id: int, chat_id: int, rank_data: Dict[str, Any],
+                             xp_gained: int = 0, messages_gained: int = 0, display_name: Optional[str] = None):
+        """Save rank row; gained XP/messages are added to the global totals in the same transaction.
+        
+        A row archived by retention is removed from the archive in that transaction too.
+        """
+        async with self._connect() as db:
+            await db.execute('BEGIN IMMEDIATE')
             await db.execute('''
                 INSERT OR REPLACE INTO user_ranks 
                 (user_id, chat_id, xp, level, messages_count, daily_streak, last_active, rank_card_style, prestige)
@@ -297,87 +499,172 @@ class BotDatabase:
                 rank_data['rank_card_style'],
                 rank_data['prestige']
             ))
+            await db.execute(
+                'DELETE FROM user_ranks_archive WHERE user_id = ? AND chat_id = ?', (user_id, chat_id)
+            )
+            if xp_gained or messages_gained:
+                await db.execute('''
+                    INSERT INTO global_ranks (user_id, total_xp, total_messages, display_name)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (user_id) DO UPDATE SET
+                        total_xp = total_xp + excluded.total_xp,
+                        total_messages = total_messages + excluded.total_messages,
+                        display_name = COALESCE(excluded.display_name, display_name),
+                        updated_at = CURRENT_TIMESTAMP
+                ''', (user_id, xp_gained, messages_gained, display_name))
+            if xp_gained:
+                await db.executemany('''
+                    INSERT INTO xp_windows (chat_id, window, period, user_id, xp)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (chat_id, window, period, user_id) DO UPDATE SET xp = xp + excluded.xp
+                ''', [
+                    (chat_id, window, period, user_id, xp_gained)
+                    for window, period in window_periods().items()
+                ])
             await db.commit()
     
-    async def add_user_xp(self, user_id: int, chat_id: int, xp: int):
-        rank_data = await self.get_user_rank(user_id, chat_id)
-        rank_data['xp'] += xp
-        rank_data['messages_count'] += 1
-        rank_data['last_active'] = datetime.now().date().isoformat()
-        
-        xp_needed = rank_data['level'] * 1000
-        if rank_data['xp'] >= xp_needed:
-            rank_data['level'] += 1
-            rank_data['xp'] = rank_data['xp'] - xp_needed
-        
-        await self.save_user_rank(user_id, chat_id, rank_data)
-        return rank_data
-    
     async def get_leaderboard(self, chat_id: int, limit: int = 10) -> List[Dict[str, Any]]:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute('''
                 SELECT * FROM user_ranks 
                 WHERE chat_id = ? 
-                ORDER BY level DESC, xp DESC, messages_count DESC
+                ORDER BY level DESC, xp DESC, messages_count DESC, user_id DESC
                 LIMIT ?
             ''', (chat_id, limit))
             
             rows = await cursor.fetchall()
             return [dict(row) for row in rows]
     
+    async def get_leaderboard_page(self, chat_id: int, after: Optional[tuple] = None,
+                                   before: Optional[tuple] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Keyset-paginated leaderboard.
+        
+        ``after``/``before`` are (level, xp, messages_count, user_id) keys of the
+        last/first row of the current page. Each page is a bounded range read on
+        idx_user_ranks_leaderboard, no matter how deep it is.
+        """
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            if before is not None:
+                cursor = await db.execute('''
+                    SELECT * FROM user_ranks
+                    WHERE chat_id = ? AND (level, xp, messages_count, user_id) > (?, ?, ?, ?)
+                    ORDER BY level, xp, messages_count, user_id
+                    LIMIT ?
+                ''', (chat_id, *before, limit))
+                rows = list(reversed(await cursor.fetchall()))
+            elif after is not None:
+                cursor = await db.execute('''
+                    SELECT * FROM user_ranks
+                    WHERE chat_id = ? AND (level, xp, messages_count, user_id) < (?, ?, ?, ?)
+                    ORDER BY level DESC, xp DESC, messages_count DESC, user_id DESC
+                    LIMIT ?
+                ''', (chat_id, *after, limit))
+                rows = await cursor.fetchall()
+            else:
+                return await self.get_leaderboard(chat_id, limit)
+            
+            return [dict(row) for row in rows]
+    
+    async def get_window_leaderboard(self, chat_id: int, window: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Top users by XP earned in the current day/week/month"""
+        period = window_periods()[window]
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute('''
+                SELECT user_id, xp FROM xp_windows
+                WHERE chat_id = ? AND window = ? AND period = ?
+                ORDER BY xp DESC
+                LIMIT ?
+            ''', (chat_id, window, period, limit))
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+    
+    async def prune_xp_windows(self) -> int:
+        """Delete XP buckets that fell out of their retention range"""
+        periods = window_periods()
+        async with self._connect() as db:
+            deleted = 0
+            for window, keep in XP_WINDOW_RETENTION.items():
+                cursor = await db.execute(
+                    'DELETE FROM xp_windows WHERE window = ? AND period <= ?',
+                    (window, periods[window] - keep)
+                )
+                deleted += cursor.rowcount
+            await db.commit()
+            return deleted
+    
     async def get_user_rank_position(self, user_id: int, chat_id: int) -> int:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
+            cursor = await db.execute(
+                'SELECT level, xp, messages_count FROM user_ranks WHERE user_id = ? AND chat_id = ?',
+                (user_id, chat_id)
+            )
+            row = await cursor.fetchone()
+            # Users without a row yet are placed as if they had the default rank
+            if row:
+                level, xp, messages_count = row
+            else:
+                level, xp, messages_count = (DEFAULT_USER_RANK['level'], DEFAULT_USER_RANK['xp'],
+                                             DEFAULT_USER_RANK['messages_count'])
+            
+            # Same tie-breakers as the leaderboard ordering, served by idx_user_ranks_leaderboard
             cursor = await db.execute('''
                 SELECT COUNT(*) + 1 as position
                 FROM user_ranks 
-                WHERE chat_id = ? AND (level > (SELECT level FROM user_ranks WHERE user_id = ? AND chat_id = ?)
-                    OR (level = (SELECT level FROM user_ranks WHERE user_id = ? AND chat_id = ?) 
-                    AND xp > (SELECT xp FROM user_ranks WHERE user_id = ? AND chat_id = ?)))
-            ''', (chat_id, user_id, chat_id, user_id, chat_id, user_id, chat_id))
+                WHERE chat_id = ? AND (level, xp, messages_count, user_id) > (?, ?, ?, ?)
+            ''', (chat_id, level, xp, messages_count, user_id))
             
             row = await cursor.fetchone()
             return row[0] if row else 1
     
-    async def update_daily_streak(self, user_id: int, chat_id: int):
-        rank_data = await self.get_user_rank(user_id, chat_id)
-        today = datetime.now().date()
-        last_active = datetime.fromisoformat(rank_data['last_active']).date()
-        
-        if last_active == today:
-            return rank_data['daily_streak']
-        
-        if (today - last_active).days == 1:
-            rank_data['daily_streak'] += 1
-        else:
-            rank_data['daily_streak'] = 1
-        
-        rank_data['last_active'] = today.isoformat()
-        await self.save_user_rank(user_id, chat_id, rank_data)
-        return rank_data['daily_streak']
-    
     # Media methods
     async def add_media(self, user_id: int, media_type: str, file_id: str, 
-                       tags: List[str] = None, category: str = "general"):
-        async with aiosqlite.connect(self.db_path) as db:
+                       tags: List[str] = None, category: str = "general",
+                       file_unique_id: Optional[str] = None, limit: Optional[int] = None) -> bool:
+        if not file_unique_id:
+            # Files with a file_unique_id may merge into an existing row, which is allowed over quota
+            self._check_quota_cache(QUOTA_MEDIA, user_id, limit)
+        async with self._connect() as db:
             tags_json = json.dumps(tags or [])
-            await db.execute('''
+            cursor = await db.execute('''
                 INSERT INTO media_storage 
-                (user_id, media_type, file_id, tags, category)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, media_type, file_id, tags_json, category))
+                (user_id, media_type, file_id, tags, category, file_unique_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (file_unique_id) DO NOTHING
+            ''', (user_id, media_type, file_id, tags_json, category, file_unique_id))
+            created = cursor.rowcount == 1
+            if created:
+                try:
+                    await self._consume_quota(db, QUOTA_MEDIA, user_id, 1, limit)
+                except QuotaExceeded:
+                    await db.rollback()
+                    raise
+            else:
+                db.row_factory = aiosqlite.Row
+                cursor = await db.execute(
+                    'SELECT media_id, tags, category FROM media_storage WHERE file_unique_id = ?',
+                    (file_unique_id,)
+                )
+                existing = await cursor.fetchone()
+                merged = merge_media_tags(json.loads(existing['tags'] or '[]'), existing['category'], tags or [], category)
+                await db.execute(
+                    'UPDATE media_storage SET tags = ? WHERE media_id = ?', (json.dumps(merged), existing['media_id'])
+                )
             await db.commit()
+            return created
     
     async def get_random_media(self, media_type: str, category: str = None, 
                               tags: List[str] = None) -> Optional[Dict[str, Any]]:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             db.row_factory = aiosqlite.Row
             query = 'SELECT * FROM media_storage WHERE media_type = ?'
             params = [media_type]
             
             if category:
-                query += ' AND category = ?'
-                params.append(category)
+                query += ' AND (category = ? OR tags LIKE ?)'
+                params.extend([category, f'%"{category}"%'])
             
             if tags:
                 tag_conditions = []
@@ -396,51 +683,229 @@ class BotDatabase:
                 return media
             return None
     
-    async def get_user_media(self, user_id: int, media_type: str = None) -> List[Dict[str, Any]]:
-        async with aiosqlite.connect(self.db_path) as db:
+    async def get_user_media_page(self, user_id: int, media_type: str = None, after_id: Optional[int] = None,
+                                  before_id: Optional[int] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Keyset page on idx_media_user / idx_media_user_type, constant cost at any depth"""
+        query = 'SELECT * FROM media_storage WHERE user_id = ?'
+        params = [user_id]
+        if media_type:
+            query += ' AND media_type = ?'
+            params.append(media_type)
+        if before_id is not None:
+            query += ' AND media_id > ? ORDER BY media_id LIMIT ?'
+            params += [before_id, limit]
+        else:
+            if after_id is not None:
+                query += ' AND media_id < ?'
+                params.append(after_id)
+            query += ' ORDER BY media_id DESC LIMIT ?'
+            params.append(limit)
+        
+        async with self._connect() as db:
             db.row_factory = aiosqlite.Row
-            if media_type:
-                cursor = await db.execute(
-                    'SELECT * FROM media_storage WHERE user_id = ? AND media_type = ?',
-                    (user_id, media_type)
-                )
-            else:
+            cursor = await db.execute(query, params)
+            rows = await cursor.fetchall()
+        if before_id is not None:
+            rows = list(reversed(rows))
+        return [dict(row, tags=json.loads(row['tags']) if row['tags'] else []) for row in rows]
+    
+    async def get_media_counts(self, user_id: int) -> Dict[str, int]:
+        async with self._connect() as db:
+            cursor = await db.execute(
+                'SELECT media_type, COUNT(*) FROM media_storage WHERE user_id = ? GROUP BY media_type',
+                (user_id,)
+            )
+            return {media_type: count for media_type, count in await cursor.fetchall()}
+    
+    async def increment_media_usage(self, media_id: int):
+        async with self._connect() as db:
+            await db.execute(
+                'UPDATE media_storage SET usage_count = usage_count + 1 WHERE media_id = ?',
+                (media_id,)
+            )
+            await db.commit()
+    
+    async def add_media_bulk(self, user_id: int, items: Iterable[Dict[str, Any]],
+                             batch_size: int = 500, limit: Optional[int] = None) -> Dict[str, int]:
+        items = collapse_media_items(items)
+        counts = {'added': 0, 'merged': 0, 'over_quota': 0}
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            # Hold the write lock from the quota read on, so concurrent adds can't overshoot it
+            await db.execute('BEGIN IMMEDIATE')
+            try:
+                remaining = None
+                if limit is not None:
+                    cursor = await db.execute(
+                        'SELECT used FROM quota_counters WHERE scope = ? AND owner_id = ?', (QUOTA_MEDIA, user_id)
+                    )
+                    row = await cursor.fetchone()
+                    remaining = max(limit - (row['used'] if row else 0), 0)
+                await self._add_media_batches(db, user_id, items, batch_size, remaining, counts)
+                if counts['added']:
+                    await self._consume_quota(db, QUOTA_MEDIA, user_id, counts['added'])
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+        return counts
+    
+    async def _add_media_batches(self, db, user_id: int, items: List[Dict[str, Any]], batch_size: int,
+                                 remaining: Optional[int], counts: Dict[str, int]):
+        """add_media_bulk's inserts and tag merges, inside the caller's transaction"""
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            unique_ids = [item['file_unique_id'] for item in batch if item['file_unique_id']]
+            existing = {}
+            if unique_ids:
                 cursor = await db.execute(
-                    'SELECT * FROM media_storage WHERE user_id = ?',
-                    (user_id,)
+                    'SELECT media_id, tags, category, file_unique_id FROM media_storage '
+                    f'WHERE file_unique_id IN ({", ".join("?" * len(unique_ids))})',
+                    unique_ids
                 )
+                existing = {row['file_unique_id']: row for row in await cursor.fetchall()}
             
-            rows = await cursor.fetchall()
-            media_list = []
+            updates = []
+            inserts = []
+            for item in batch:
+                row = existing.get(item['file_unique_id'])
+                if row:
+                    tags = merge_media_tags(json.loads(row['tags'] or '[]'), row['category'], item['tags'], item['category'])
+                    updates.append((json.dumps(tags), row['media_id']))
+                elif remaining is not None and counts['added'] + len(inserts) >= remaining:
+                    counts['over_quota'] += 1
+                else:
+                    inserts.append((
+                        user_id, item['media_type'], item['file_id'], json.dumps(item['tags']),
+                        item['category'], item['file_unique_id']
+                    ))
+            await db.executemany('UPDATE media_storage SET tags = ? WHERE media_id = ?', updates)
+            cursor = await db.executemany('''
+                INSERT INTO media_storage (user_id, media_type, file_id, tags, category, file_unique_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (file_unique_id) DO NOTHING
+            ''', inserts)
+            counts['added'] += cursor.rowcount
+            counts['merged'] += len(updates)
+    
+    async def iter_media(self, user_id: Optional[int] = None, media_type: str = None,
+                         batch_size: int = 500, after_id: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        # Keyset batches, each on a short-lived connection, so a slow consumer never holds one open
+        while True:
+            query = 'SELECT * FROM media_storage WHERE media_id > ?'
+            params = [after_id]
+            if user_id is not None:
+                query += ' AND user_id = ?'
+                params.append(user_id)
+            if media_type:
+                query += ' AND media_type = ?'
+                params.append(media_type)
+            query += ' ORDER BY media_id LIMIT ?'
+            params.append(batch_size)
+            
+            async with self._connect() as db:
+                db.row_factory = aiosqlite.Row
+                cursor = await db.execute(query, params)
+                rows = await cursor.fetchall()
             for row in rows:
-                media = dict(row)
-                media['tags'] = json.loads(media['tags']) if media['tags'] else []
-                media_list.append(media)
-            return media_list
+                yield dict(row, tags=json.loads(row['tags']) if row['tags'] else [])
+            if len(rows) < batch_size:
+                return
+            after_id = rows[-1]['media_id']
+    
+    async def get_media_without_unique_id(self, after_id: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                'SELECT * FROM media_storage WHERE file_unique_id IS NULL AND media_id > ? ORDER BY media_id LIMIT ?',
+                (after_id, limit)
+            )
+            return [dict(row, tags=json.loads(row['tags']) if row['tags'] else []) for row in await cursor.fetchall()]
+    
+    async def set_media_unique_id(self, media_id: int, file_unique_id: str) -> bool:
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                'SELECT * FROM media_storage WHERE file_unique_id = ? AND media_id != ?', (file_unique_id, media_id)
+            )
+            keep = await cursor.fetchone()
+            if keep:
+                cursor = await db.execute('SELECT * FROM media_storage WHERE media_id = ?', (media_id,))
+                duplicate = await cursor.fetchone()
+                if duplicate:
+                    await self._merge_media(db, keep, [duplicate])
+            else:
+                await db.execute(
+                    'UPDATE media_storage SET file_unique_id = ? WHERE media_id = ?', (file_unique_id, media_id)
+                )
+            await db.commit()
+            return keep is not None
+    
+    async def _merge_media(self, db, keep, duplicates):
+        """Fold duplicate rows into ``keep``: tags and categories merged, usage counts added"""
+        tags = json.loads(keep['tags'] or '[]')
+        for duplicate in duplicates:
+            tags = merge_media_tags(tags, keep['category'], json.loads(duplicate['tags'] or '[]'), duplicate['category'])
+        await db.execute(
+            'UPDATE media_storage SET tags = ?, usage_count = usage_count + ? WHERE media_id = ?',
+            (json.dumps(tags), sum(duplicate['usage_count'] or 0 for duplicate in duplicates), keep['media_id'])
+        )
+        await db.executemany(
+            'DELETE FROM media_storage WHERE media_id = ?', [(duplicate['media_id'],) for duplicate in duplicates]
+        )
+        for duplicate in duplicates:
+            await self._consume_quota(db, QUOTA_MEDIA, duplicate['user_id'], -1)
+    
+    async def _dedupe_media_by_file_id(self, db) -> int:
+        """Merge rows with the same media type and file_id into the oldest one"""
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute('''
+            SELECT * FROM media_storage
+            WHERE (media_type, file_id) IN (
+                SELECT media_type, file_id FROM media_storage GROUP BY media_type, file_id HAVING COUNT(*) > 1
+            )
+            ORDER BY media_type, file_id, media_id
+        ''')
+        groups = {}
+        for row in await cursor.fetchall():
+            groups.setdefault((row['media_type'], row['file_id']), []).append(row)
+        for keep, *duplicates in groups.values():
+            await self._merge_media(db, keep, duplicates)
+        db.row_factory = None
+        return sum(len(rows) - 1 for rows in groups.values())
     
     # Custom commands methods
     async def add_custom_command(self, chat_id: int, command_name: str, 
-                               command_response: str, created_by: int):
-        async with aiosqlite.connect(self.db_path) as db:
+                               command_response: str, created_by: int, limit: Optional[int] = None):
+        self._check_quota_cache(QUOTA_COMMANDS, chat_id, limit)
+        async with self._connect() as db:
+            await self._consume_quota(db, QUOTA_COMMANDS, chat_id, 1, limit)
             await db.execute('''
                 INSERT INTO custom_commands 
                 (chat_id, command_name, command_response, created_by)
                 VALUES (?, ?, ?, ?)
             ''', (chat_id, command_name, command_response, created_by))
             await db.commit()
+        self._custom_commands_cache.pop(chat_id, None)
     
     async def get_custom_commands(self, chat_id: int) -> List[Dict[str, Any]]:
-        async with aiosqlite.connect(self.db_path) as db:
+        """Custom commands of a chat; usage_count of a cached list is not kept current"""
+        cached = self._cache_get('custom_commands', self._custom_commands_cache, chat_id)
+        if cached is not None:
+            return [dict(command) for command in cached]
+        
+        async with self._connect() as db:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute(
                 'SELECT * FROM custom_commands WHERE chat_id = ?',
                 (chat_id,)
             )
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+            commands = [dict(row) for row in await cursor.fetchall()]
+        self._cache_put(self._custom_commands_cache, chat_id, commands)
+        return [dict(command) for command in commands]
     
     async def increment_command_usage(self, command_id: int):
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             await db.execute(
                 'UPDATE custom_commands SET usage_count = usage_count + 1 WHERE command_id = ?',
                 (command_id,)
@@ -449,7 +914,7 @@ class BotDatabase:
     
     # Warnings methods
     async def add_warning(self, chat_id: int, user_id: int, reason: str, warned_by: int):
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             await db.execute('''
                 INSERT INTO warnings (chat_id, user_id, reason, warned_by)
                 VALUES (?, ?, ?, ?)
@@ -457,7 +922,7 @@ class BotDatabase:
             await db.commit()
     
     async def get_user_warnings(self, chat_id: int, user_id: int) -> List[Dict[str, Any]]:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             db.row_factory = aiosqlite.Row
             cursor = await db.execute(
                 'SELECT * FROM warnings WHERE chat_id = ? AND user_id = ? ORDER BY created_at DESC',
@@ -467,16 +932,82 @@ class BotDatabase:
             return [dict(row) for row in rows]
     
     async def clear_warnings(self, chat_id: int, user_id: int):
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             await db.execute(
                 'DELETE FROM warnings WHERE chat_id = ? AND user_id = ?',
                 (chat_id, user_id)
             )
             await db.commit()
     
+    # Game methods
+    async def create_game(self, chat_id: int, game_type: str, game_state: Dict[str, Any],
+                          players: List[int]) -> int:
+        async with self._connect() as db:
+            cursor = await db.execute('''
+                INSERT INTO game_data (chat_id, game_type, game_state, players, status)
+                VALUES (?, ?, ?, ?, 'active')
+            ''', (chat_id, game_type, json.dumps(game_state), json.dumps(players)))
+            await db.commit()
+            return cursor.lastrowid
+    
+    async def update_game(self, game_id: int, game_state: Dict[str, Any], players: List[int]):
+        async with self._connect() as db:
+            await db.execute('''
+                UPDATE game_data SET game_state = ?, players = ?
+                WHERE game_id = ? AND status = 'active'
+            ''', (json.dumps(game_state), json.dumps(players), game_id))
+            await db.commit()
+    
+    async def finish_game(self, game_id: int, game_state: Dict[str, Any], players: List[int],
+                          status: str = 'finished'):
+        async with self._connect() as db:
+            await db.execute('''
+                UPDATE game_data SET game_state = ?, players = ?, status = ?, finished_at = CURRENT_TIMESTAMP
+                WHERE game_id = ?
+            ''', (json.dumps(game_state), json.dumps(players), status, game_id))
+            await db.commit()
+    
+    async def get_active_games(self) -> List[Dict[str, Any]]:
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("SELECT * FROM game_data WHERE status = 'active' ORDER BY game_id")
+            return [dict(row) for row in await cursor.fetchall()]
+    
+    # Quota methods
+    def _check_quota_cache(self, scope: str, owner_id: int, limit: Optional[int]):
+        """Reject without touching the database when the cached usage is already at the limit"""
+        if limit is not None and self._quota_cache.get((scope, owner_id), 0) >= limit:
+            raise QuotaExceeded(scope, limit)
+    
+    async def _consume_quota(self, db, scope: str, owner_id: int, amount: int, limit: Optional[int] = None):
+        """Add ``amount`` to a counter inside the caller's transaction; QuotaExceeded past ``limit``"""
+        if limit is not None and amount > limit:
+            raise QuotaExceeded(scope, limit)
+        updated = await db.execute('''
+            INSERT INTO quota_counters (scope, owner_id, used) VALUES (?, ?, ?)
+            ON CONFLICT (scope, owner_id) DO UPDATE SET used = used + excluded.used
+            WHERE ? IS NULL OR used + excluded.used <= ?
+        ''', (scope, owner_id, amount, limit, limit))
+        cursor = await db.execute('SELECT used FROM quota_counters WHERE scope = ? AND owner_id = ?', (scope, owner_id))
+        self._quota_cache[(scope, owner_id)] = (await cursor.fetchone())[0]
+        if updated.rowcount == 0:
+            raise QuotaExceeded(scope, limit)
+    
+    async def get_quota_usage(self, scope: str, owner_id: int) -> int:
+        cached = self._quota_cache.get((scope, owner_id))
+        if cached is not None:
+            return cached
+        async with self._connect() as db:
+            cursor = await db.execute(
+                'SELECT used FROM quota_counters WHERE scope = ? AND owner_id = ?', (scope, owner_id)
+            )
+            row = await cursor.fetchone()
+        self._quota_cache[(scope, owner_id)] = row[0] if row else 0
+        return self._quota_cache[(scope, owner_id)]
+    
     # Global settings methods
     async def get_global_setting(self, setting_key: str, default: Any = None) -> Any:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             cursor = await db.execute(
                 'SELECT setting_value FROM global_settings WHERE setting_key = ?',
                 (setting_key,)
@@ -490,7 +1021,7 @@ class BotDatabase:
             return default
     
     async def set_global_setting(self, setting_key: str, setting_value: Any, description: str = ""):
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._connect() as db:
             value_json = json.dumps(setting_value) if not isinstance(setting_value, str) else setting_value
             await db.execute('''
                 INSERT OR REPLACE INTO global_settings 
@@ -498,3 +1029,318 @@ class BotDatabase:
                 VALUES (?, ?, ?)
             ''', (setting_key, value_json, description))
             await db.commit()
+    
+    async def set_default_global_settings(self, defaults: Dict[str, Any]) -> int:
+        """Insert missing global settings in one transaction; returns how many were added"""
+        async with self._connect() as db:
+            cursor = await db.executemany('''
+                INSERT INTO global_settings (setting_key, setting_value, description)
+                VALUES (?, ?, ?)
+                ON CONFLICT (setting_key) DO NOTHING
+            ''', [
+                (key, json.dumps(value) if not isinstance(value, str) else value, f"Default {key}")
+                for key, value in defaults.items()
+            ])
+            await db.commit()
+            return cursor.rowcount
+    
+    async def warm_up(self, active_days: int = 7, max_chats: int = 5000,
+                      shard: Optional[tuple] = None) -> int:
+        """Preload settings and custom commands of recently active chats.
+        
+        ``shard`` is an (index, workers) pair; a sharded worker only loads
+        the chats routed to it. Returns the number of chats loaded.
+        """
+        since = (datetime.now().date() - timedelta(days=active_days)).isoformat()
+        shard_filter = 'AND abs(chat_id) % ? = ?' if shard else ''
+        params = (since, *((shard[1], shard[0]) if shard else ()), max_chats)
+        active_chats = f'''
+            SELECT chat_id FROM user_ranks
+            WHERE last_active >= ? {shard_filter}
+            GROUP BY chat_id
+            ORDER BY MAX(last_active) DESC
+            LIMIT ?
+        '''
+        
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(active_chats, params)
+            chat_ids = [row[0] for row in await cursor.fetchall()]
+            cursor = await db.execute(
+                f'SELECT * FROM chat_settings WHERE chat_id IN ({active_chats})', params
+            )
+            settings_rows = await cursor.fetchall()
+            cursor = await db.execute(
+                f'SELECT * FROM custom_commands WHERE chat_id IN ({active_chats})', params
+            )
+            command_rows = await cursor.fetchall()
+        
+        commands: Dict[int, List[Dict[str, Any]]] = {}
+        for row in command_rows:
+            commands.setdefault(row['chat_id'], []).append(dict(row))
+        records = {row['chat_id']: ChatSettingsRecord(self._chat_settings_from_row(row)) for row in settings_rows}
+        for chat_id in chat_ids:
+            self._cache_put(self._chat_settings_cache, chat_id, records.get(chat_id, DEFAULT_CHAT_RECORD))
+            self._cache_put(self._custom_commands_cache, chat_id, commands.get(chat_id, []))
+        return len(chat_ids)
+    
+    # Stats methods
+    async def flush_stats(self, chat_rows: List[tuple], user_rows: List[tuple], command_rows: List[tuple]):
+        """Add pending stats counters to the rollup tables in one transaction"""
+        async with self._connect() as db:
+            await db.executemany('''
+                INSERT INTO chat_stats_hourly (chat_id, hour, messages, commands, xp_earned, active_users)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (chat_id, hour) DO UPDATE SET
+                    messages = messages + excluded.messages,
+                    commands = commands + excluded.commands,
+                    xp_earned = xp_earned + excluded.xp_earned,
+                    active_users = MAX(active_users, excluded.active_users)
+            ''', chat_rows)
+            await db.executemany('''
+                INSERT INTO user_stats_daily (chat_id, day, user_id, messages, commands, xp_earned)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (chat_id, day, user_id) DO UPDATE SET
+                    messages = messages + excluded.messages,
+                    commands = commands + excluded.commands,
+                    xp_earned = xp_earned + excluded.xp_earned
+            ''', user_rows)
+            await db.executemany('''
+                INSERT INTO command_stats_daily (chat_id, day, command, uses)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (chat_id, day, command) DO UPDATE SET uses = uses + excluded.uses
+            ''', command_rows)
+            await db.commit()
+    
+    async def get_chat_stats(self, chat_id: int, since_hour: int, since_day: int) -> Dict[str, Any]:
+        async with self._connect() as db:
+            cursor = await db.execute('''
+                SELECT hour, messages, commands, xp_earned, active_users
+                FROM chat_stats_hourly WHERE chat_id = ? AND hour >= ?
+            ''', (chat_id, since_hour))
+            hourly_rows = await cursor.fetchall()
+            
+            cursor = await db.execute(
+                'SELECT COALESCE(SUM(messages), 0) FROM chat_stats_hourly WHERE chat_id = ? AND hour >= ?',
+                (chat_id, since_day * 24)
+            )
+            messages_7d = (await cursor.fetchone())[0]
+            
+            cursor = await db.execute(
+                'SELECT COUNT(*) FROM user_stats_daily WHERE chat_id = ? AND day = ?',
+                (chat_id, since_day + 6)
+            )
+            active_today = (await cursor.fetchone())[0]
+            
+            cursor = await db.execute('''
+                SELECT command, SUM(uses) FROM command_stats_daily
+                WHERE chat_id = ? AND day >= ?
+                GROUP BY command
+            ''', (chat_id, since_day))
+            top_commands = {row[0]: row[1] for row in await cursor.fetchall()}
+        
+        active_by_hour = {row[0]: row[4] for row in hourly_rows}
+        return {
+            'hourly': {row[0]: row[1] for row in hourly_rows},
+            'messages_24h': sum(row[1] for row in hourly_rows),
+            'commands_24h': sum(row[2] for row in hourly_rows),
+            'xp_24h': sum(row[3] for row in hourly_rows),
+            'messages_7d': messages_7d,
+            'active_today': active_today,
+            'active_this_hour': active_by_hour.get(since_hour + 23, 0),
+            'top_commands': top_commands
+        }
+    
+    async def get_user_stats(self, user_id: int, chat_id: int, since_day: int) -> Dict[str, Any]:
+        async with self._connect() as db:
+            cursor = await db.execute('''
+                SELECT day, messages, commands, xp_earned FROM user_stats_daily
+                WHERE chat_id = ? AND user_id = ? AND day >= ?
+            ''', (chat_id, user_id, since_day))
+            rows = await cursor.fetchall()
+        
+        today = since_day + 6
+        stats = {}
+        for idx, key in enumerate(('messages', 'commands', 'xp'), 1):
+            stats[f'{key}_7d'] = sum(row[idx] for row in rows)
+            stats[f'{key}_today'] = sum(row[idx] for row in rows if row[0] == today)
+        return stats
+    
+    # Season methods
+    async def run_season_reset(self, chat_id: Optional[int] = None, prestige_level: int = 10,
+                               reset_prestige: bool = False) -> int:
+        """Archive standings and start a new season for one chat (or all chats).
+        
+        Everything runs as a handful of set-based statements inside a single
+        transaction. Users at or above ``prestige_level`` gain one prestige,
+        unless ``reset_prestige`` wipes prestige entirely. Returns the number
+        of archived rank rows.
+        """
+        chat_filter = 'chat_id = ?' if chat_id is not None else '1'
+        joined_filter = 'r.chat_id = ?' if chat_id is not None else '1'
+        params = (chat_id,) if chat_id is not None else ()
+        
+        async with self._connect() as db:
+            await db.execute('BEGIN IMMEDIATE')
+            try:
+                await db.execute(f'''
+                    INSERT INTO chat_seasons (chat_id)
+                    SELECT DISTINCT chat_id FROM user_ranks WHERE {chat_filter}
+                    ON CONFLICT (chat_id) DO NOTHING
+                ''', params)
+                
+                cursor = await db.execute(f'''
+                    INSERT INTO season_history
+                    (chat_id, season, user_id, xp, level, messages_count, prestige, final_position)
+                    SELECT r.chat_id, s.season, r.user_id, r.xp, r.level, r.messages_count, r.prestige,
+                        ROW_NUMBER() OVER (
+                            PARTITION BY r.chat_id
+                            ORDER BY r.level DESC, r.xp DESC, r.messages_count DESC, r.user_id DESC
+                        )
+                    FROM user_ranks r JOIN chat_seasons s ON s.chat_id = r.chat_id
+                    WHERE {joined_filter}
+                ''', params)
+                archived = cursor.rowcount
+                
+                prestige_expr = '0' if reset_prestige else 'prestige + (level >= ?)'
+                prestige_params = () if reset_prestige else (prestige_level,)
+                await db.execute(f'''
+                    UPDATE user_ranks SET
+                        prestige = {prestige_expr},
+                        xp = 0,
+                        level = 1,
+                        messages_count = 0,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE {chat_filter}
+                ''', prestige_params + params)
+                
+                await db.execute(f'''
+                    UPDATE chat_seasons SET season = season + 1, started_at = CURRENT_TIMESTAMP
+                    WHERE {chat_filter}
+                ''', params)
+                
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+        
+        return archived
+    
+    async def get_current_season(self, chat_id: int) -> int:
+        async with self._connect() as db:
+            cursor = await db.execute('SELECT season FROM chat_seasons WHERE chat_id = ?', (chat_id,))
+            row = await cursor.fetchone()
+            return row[0] if row else 1
+    
+    async def get_season_history(self, chat_id: int, season: int, limit: int = 10) -> List[Dict[str, Any]]:
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute('''
+                SELECT * FROM season_history
+                WHERE chat_id = ? AND season = ?
+                ORDER BY final_position
+                LIMIT ?
+            ''', (chat_id, season, limit))
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+    
+    # Global leaderboard methods
+    async def get_global_leaderboard(self, limit: int = 10) -> List[Dict[str, Any]]:
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute('''
+                SELECT user_id, total_xp, total_messages, display_name FROM global_ranks
+                ORDER BY total_xp DESC, total_messages DESC, user_id
+                LIMIT ?
+            ''', (limit,))
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+    
+    async def get_global_rank(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """User's global totals and position, counted over the ordering index"""
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                'SELECT user_id, total_xp, total_messages, display_name FROM global_ranks WHERE user_id = ?',
+                (user_id,)
+            )
+            row = await cursor.fetchone()
+            if not row:
+                return None
+            
+            global_rank = dict(row)
+            cursor = await db.execute('''
+                SELECT COUNT(*) + 1 FROM global_ranks
+                WHERE total_xp > ? OR (total_xp = ? AND total_messages > ?)
+                    OR (total_xp = ? AND total_messages = ? AND user_id < ?)
+            ''', (
+                global_rank['total_xp'],
+                global_rank['total_xp'], global_rank['total_messages'],
+                global_rank['total_xp'], global_rank['total_messages'], user_id
+            ))
+            global_rank['position'] = (await cursor.fetchone())[0]
+            return global_rank
+    
+    # Retention methods
+    async def _delete_in_batches(self, table: str, where: str, params: tuple, batch_size: int,
+                                 archive_sql: Optional[str] = None) -> int:
+        """Delete matching rows ``batch_size`` at a time, one short transaction per batch"""
+        deleted = 0
+        while True:
+            async with self._connect() as db:
+                cursor = await db.execute(f'SELECT rowid FROM {table} WHERE {where} LIMIT ?', (*params, batch_size))
+                rowids = [row[0] for row in await cursor.fetchall()]
+                if not rowids:
+                    return deleted
+                
+                placeholders = ','.join('?' * len(rowids))
+                if archive_sql:
+                    await db.execute(archive_sql.format(rowids=placeholders), rowids)
+                await db.execute(f'DELETE FROM {table} WHERE rowid IN ({placeholders})', rowids)
+                await db.commit()
+            
+            deleted += len(rowids)
+            if len(rowids) < batch_size:
+                return deleted
+            await asyncio.sleep(0)  # let handlers in between batches
+    
+    async def apply_retention(self, warning_days: int = 0, game_days: int = 0, inactive_months: int = 0,
+                              batch_size: int = 1000, vacuum_pages: int = 2000) -> Dict[str, int]:
+        """Expire old warnings, delete finished/stale games and archive inactive users.
+        
+        A policy set to 0 is disabled. Afterwards up to ``vacuum_pages`` free
+        pages are returned to the filesystem (incremental auto_vacuum only).
+        """
+        removed = {'warnings': 0, 'games': 0, 'archived_users': 0, 'vacuumed_pages': 0}
+        if warning_days > 0:
+            removed['warnings'] = await self._delete_in_batches(
+                'warnings', "created_at < datetime('now', ?)", (f'-{warning_days} days',), batch_size
+            )
+        if game_days > 0:
+            removed['games'] = await self._delete_in_batches(
+                'game_data',
+                f"(status IN ({', '.join(repr(status) for status in GAME_END_STATUSES)}) "
+                "AND finished_at < datetime('now', ?)) "
+                "OR (status = 'active' AND created_at < datetime('now', ?))",
+                (f'-{game_days} days', f'-{game_days} days'), batch_size
+            )
+        if inactive_months > 0:
+            removed['archived_users'] = await self._delete_in_batches(
+                'user_ranks', "last_active < date('now', ?)", (f'-{inactive_months} months',), batch_size,
+                archive_sql='''
+                    INSERT OR REPLACE INTO user_ranks_archive
+                    (user_id, chat_id, xp, level, messages_count, daily_streak, last_active, rank_card_style, prestige)
+                    SELECT user_id, chat_id, xp, level, messages_count, daily_streak, last_active, rank_card_style, prestige
+                    FROM user_ranks WHERE rowid IN ({rowids})
+                '''
+            )
+        
+        async with self._connect() as db:
+            cursor = await db.execute('PRAGMA auto_vacuum')
+            if (await cursor.fetchone())[0] == 2:  # INCREMENTAL
+                cursor = await db.execute('PRAGMA freelist_count')
+                free_pages = (await cursor.fetchone())[0]
+                # executescript steps the pragma to completion; execute() frees a single page
+                await db.executescript(f'PRAGMA incremental_vacuum({int(vacuum_pages)});')
+                removed['vacuumed_pages'] = min(free_pages, vacuum_pages)
+        return removed
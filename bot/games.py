@@ -0,0 +1,175 @@
+import heapq
+import itertools
+import json
+import logging
+import time
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+class GameSession:
+    """An active game in one chat"""
+
+    def __init__(self, chat_id: int, game_type: str, answer: str, hint: str, started_by: int,
+                 started_at: Optional[float] = None, game_id: Optional[int] = None,
+                 state: Optional[Dict[str, Any]] = None, players: Optional[Set[int]] = None):
+        self.chat_id = chat_id
+        self.game_type = game_type
+        self.answer = answer
+        self.hint = hint
+        self.started_by = started_by
+        self.started_at = started_at or time.time()
+        self.game_id = game_id
+        self.state = state or {}
+        self.players = players or set()
+        self.step = 0  # timer events fired so far (hints given, turns passed)
+    
+    def to_state(self, **extra) -> Dict[str, Any]:
+        return dict(
+            self.state, answer=self.answer, hint=self.hint, started_by=self.started_by,
+            started_at=self.started_at, **extra
+        )
+    
+    def next_timer(self) -> Optional[Tuple[float, str]]:
+        """(due time, action) of the session's next timer event, None for untimed games.
+        
+        Timed games store ``period`` and ``steps`` in their state: an 'advance'
+        event fires every ``period`` seconds ``steps`` times, then 'expire'.
+        """
+        period = self.state.get('period')
+        if not period:
+            return None
+        action = 'advance' if self.step < self.state.get('steps', 0) else 'expire'
+        return self.started_at + (self.step + 1) * period, action
+    
+    def catch_up(self, now: float):
+        """Set ``step`` from the elapsed time (after a restart)"""
+        period = self.state.get('period')
+        if period:
+            self.step = min(self.state.get('steps', 0), int((now - self.started_at) / period))
+    
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> 'GameSession':
+        state = json.loads(row['game_state']) if row['game_state'] else {}
+        return cls(
+            row['chat_id'], row['game_type'], state.pop('answer'), state.pop('hint', ''),
+            state.pop('started_by', 0), state.pop('started_at', None), row['game_id'],
+            state, set(json.loads(row['players'] or '[]'))
+        )
+
+class GameTimers:
+    """Next timer event of every game, in one heap.
+    
+    Each game has at most one pending entry. Entries of games that ended
+    meanwhile are skipped when they come up (the game_id no longer matches).
+    """
+    
+    def __init__(self):
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+    
+    def __len__(self):
+        return len(self._heap)
+    
+    def schedule(self, due: float, chat_id: int, game_id: int, action: str):
+        heapq.heappush(self._heap, (due, next(self._seq), chat_id, game_id, action))
+    
+    def pop_due(self, now: float) -> List[Tuple[int, int, str]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, chat_id, game_id, action = heapq.heappop(self._heap)
+            due.append((chat_id, game_id, action))
+        return due
+
+class GameEngine:
+    """Active games per chat, kept in memory.
+    
+    Answers are checked against the in-memory session, so ordinary messages
+    never touch the database; game_data is written when a game starts, when
+    its players change (see ``save``) and when it ends, and read back on
+    startup. Hints, turns and timeouts of
+    all games share one GameTimers heap that ``tick`` drains.
+    """
+    
+    def __init__(self, database):
+        self.db = database
+        self.active: Dict[int, GameSession] = {}
+        self.timers = GameTimers()
+    
+    async def restore(self, shard: Optional[tuple] = None) -> int:
+        """Reload games that were still running when the bot stopped.
+        
+        ``shard`` is an (index, workers) pair; only that worker's chats are loaded.
+        """
+        for row in await self.db.get_active_games():
+            if shard and abs(row['chat_id']) % shard[1] != shard[0]:
+                continue
+            try:
+                session = GameSession.from_row(row)
+            except (KeyError, ValueError):
+                logger.warning(f"⚠️ Skipping unreadable game {row['game_id']}")
+                continue
+            session.catch_up(time.time())
+            self.active[session.chat_id] = session
+            self._schedule(session)
+        return len(self.active)
+    
+    def get(self, chat_id: int) -> Optional[GameSession]:
+        return self.active.get(chat_id)
+    
+    async def start(self, chat_id: int, game_type: str, answer: str, hint: str, started_by: int,
+                    **state) -> GameSession:
+        session = GameSession(chat_id, game_type, answer.lower(), hint, started_by, state=state, players={started_by})
+        session.game_id = await self.db.create_game(chat_id, game_type, session.to_state(), sorted(session.players))
+        # Publish only once the row exists, so finish() always has a game_id to close
+        self.active[chat_id] = session
+        self._schedule(session)
+        return session
+    
+    async def save(self, session: GameSession):
+        """Persist a running game's state, e.g. after a player joined, so a restart keeps it"""
+        await self.db.update_game(session.game_id, session.to_state(), sorted(session.players))
+    
+    def _schedule(self, session: GameSession):
+        timer = session.next_timer()
+        if timer:
+            self.timers.schedule(timer[0], session.chat_id, session.game_id, timer[1])
+    
+    async def tick(self, now: Optional[float] = None) -> List[Tuple[str, GameSession]]:
+        """Fire the timers that are due; returns (action, session) pairs to announce"""
+        fired = []
+        for chat_id, game_id, action in self.timers.pop_due(now or time.time()):
+            session = self.active.get(chat_id)
+            if session is None or session.game_id != game_id:
+                continue
+            if action == 'expire':
+                if await self.finish(chat_id, status='expired') is None:
+                    continue
+            else:
+                session.step += 1
+                self._schedule(session)
+            fired.append((action, session))
+        return fired
+    
+    def check_answer(self, chat_id: int, user_id: int, text: str) -> Optional[GameSession]:
+        """Return the session if ``text`` solves the chat's active game"""
+        session = self.active.get(chat_id)
+        if session is None:
+            return None
+        session.players.add(user_id)
+        if text.strip().lower() != session.answer:
+            return None
+        return session
+    
+    async def finish(self, chat_id: int, winner_id: Optional[int] = None,
+                     status: str = 'finished') -> Optional[GameSession]:
+        session = self.active.pop(chat_id, None)
+        if session is None:
+            return None
+        await self.db.finish_game(
+            session.game_id,
+            session.to_state(winner_id=winner_id, duration=round(time.time() - session.started_at, 1)),
+            sorted(session.players),
+            status
+        )
+        return session
@@ -1,7 +1,14 @@
 from telegram.ext import CommandHandler, MessageHandler, filters, CallbackQueryHandler
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from bot.rank_system import RankSystem
+from bot.rank_system import RankSystem, display_name
+import re
+
+# Whole words only: a plain substring check would greet "this", "which", "they"...
+GREETING_PATTERN = re.compile(r'\b(hello|hi|hey|good (morning|afternoon|evening))\b')
+
+def is_greeting(text: str) -> bool:
+    return GREETING_PATTERN.search(text.lower()) is not None
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Start command"""
@@ -35,15 +42,22 @@ async def show_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
         '🖼️ Media': [
             ('add_media', 'Add sticker/GIF/meme/video'),
             ('my_media', 'Show your media library'),
+            ('import_media', 'Bulk import a sticker set or file (admin)'),
+            ('export_media', 'Export your media library'),
             ('sticker', 'Send random sticker'),
             ('gif', 'Send random GIF'),
             ('meme', 'Send random meme')
         ],
         '🏆 Ranking': [
             ('rank', 'Show your rank card'),
-            ('leaderboard', 'Show top users'),
+            ('leaderboard', 'Show top users (add day/week/month for windows)'),
+            ('globaltop', 'Show top users across all chats'),
+            ('globalrank', 'Show your global rank'),
             ('daily', 'Claim daily bonus'),
-            ('rankstyle', 'Customize rank card')
+            ('rankstyle', 'Customize rank card'),
+            ('stats', 'Show chat and personal stats'),
+            ('season', 'Show past season standings'),
+            ('newseason', 'Start a new season (admin)')
         ],
         '🛡️ Moderation': [
             ('warn', 'Warn user (admin)'),
@@ -63,7 +77,7 @@ async def show_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
     for category, commands in categories.items():
         response.append(f"\n<b>{category}</b>")
         for cmd, desc in commands:
-            if cmd in ['toggle', 'set_welcome', 'add_response', 'add_command', 'dbstats', 'warn', 'ban_word', 'unban_word'] and not is_admin_user:
+            if cmd in ['toggle', 'set_welcome', 'add_response', 'add_command', 'dbstats', 'warn', 'ban_word', 'unban_word', 'newseason', 'import_media'] and not is_admin_user:
                 continue
             response.append(f"• /{cmd} - {desc}")
     
@@ -97,7 +111,10 @@ async def handle_message_xp(update: Update, context: ContextTypes.DEFAULT_TYPE):
     xp_per_message = chat_settings['settings'].get('xp_per_message', 10)
     
     rank_system = RankSystem(db)
-    level_up_info = await rank_system.calculate_level_up(user_id, chat_id, xp_per_message)
+    level_up_info = await rank_system.calculate_level_up(
+        user_id, chat_id, xp_per_message, messages=1, display_name=display_name(update.effective_user)
+    )
+    context.bot_data['stats'].record_xp(chat_id, user_id, xp_per_message)
     
     if level_up_info['levels_gained'] > 0:
         await update.message.reply_text(
@@ -140,8 +157,7 @@ async def handle_custom_responses(update: Update, context: ContextTypes.DEFAULT_
         await update.message.reply_text(response)
         return
     
-    greetings = ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening']
-    if any(greet in text for greet in greetings):
+    if is_greeting(text):
         if await customizer.get_feature_status(chat_id, 'greet_users'):
             import random
             responses = [
@@ -171,5 +187,8 @@ def register_command_handlers(application, db, customizer):
     application.add_handler(CommandHandler("commands", show_commands))
     
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message_xp))
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_custom_responses))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_custom_responses), group=2)
+
+def register_custom_command_handler(application):
+    """Register the custom command fallback; must come after every built-in command"""
     application.add_handler(MessageHandler(filters.COMMAND, handle_custom_commands))
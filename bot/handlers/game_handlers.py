@@ -1,7 +1,23 @@
-from telegram.ext import CommandHandler
+from telegram.ext import CommandHandler, MessageHandler, filters
 from telegram import Update
 from telegram.ext import ContextTypes
+from bot.rank_system import RankSystem, display_name
+from config import Config
+import logging
 import random
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+WORD_GAME_XP = 25
+
+async def _content_options(update: Update, context: ContextTypes.DEFAULT_TYPE, kind: str):
+    """Pack language (the user's preferred language) and difficulty (first command argument)"""
+    user_settings = await context.bot_data['db'].get_user_settings(update.effective_user.id)
+    difficulty = context.args[0].lower() if context.args else None
+    if difficulty not in context.bot_data['content'].difficulties(kind, user_settings['preferred_language']):
+        difficulty = None
+    return user_settings['preferred_language'], difficulty
 
 async def truth_or_dare_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Start Truth or Dare game"""
@@ -12,46 +28,68 @@ async def truth_or_dare_command(update: Update, context: ContextTypes.DEFAULT_TY
         await update.message.reply_text("❌ Truth or Dare is disabled in this chat!")
         return
     
-    truths = [
-        "What's your most embarrassing moment?",
-        "Have you ever cheated in an exam?",
-        "What's the weirdest thing you've ever eaten?",
-        "What's your biggest fear?",
-        "What's the most trouble you've ever been in?",
-        "What's something you're glad your parents never found out about?",
-        "What's the biggest lie you've ever told?",
-        "What's the most embarrassing thing in your search history?"
-    ]
-    
-    dares = [
-        "Send a voice message singing for 30 seconds",
-        "Post a childhood photo in this chat",
-        "Text your crush right now and screenshot it",
-        "Do 20 pushups right now",
-        "Send the last photo in your gallery",
-        "Call a random contact and sing happy birthday",
-        "Wear your clothes inside out for 1 hour",
-        "Speak in an accent for the next 10 messages"
-    ]
-    
-    choice = random.choice(['truth', 'dare'])
-    
-    if choice == 'truth':
-        question = random.choice(truths)
-        await update.message.reply_text(
-            f"🔮 <b>TRUTH for {update.effective_user.first_name}:</b>\n\n"
-            f"{question}\n\n"
-            f"Reply with your answer! ✅",
-            parse_mode='HTML'
+    games = context.bot_data['games']
+    user = update.effective_user
+    session = games.get(chat_id)
+    
+    if session and session.game_type == 'truth_or_dare':
+        if context.args and context.args[0].lower() == 'stop':
+            await games.finish(chat_id, status='stopped')
+            await update.message.reply_text("🛑 Truth or Dare stopped!")
+        elif user.id not in session.state['order']:
+            session.state['order'].append(user.id)
+            session.state['names'][str(user.id)] = user.first_name
+            session.players.add(user.id)
+            await games.save(session)
+            await update.message.reply_text(
+                f"✅ {user.first_name} joined Truth or Dare! ({len(session.state['order'])} players)"
+            )
+        else:
+            current = session.state['order'][session.step % len(session.state['order'])]
+            await update.message.reply_text(
+                f"⏳ It's {session.state['names'][str(current)]}'s turn right now!"
+            )
+        return
+    
+    if context.args and context.args[0].lower() == 'stop':
+        await update.message.reply_text("❌ No Truth or Dare game is running!")
+        return
+    
+    language, difficulty = await _content_options(update, context, 'truths')
+    text = _truth_or_dare_prompt(context.bot_data['content'], chat_id, user.first_name, language, difficulty)
+    if text is None:
+        await update.message.reply_text("❌ No Truth or Dare prompts are available right now!")
+        return
+    if session is None and Config.TOD_TURN_SECONDS > 0:
+        await games.start(
+            chat_id, 'truth_or_dare', '', '', user.id,
+            order=[user.id], names={str(user.id): user.first_name},
+            language=language, difficulty=difficulty,
+            period=Config.TOD_TURN_SECONDS, steps=max(Config.TOD_TURNS - 1, 0)
         )
-    else:
-        dare = random.choice(dares)
-        await update.message.reply_text(
-            f"🎯 <b>DARE for {update.effective_user.first_name}:</b>\n\n"
-            f"{dare}\n\n"
-            f"Complete the dare and send proof! 📸",
-            parse_mode='HTML'
+        text += "\n\n👥 Others can join with /truthordare, turns rotate automatically."
+    await update.message.reply_text(text, parse_mode='HTML')
+
+def _truth_or_dare_prompt(content, chat_id: int, name: str, language: str,
+                          difficulty: str = None) -> Optional[str]:
+    """A truth or a dare for ``name``; None when no pack has prompts (e.g. no content loaded)"""
+    kind = random.choice(['truths', 'dares'])
+    drawn = content.draw(chat_id, kind, language, difficulty)
+    if drawn is None:
+        return None
+    if kind == 'truths':
+        question, _ = drawn
+        return (
+            f"🔮 <b>TRUTH for {name}:</b>\n\n"
+            f"{question}\n\n"
+            f"Reply with your answer! ✅"
         )
+    dare, _ = drawn
+    return (
+        f"🎯 <b>DARE for {name}:</b>\n\n"
+        f"{dare}\n\n"
+        f"Complete the dare and send proof! 📸"
+    )
 
 async def word_game_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Start word game"""
@@ -62,27 +100,107 @@ async def word_game_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Word games are disabled in this chat!")
         return
     
-    word_bank = [
-        {'word': 'algorithm', 'hint': 'A step-by-step procedure for calculations'},
-        {'word': 'blockchain', 'hint': 'Decentralized digital ledger technology'},
-        {'word': 'nebulous', 'hint': 'Vague or ill-defined'},
-        {'word': 'quantum', 'hint': 'Relating to quantum mechanics'},
-        {'word': 'symphony', 'hint': 'An elaborate musical composition'},
-        {'word': 'kaleidoscope', 'hint': 'A constantly changing pattern'},
-        {'word': 'pneumonia', 'hint': 'A lung inflammation condition'}
-    ]
+    games = context.bot_data['games']
+    session = games.get(chat_id)
+    if session and session.game_type != 'word':
+        await update.message.reply_text("❌ Another game is running in this chat!")
+        return
+    if session:
+        await update.message.reply_text(
+            "🧩 <b>A word game is already running!</b>\n\n"
+            f"<b>Scrambled:</b> {session.state['scrambled']}\n"
+            f"<b>Hint:</b> {session.hint}\n\n"
+            "Type the correct word in chat! 🎯",
+            parse_mode='HTML'
+        )
+        return
+    
+    language, difficulty = await _content_options(update, context, 'words')
+    drawn = context.bot_data['content'].draw(chat_id, 'words', language, difficulty)
+    if drawn is None:
+        await update.message.reply_text("❌ No words are available for the word game right now!")
+        return
+    word, hint = drawn
+    scrambled = word
+    while scrambled == word and len(set(word)) > 1:
+        scrambled = ''.join(random.sample(word, len(word)))
     
-    word_data = random.choice(word_bank)
-    scrambled = ''.join(random.sample(word_data['word'], len(word_data['word'])))
+    steps = Config.WORD_GAME_HINTS if Config.WORD_GAME_TIMEOUT > 0 else 0
+    await games.start(
+        chat_id, 'word', word, hint, update.effective_user.id, scrambled=scrambled,
+        period=Config.WORD_GAME_TIMEOUT / (steps + 1), steps=steps
+    )
     
     await update.message.reply_text(
         "🧩 <b>New Word Game Started!</b>\n\n"
         f"<b>Scrambled:</b> {scrambled}\n"
-        f"<b>Hint:</b> {word_data['hint']}\n\n"
+        f"<b>Hint:</b> {hint}\n\n"
         "Type the correct word in chat! 🎯",
         parse_mode='HTML'
     )
 
+async def handle_game_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Check chat messages against the chat's active game (in memory, no DB reads)"""
+    if not update.message or not update.message.text:
+        return
+    
+    chat_id = update.effective_chat.id
+    games = context.bot_data['games']
+    if not games.check_answer(chat_id, update.effective_user.id, update.message.text):
+        return
+    
+    session = await games.finish(chat_id, winner_id=update.effective_user.id)
+    if session is None:
+        return  # someone else was faster
+    
+    db = context.bot_data['db']
+    user_id = update.effective_user.id
+    chat_settings = await db.get_chat_settings(chat_id)
+    xp = chat_settings['settings'].get('word_game_xp', WORD_GAME_XP)
+    
+    level_up_info = await RankSystem(db).calculate_level_up(
+        user_id, chat_id, xp, display_name=display_name(update.effective_user)
+    )
+    context.bot_data['stats'].record_xp(chat_id, user_id, xp)
+    
+    text = (
+        f"🏆 <b>{update.effective_user.first_name} got it!</b>\n\n"
+        f"The word was <b>{session.answer}</b> (+{xp} XP)"
+    )
+    if level_up_info['levels_gained'] > 0:
+        text += f"\n🎉 Reached level {level_up_info['new_level']}!"
+    await update.message.reply_text(text, parse_mode='HTML')
+
+def _timer_message(context: ContextTypes.DEFAULT_TYPE, action: str, session) -> str:
+    if session.game_type == 'word':
+        if action == 'expire':
+            return f"⌛ <b>Time's up!</b> The word was <b>{session.answer}</b>."
+        shown = max(1, len(session.answer) * session.step // (session.state['steps'] + 1))
+        return (
+            f"💡 <b>Hint {session.step}:</b> "
+            f"<code>{session.answer[:shown]}{'_' * (len(session.answer) - shown)}</code>"
+        )
+    
+    if action == 'expire':
+        return "🏁 <b>Truth or Dare is over!</b> Thanks for playing."
+    order = session.state['order']
+    name = session.state['names'][str(current)]
+    prompt = _truth_or_dare_prompt(
+        context.bot_data['content'], session.chat_id, name,
+        session.state.get('language'), session.state.get('difficulty')
+    )
+    return "🔄 <b>Next turn!</b>\n\n" + (prompt or f"It's {name}'s turn!")
+
+async def game_timer_job(context: ContextTypes.DEFAULT_TYPE):
+    """Send hints, next turns and timeouts for every game timer that is due"""
+    for action, session in await context.bot_data['games'].tick():
+        try:
+            await context.bot.send_message(
+                chat_id=session.chat_id, text=_timer_message(context, action, session), parse_mode='HTML'
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not send game update to chat {session.chat_id}: {e}")
+
 def register_game_handlers(application, db, customizer):
     """Register game handlers"""
     application.bot_data['db'] = db
@@ -90,3 +208,9 @@ def register_game_handlers(application, db, customizer):
     
     application.add_handler(CommandHandler("truthordare", truth_or_dare_command))
     application.add_handler(CommandHandler("wordgame", word_game_command))
+    # Own group so answers are seen even when a group 0 text handler matched first
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_game_answer), group=1)
+    
+    if application.job_queue:
+        # One job drives the timers of every game in this process
+        application.job_queue.run_repeating(game_timer_job, interval=1, first=1)
@@ -1,9 +1,10 @@
 from .media_handlers import register_media_handlers
-from .command_handlers import register_command_handlers
+from .command_handlers import register_command_handlers, register_custom_command_handler
 from .settings_handlers import register_settings_handlers
 from .moderation_handlers import register_moderation_handlers
 from .game_handlers import register_game_handlers
 from .rank_handlers import register_rank_handlers
+from .stats_handlers import register_stats_handlers
 
 def register_all_handlers(application, db, customizer):
     """Register all handlers"""
@@ -13,3 +14,6 @@ def register_all_handlers(application, db, customizer):
     register_moderation_handlers(application, db, customizer)
     register_game_handlers(application, db, customizer)
     register_rank_handlers(application, db, customizer)
+    register_stats_handlers(application, db, customizer)
+    # Catches any command, so it goes after all built-in command handlers in group 0
+    register_custom_command_handler(application)
@@ -1,7 +1,24 @@
-from telegram.ext import CommandHandler, MessageHandler, filters, CallbackQueryHandler
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import (
+    CommandHandler, MessageHandler, filters, CallbackQueryHandler, InlineQueryHandler, ChosenInlineResultHandler
+)
+from telegram import (
+    Update, InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultCachedSticker,
+    InlineQueryResultCachedGif, InlineQueryResultCachedPhoto, InlineQueryResultCachedVideo
+)
 from telegram.ext import ContextTypes
-import aiosqlite
+from telegram.error import TelegramError
+from bot.media_index import MediaIndex
+from bot.storage import QuotaExceeded
+from config import Config
+import html
+import json
+import tempfile
+
+MEDIA_TYPES = ('sticker', 'gif', 'meme', 'video')
+MEDIA_PAGE_SIZE = 10
+INLINE_PAGE_SIZE = 50  # most results Telegram accepts per inline answer
+IMPORT_MAX_BYTES = 20 * 1024 * 1024  # largest file bots can download
+EXPORT_PART_BYTES = 10 * 1024 * 1024  # per exported document, so each part can be re-imported
 
 async def is_admin(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     """Check if user is admin - AUTO DETECT"""
@@ -49,24 +66,37 @@ async def add_media_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     category = context.args[1] if len(context.args) > 1 else "general"
     tags = context.args[2:] if len(context.args) > 2 else []
     
-    file_id = None
+    media = None
     replied_message = update.message.reply_to_message
     
     if media_type == 'sticker' and replied_message.sticker:
-        file_id = replied_message.sticker.file_id
+        media = replied_message.sticker
     elif media_type == 'gif' and replied_message.animation:
-        file_id = replied_message.animation.file_id
+        media = replied_message.animation
     elif media_type == 'meme' and replied_message.photo:
-        file_id = replied_message.photo[-1].file_id
+        media = replied_message.photo[-1]
     elif media_type == 'video' and replied_message.video:
-        file_id = replied_message.video.file_id
+        media = replied_message.video
     else:
         await update.message.reply_text("❌ Unsupported media type or no media found")
         return
     
-    await db.add_media(user_id, media_type, file_id, tags, category)
+    # file_unique_id is the same for a file no matter who sent it, so re-adds merge
+    limit = int(await db.get_global_setting('max_media_per_user', Config.MAX_MEDIA_PER_USER))
+    try:
+        created = await db.add_media(
+            user_id, media_type, media.file_id, tags, category, media.file_unique_id, limit if limit > 0 else None
+        )
+    except QuotaExceeded as e:
+        await update.message.reply_text(f"❌ You've reached the limit of {e.limit} media items")
+        return
+    
+    await context.bot_data['media_index'].refresh(db)
     
     tag_text = f" with tags: {', '.join(tags)}" if tags else ""
+    if not created:
+        await update.message.reply_text(f"♻️ This {media_type} is already in the library, tags merged{tag_text}")
+        return
     await update.message.reply_text(f"✅ {media_type.title()} added to {category} category{tag_text}")
 
 async def send_sticker_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -86,12 +116,7 @@ async def send_sticker_command(update: Update, context: ContextTypes.DEFAULT_TYP
     
     if sticker:
         await update.message.reply_sticker(sticker['file_id'])
-        async with aiosqlite.connect(db.db_path) as conn:
-            await conn.execute(
-                'UPDATE media_storage SET usage_count = usage_count + 1 WHERE media_id = ?',
-                (sticker['media_id'],)
-            )
-            await conn.commit()
+        await db.increment_media_usage(sticker['media_id'])
     else:
         await update.message.reply_text("❌ No stickers found with those filters")
 
@@ -112,12 +137,7 @@ async def send_gif_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     if gif:
         await update.message.reply_animation(gif['file_id'])
-        async with aiosqlite.connect(db.db_path) as conn:
-            await conn.execute(
-                'UPDATE media_storage SET usage_count = usage_count + 1 WHERE media_id = ?',
-                (gif['media_id'],)
-            )
-            await conn.commit()
+        await db.increment_media_usage(gif['media_id'])
     else:
         await update.message.reply_text("❌ No GIFs found with those filters")
 
@@ -138,12 +158,7 @@ async def send_meme_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     if meme:
         await update.message.reply_photo(meme['file_id'])
-        async with aiosqlite.connect(db.db_path) as conn:
-            await conn.execute(
-                'UPDATE media_storage SET usage_count = usage_count + 1 WHERE media_id = ?',
-                (meme['media_id'],)
-            )
-            await conn.commit()
+        await db.increment_media_usage(meme['media_id'])
     else:
         await update.message.reply_text("❌ No memes found with those filters")
 
@@ -151,31 +166,216 @@ async def my_media_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show user's media"""
     user_id = update.effective_user.id
     db = context.bot_data['db']
-    media_type = context.args[0] if context.args else None
-    
-    media_list = await db.get_user_media(user_id, media_type)
+    media_type = context.args[0].lower() if context.args else None
     
-    if not media_list:
+    counts = await db.get_media_counts(user_id)
+    total = counts.get(media_type, 0) if media_type else sum(counts.values())
+    if not total:
         type_text = f" {media_type}" if media_type else ""
         await update.message.reply_text(f"📭 You haven't added any{type_text} media yet!")
         return
     
-    media_by_type = {}
-    for media in media_list:
-        if media['media_type'] not in media_by_type:
-            media_by_type[media['media_type']] = {}
-        if media['category'] not in media_by_type[media['media_type']]:
-            media_by_type[media['media_type']][media['category']] = 0
-        media_by_type[media['media_type']][media['category']] += 1
-    
+    media_list = await db.get_user_media_page(user_id, media_type, limit=MEDIA_PAGE_SIZE)
+    text, reply_markup = render_media_page(user_id, media_type, counts, media_list, 1, total)
+    await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='HTML')
+
+def render_media_page(user_id: int, media_type: str, counts: dict, media_list: list, start: int, total: int):
+    """Build a my_media page and its prev/next keyboard"""
+    end = start + len(media_list) - 1
     response = ["📁 <b>Your Media Library</b>\n"]
-    for media_type, categories in media_by_type.items():
-        response.append(f"\n{media_type.upper()}:")
-        for category, count in categories.items():
-            response.append(f"  • {category}: {count} items")
-    
+    response.append(" • ".join(f"{kind}: {count}" for kind, count in sorted(counts.items())))
+    response.append(f"\n<b>{(media_type or 'all').upper()} #{start}-{end} of {total}</b>")
+    for idx, media in enumerate(media_list, start):
+        tag_text = f" [{html.escape(', '.join(media['tags']))}]" if media['tags'] else ""
+        response.append(f"{idx}. {media['media_type']} #{media['media_id']} • {html.escape(media['category'])}{tag_text}")
     response.append("\nUse /sticker, /gif, or /meme to get random media")
-    await update.message.reply_text("\n".join(response), parse_mode='HTML')
+    
+    # Callback data: direction:user_id:type:position:media_id (keyset cursor)
+    type_key = media_type or '-'
+    buttons = []
+    if start > 1:
+        buttons.append(InlineKeyboardButton(
+            "⬅️ Prev", callback_data=f"mm_prev:{user_id}:{type_key}:{start}:{media_list[0]['media_id']}"
+        ))
+    if end < total:
+        buttons.append(InlineKeyboardButton(
+            "Next ➡️", callback_data=f"mm_next:{user_id}:{type_key}:{end}:{media_list[-1]['media_id']}"
+        ))
+    reply_markup = InlineKeyboardMarkup([buttons]) if buttons else None
+    return "\n".join(response), reply_markup
+
+async def my_media_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Edit the my_media message in place with the previous/next page"""
+    query = update.callback_query
+    direction, user_id, type_key, position, media_id = query.data.split(":")
+    user_id, position, media_id = int(user_id), int(position), int(media_id)
+    media_type = None if type_key == '-' else type_key
+    
+    if query.from_user.id != user_id:
+        await query.answer("This is someone else's library", show_alert=False)
+        return
+    await query.answer()
+    
+    db = context.bot_data['db']
+    if direction == "mm_next":
+        media_list = await db.get_user_media_page(user_id, media_type, after_id=media_id, limit=MEDIA_PAGE_SIZE)
+        start = position + 1
+    else:
+        media_list = await db.get_user_media_page(user_id, media_type, before_id=media_id, limit=MEDIA_PAGE_SIZE)
+        start = max(1, position - len(media_list))
+    
+    if not media_list:
+        return
+    
+    counts = await db.get_media_counts(user_id)
+    total = counts.get(media_type, 0) if media_type else sum(counts.values())
+    text, reply_markup = render_media_page(user_id, media_type, counts, media_list, start, total)
+    await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='HTML')
+
+def _parse_import_file(data: bytes):
+    """Media items from a JSON array or NDJSON file; returns (valid items, skipped count)"""
+    text = data.decode('utf-8')
+    if text.lstrip().startswith('['):
+        entries = json.loads(text)
+    else:
+        entries = [json.loads(line) for line in text.splitlines() if line.strip()]
+    
+    items = [
+        entry for entry in entries
+        if isinstance(entry, dict) and entry.get('media_type') in MEDIA_TYPES and isinstance(entry.get('file_id'), str)
+    ]
+    return items, len(entries) - len(items)
+
+async def import_media_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Bulk import a sticker set or a JSON/NDJSON file of media (admin)"""
+    if not await is_admin(update, context):
+        await update.message.reply_text("❌ Only admins can bulk import media")
+        return
+    
+    db = context.bot_data['db']
+    replied_message = update.message.reply_to_message
+    skipped = 0
+    
+    if replied_message and replied_message.document:
+        document = replied_message.document
+        if document.file_size and document.file_size > IMPORT_MAX_BYTES:
+            await update.message.reply_text("❌ Import files can be at most 20 MB")
+            return
+        try:
+            data = await (await document.get_file()).download_as_bytearray()
+            items, skipped = _parse_import_file(bytes(data))
+        except (UnicodeDecodeError, ValueError) as e:
+            await update.message.reply_text(f"❌ Could not read import file: {e}")
+            return
+    elif context.args:
+        set_name = context.args[0]
+        category = context.args[1] if len(context.args) > 1 else "general"
+        tags = context.args[2:]
+        try:
+            sticker_set = await context.bot.get_sticker_set(set_name)
+        except TelegramError:
+            await update.message.reply_text(f"❌ Sticker set '{set_name}' not found")
+            return
+        items = [
+            {'media_type': 'sticker', 'file_id': sticker.file_id, 'file_unique_id': sticker.file_unique_id,
+             'tags': tags, 'category': category}
+            for sticker in sticker_set.stickers
+        ]
+    else:
+        await update.message.reply_text(
+            "Usage: /import_media <sticker_set> [category] [tags...]\n"
+            "or reply to a JSON/NDJSON file (as written by /export_media) with /import_media"
+        )
+        return
+    
+    # Imports count towards the same per-user quota as /add_media; items past it are skipped
+    limit = int(await db.get_global_setting('max_media_per_user', Config.MAX_MEDIA_PER_USER))
+    counts = await db.add_media_bulk(update.effective_user.id, items, limit=limit if limit > 0 else None)
+    await context.bot_data['media_index'].refresh(db)
+    skipped_text = f", skipped {skipped} invalid entries" if skipped else ""
+    if counts['over_quota']:
+        skipped_text += f", skipped {counts['over_quota']} over your limit of {limit} media items"
+    await update.message.reply_text(
+        f"📦 Imported {counts['added']} new items, merged {counts['merged']} already in the library{skipped_text}"
+    )
+
+async def export_media_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Export your media library (or everything, for bot admins) as NDJSON"""
+    user_id = update.effective_user.id
+    db = context.bot_data['db']
+    everything = bool(context.args) and context.args[0].lower() == 'all'
+    
+    if everything and user_id not in Config.ADMIN_IDS:
+        await update.message.reply_text("❌ Only bot admins can export the whole library")
+        return
+    
+    # PTB reads a whole document into memory to upload it, so rows are written to
+    # temp files of at most EXPORT_PART_BYTES and each one is sent as it fills up
+    count = 0
+    part = 0
+    part_count = 0
+    export_file = tempfile.TemporaryFile()
+    try:
+        async for media in db.iter_media(None if everything else user_id):
+            line = (json.dumps({
+                'media_type': media['media_type'], 'file_id': media['file_id'],
+                'file_unique_id': media['file_unique_id'], 'tags': media['tags'], 'category': media['category']
+            }, ensure_ascii=False) + '\n').encode('utf-8')
+            if part_count and export_file.tell() + len(line) > EXPORT_PART_BYTES:
+                part += 1
+                await _send_export_part(update, export_file, f'media_library_part{part}.ndjson', part_count)
+                export_file.close()
+                export_file = tempfile.TemporaryFile()
+                part_count = 0
+            export_file.write(line)
+            part_count += 1
+            count += 1
+        
+        if not count:
+            await update.message.reply_text("📭 No media to export!")
+            return
+        filename = f'media_library_part{part + 1}.ndjson' if part else 'media_library.ndjson'
+        await _send_export_part(update, export_file, filename, part_count)
+    finally:
+        export_file.close()
+    if part:
+        await update.message.reply_text(f"📦 Exported {count} media items in {part + 1} files")
+
+async def _send_export_part(update: Update, export_file, filename: str, count: int):
+    export_file.seek(0)
+    await update.message.reply_document(document=export_file, filename=filename, caption=f"📦 {count} media items")
+
+def _inline_result(media_id: int, media_type: str, file_id: str):
+    result_id = str(media_id)
+    if media_type == 'sticker':
+        return InlineQueryResultCachedSticker(result_id, file_id)
+    if media_type == 'gif':
+        return InlineQueryResultCachedGif(result_id, file_id)
+    if media_type == 'video':
+        return InlineQueryResultCachedVideo(result_id, file_id, title="🎬 Video")
+    return InlineQueryResultCachedPhoto(result_id, file_id)
+
+async def inline_media_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Answer '@bot funny cat' inline queries from the in-memory media index"""
+    query = update.inline_query
+    offset = int(query.offset) if query.offset.isdigit() else 0
+    results, next_offset = context.bot_data['media_index'].search(query.query, offset, INLINE_PAGE_SIZE)
+    await query.answer(
+        [_inline_result(*result) for result in results],
+        cache_time=Config.INLINE_CACHE_TIME,
+        is_personal=False,
+        next_offset=str(next_offset) if next_offset is not None else ''
+    )
+
+async def chosen_inline_media(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Count media sent through inline mode (needs inline feedback enabled in @BotFather)"""
+    result_id = update.chosen_inline_result.result_id
+    if result_id.isdigit():
+        await context.bot_data['db'].increment_media_usage(int(result_id))
+
+async def refresh_media_index_job(context: ContextTypes.DEFAULT_TYPE):
+    """Rebuild the media index so tag merges, usage counts and other processes' adds show up"""
+    context.bot_data['media_index'] = await MediaIndex.build(context.bot_data['db'])
 
 def register_media_handlers(application, db, customizer):
     """Register media handlers"""
@@ -187,3 +387,13 @@ def register_media_handlers(application, db, customizer):
     application.add_handler(CommandHandler("gif", send_gif_command))
     application.add_handler(CommandHandler("meme", send_meme_command))
     application.add_handler(CommandHandler("my_media", my_media_command))
+    application.add_handler(CallbackQueryHandler(my_media_page_callback, pattern="^mm_(next|prev):"))
+    application.add_handler(CommandHandler("import_media", import_media_command))
+    application.add_handler(CommandHandler("export_media", export_media_command))
+    application.add_handler(InlineQueryHandler(inline_media_search))
+    application.add_handler(ChosenInlineResultHandler(chosen_inline_media))
+    
+    if application.job_queue and Config.MEDIA_INDEX_REFRESH > 0:
+        application.job_queue.run_repeating(
+            refresh_media_index_job, interval=Config.MEDIA_INDEX_REFRESH, first=Config.MEDIA_INDEX_REFRESH
+        )
@@ -1,7 +1,24 @@
 from telegram.ext import CommandHandler, CallbackQueryHandler
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from bot.rank_system import RankSystem
+from datetime import datetime, timedelta
+import html
+import logging
+from telegram.error import TelegramError
+from bot.rank_system import RankSystem, display_name
+from bot.handlers.stats_handlers import stats_command
+from bot.handlers.command_handlers import is_admin
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+WINDOW_ALIASES = {
+    'day': 'day', 'today': 'day', 'daily': 'day',
+    'week': 'week', 'weekly': 'week',
+    'month': 'month', 'monthly': 'month'
+}
+WINDOW_TITLES = {'day': 'TODAY', 'week': 'THIS WEEK', 'month': 'THIS MONTH'}
+LEADERBOARD_PAGE_SIZE = 10
 
 async def rank_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show user's rank card"""
@@ -53,28 +70,150 @@ async def leaderboard_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         await update.message.reply_text("❌ Rank system is disabled in this chat!")
         return
     
-    leaderboard = await db.get_leaderboard(chat_id, 10)
+    window = WINDOW_ALIASES.get(context.args[0].lower()) if context.args else None
+    
+    if not window:
+        leaderboard = await db.get_leaderboard_page(chat_id, limit=LEADERBOARD_PAGE_SIZE)
+        if not leaderboard:
+            await update.effective_message.reply_text("📊 No rank data available yet!")
+            return
+        
+        leaderboard_text, reply_markup = await render_leaderboard_page(context, chat_id, leaderboard, 1)
+        await update.effective_message.reply_text(leaderboard_text, reply_markup=reply_markup, parse_mode='HTML')
+        return
+    
+    leaderboard = await db.get_window_leaderboard(chat_id, window, 10)
     
     if not leaderboard:
-        await update.message.reply_text("📊 No rank data available yet!")
+        await update.effective_message.reply_text("📊 No rank data available yet!")
         return
     
-    leaderboard_text = "🏆 <b>TOP 10 USERS</b> 🏆\n\n"
+    leaderboard_text = f"🏆 <b>TOP 10 USERS {WINDOW_TITLES[window]}</b> 🏆\n\n"
     
     for idx, user_data in enumerate(leaderboard, 1):
         try:
             user = await context.bot.get_chat_member(chat_id, user_data['user_id'])
             username = user.user.username or user.user.first_name
-            level = user_data['level']
-            xp = user_data['xp']
             
             medal = ["🥇", "🥈", "🥉"][idx-1] if idx <= 3 else f"{idx}."
-            leaderboard_text += f"{medal} {username} - Level {level} ({xp} XP)\n"
+            leaderboard_text += f"{medal} {username} - {user_data['xp']} XP\n"
         except:
             continue
     
+    await update.effective_message.reply_text(leaderboard_text, parse_mode='HTML')
+
+def leaderboard_cursor(position: int, user_data: dict) -> str:
+    """Encode a page boundary row as position:level:xp:messages:user_id"""
+    return (
+        f"{position}:{user_data['level']}:{user_data['xp']}:"
+        f"{user_data['messages_count']}:{user_data['user_id']}"
+    )
+
+async def render_leaderboard_page(context: ContextTypes.DEFAULT_TYPE, chat_id: int,
+                                  leaderboard: list, start: int):
+    """Build leaderboard page text and its prev/next keyboard"""
+    end = start + len(leaderboard) - 1
+    leaderboard_text = f"🏆 <b>LEADERBOARD #{start}-{end}</b> 🏆\n\n"
+    
+    for idx, user_data in enumerate(leaderboard, start):
+        try:
+            user = await context.bot.get_chat_member(chat_id, user_data['user_id'])
+            username = user.user.username or user.user.first_name
+        except:
+            username = f"User {user_data['user_id']}"
+        
+        medal = ["🥇", "🥈", "🥉"][idx-1] if idx <= 3 else f"{idx}."
+        leaderboard_text += f"{medal} {username} - Level {user_data['level']} ({user_data['xp']} XP)\n"
+    
+    buttons = []
+    if start > 1:
+        buttons.append(InlineKeyboardButton(
+            "⬅️ Prev", callback_data=f"lb_prev:{leaderboard_cursor(start, leaderboard[0])}"
+        ))
+    if len(leaderboard) == LEADERBOARD_PAGE_SIZE:
+        buttons.append(InlineKeyboardButton(
+            "Next ➡️", callback_data=f"lb_next:{leaderboard_cursor(end, leaderboard[-1])}"
+        ))
+    
+    reply_markup = InlineKeyboardMarkup([buttons]) if buttons else None
+    return leaderboard_text, reply_markup
+
+async def leaderboard_page_callback(query, chat_id: int, data: str, context: ContextTypes.DEFAULT_TYPE):
+    """Edit the leaderboard message in place with the previous/next page"""
+    db = context.bot_data['db']
+    direction, cursor = data.split(":", 1)
+    position, *key = (int(value) for value in cursor.split(":"))
+    
+    if direction == "lb_next":
+        leaderboard = await db.get_leaderboard_page(chat_id, after=tuple(key), limit=LEADERBOARD_PAGE_SIZE)
+        start = position + 1
+    else:
+        leaderboard = await db.get_leaderboard_page(chat_id, before=tuple(key), limit=LEADERBOARD_PAGE_SIZE)
+        start = max(1, position - len(leaderboard))
+    
+    if not leaderboard:
+        return
+    
+    leaderboard_text, reply_markup = await render_leaderboard_page(context, chat_id, leaderboard, start)
+    await query.edit_message_text(leaderboard_text, reply_markup=reply_markup, parse_mode='HTML')
+
+async def _lookup_name(context: ContextTypes.DEFAULT_TYPE, chat_id: int, user_id: int) -> str:
+    """Name of a user with no stored display name (ranked before names were kept)"""
+    try:
+        member = await context.bot.get_chat_member(chat_id, user_id)
+        return display_name(member.user)
+    except TelegramError:
+        pass
+    try:
+        user = await context.bot.get_chat(user_id)  # works once the user has talked to the bot
+        return user.username or user.first_name or f"User {user_id}"
+    except TelegramError:
+        return f"User {user_id}"
+
+async def global_leaderboard_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show top users across all chats"""
+    chat_id = update.effective_chat.id
+    db = context.bot_data['db']
+    
+    leaderboard = await db.get_global_leaderboard(10)
+    
+    if not leaderboard:
+        await update.message.reply_text("📊 No global rank data available yet!")
+        return
+    
+    leaderboard_text = "🌍 <b>GLOBAL TOP 10</b> 🌍\n\n"
+    
+    for idx, user_data in enumerate(leaderboard, 1):
+        username = user_data.get('display_name') or await _lookup_name(context, chat_id, user_data['user_id'])
+        username = html.escape(username)
+        
+        medal = ["🥇", "🥈", "🥉"][idx-1] if idx <= 3 else f"{idx}."
+        leaderboard_text += (
+            f"{medal} {username} - {user_data['total_xp']} XP "
+            f"({user_data['total_messages']} messages)\n"
+        )
+    
     await update.message.reply_text(leaderboard_text, parse_mode='HTML')
 
+async def global_rank_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show user's standing across all chats"""
+    user_id = update.effective_user.id
+    db = context.bot_data['db']
+    
+    global_rank = await db.get_global_rank(user_id)
+    
+    if not global_rank:
+        await update.message.reply_text("📊 You haven't earned any XP yet!")
+        return
+    
+    await update.message.reply_text(
+        f"🌍 <b>GLOBAL RANK #{global_rank['position']}</b>\n\n"
+        f"<b>{html.escape(update.effective_user.first_name)}</b>\n\n"
+        f"💎 <b>Total XP:</b> {global_rank['total_xp']}\n"
+        f"💬 <b>Total Messages:</b> {global_rank['total_messages']}",
+        parse_mode='HTML'
+    )
+
 async def daily_bonus_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Claim daily bonus"""
     chat_id = update.effective_chat.id
@@ -98,7 +237,10 @@ async def daily_bonus_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     total_xp = bonus_xp + streak_bonus
     
-    level_up_info = await RankSystem(db).calculate_level_up(user_id, chat_id, total_xp)
+    level_up_info = await RankSystem(db).calculate_level_up(
+        user_id, chat_id, total_xp, display_name=display_name(update.effective_user)
+    )
+    context.bot_data['stats'].record_xp(chat_id, user_id, total_xp)
     
     bonus_text = f"""
 🎁 <b>DAILY BONUS CLAIMED!</b> 🎁
@@ -156,10 +298,14 @@ async def rank_callback_handler(update: Update, context: ContextTypes.DEFAULT_TY
     
     if data == "show_leaderboard":
         await leaderboard_command(update, context)
+    elif data.startswith("lb_"):
+        await leaderboard_page_callback(query, chat_id, data, context)
     elif data == "rank_customize":
         await rank_customize_command(update, context)
     elif data == "daily_bonus":
         await daily_bonus_command(update, context)
+    elif data == "show_stats":
+        await stats_command(update, context)
     elif data.startswith("rank_style_"):
         style = data.replace("rank_style_", "")
         await set_rank_style(user_id, chat_id, style, query, db)
@@ -177,6 +323,83 @@ async def set_rank_style(user_id: int, chat_id: int, style: str, query, db):
         parse_mode='HTML'
     )
 
+async def new_season_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Archive standings and start a new season in this chat"""
+    if not await is_admin(update, context):
+        await update.message.reply_text("❌ Only admins can start a new season")
+        return
+    
+    chat_id = update.effective_chat.id
+    db = context.bot_data['db']
+    
+    season = await db.get_current_season(chat_id)
+    archived = await db.run_season_reset(chat_id, prestige_level=Config.SEASON_PRESTIGE_LEVEL)
+    if not archived:
+        await update.message.reply_text(
+            f"📭 Nobody has ranked in season {season} yet, so there is nothing to archive. The season continues!"
+        )
+        return
+    
+    await update.message.reply_text(
+        f"🏁 <b>Season {season} is over!</b>\n\n"
+        f"📦 Archived {archived} rankings\n"
+        f"⭐ Users at level {Config.SEASON_PRESTIGE_LEVEL}+ gained a prestige\n\n"
+        f"Use /season {season} to see the final standings. Good luck in season {season + 1}! 🚀",
+        parse_mode='HTML'
+    )
+
+async def season_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show final standings of a past season"""
+    chat_id = update.effective_chat.id
+    db = context.bot_data['db']
+    
+    current = await db.get_current_season(chat_id)
+    if context.args and context.args[0].isdigit():
+        season = int(context.args[0])
+    else:
+        season = current - 1
+    
+    if season < 1 or season >= current:
+        await update.message.reply_text(f"📅 This chat is in season {current}. No finished season to show yet!")
+        return
+    
+    standings = await db.get_season_history(chat_id, season, 10)
+    if not standings:
+        await update.message.reply_text(f"📊 No archived data for season {season}")
+        return
+    
+    season_text = f"🏆 <b>SEASON {season} FINAL STANDINGS</b> 🏆\n\n"
+    for entry in standings:
+        idx = entry['final_position']
+        username = html.escape(await _lookup_name(context, chat_id, entry['user_id']))
+        medal = ["🥇", "🥈", "🥉"][idx-1] if idx <= 3 else f"{idx}."
+        season_text += f"{medal} {username} - Level {entry['level']} ({entry['xp']} XP)\n"
+    
+    await update.message.reply_text(season_text, parse_mode='HTML')
+
+async def season_reset_job(context: ContextTypes.DEFAULT_TYPE):
+    """Start a new season in all chats once the configured season length has passed"""
+    db = context.bot_data['db']
+    
+    last_reset = await db.get_global_setting('last_season_reset')
+    now = datetime.now()
+    if last_reset is None:
+        await db.set_global_setting('last_season_reset', now.isoformat(), "Start of the current season")
+        return
+    
+    if now - datetime.fromisoformat(last_reset) < timedelta(days=Config.SEASON_LENGTH_DAYS):
+        return
+    
+    archived = await db.run_season_reset(prestige_level=Config.SEASON_PRESTIGE_LEVEL)
+    await db.set_global_setting('last_season_reset', now.isoformat(), "Start of the current season")
+    logger.info(f"🏁 Season reset complete: archived {archived} rankings")
+
+async def prune_xp_windows_job(context: ContextTypes.DEFAULT_TYPE):
+    """Expire XP buckets that are no longer needed for windowed leaderboards"""
+    deleted = await context.bot_data['db'].prune_xp_windows()
+    if deleted:
+        logger.info(f"🧹 Pruned {deleted} expired XP buckets")
+
 def register_rank_handlers(application, db, customizer):
     """Register rank system handlers"""
     application.bot_data['db'] = db
@@ -184,6 +407,15 @@ def register_rank_handlers(application, db, customizer):
     
     application.add_handler(CommandHandler("rank", rank_command))
     application.add_handler(CommandHandler("leaderboard", leaderboard_command))
+    application.add_handler(CommandHandler("globaltop", global_leaderboard_command))
+    application.add_handler(CommandHandler("globalrank", global_rank_command))
     application.add_handler(CommandHandler("daily", daily_bonus_command))
     application.add_handler(CommandHandler("rankstyle", rank_customize_command))
-    application.add_handler(CallbackQueryHandler(rank_callback_handler, pattern="^(show_leaderboard|rank_customize|daily_bonus|rank_style_|rank_back)"))
+    application.add_handler(CommandHandler("newseason", new_season_command))
+    application.add_handler(CommandHandler("season", season_command))
+    application.add_handler(CallbackQueryHandler(rank_callback_handler, pattern="^(show_leaderboard|lb_next:|lb_prev:|show_stats|rank_customize|daily_bonus|rank_style_|rank_back)"))
+    
+    if application.job_queue and Config.RUN_MAINTENANCE_JOBS:
+        application.job_queue.run_repeating(prune_xp_windows_job, interval=6 * 3600, first=300)
+        if Config.SEASON_LENGTH_DAYS > 0:
+            application.job_queue.run_repeating(season_reset_job, interval=3600, first=60)
@@ -1,6 +1,8 @@
 from telegram.ext import CommandHandler, CallbackQueryHandler
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
+from bot.storage import QuotaExceeded
+from config import Config
 
 async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show settings menu"""
@@ -137,7 +139,12 @@ async def add_custom_command_handler(update: Update, context: ContextTypes.DEFAU
     if command_name.startswith('/'):
         command_name = command_name[1:]
     
-    await db.add_custom_command(chat_id, command_name, response, user_id)
+    limit = int(await db.get_global_setting('max_custom_commands', Config.MAX_CUSTOM_COMMANDS))
+    try:
+        await db.add_custom_command(chat_id, command_name, response, user_id, limit if limit > 0 else None)
+    except QuotaExceeded as e:
+        await update.message.reply_text(f"❌ This chat has reached the limit of {e.limit} custom commands")
+        return
     await update.message.reply_text(f"✅ Custom command '/{command_name}' added!")
 
 async def settings_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
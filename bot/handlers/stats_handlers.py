@@ -0,0 +1,82 @@
+from telegram.ext import CommandHandler, MessageHandler, filters
+from telegram import Update
+from telegram.ext import ContextTypes
+from datetime import datetime, timezone
+from config import Config
+
+async def track_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Count every incoming message for the stats aggregates"""
+    if not update.message or not update.effective_user:
+        return
+
+    stats = context.bot_data['stats']
+    chat_id = update.effective_chat.id
+    user_id = update.effective_user.id
+    text = update.message.text or ""
+
+    if text.startswith('/'):
+        command = text[1:].split()[0].split('@')[0] if len(text) > 1 else ""
+        if command:
+            stats.record_command(chat_id, user_id, command)
+    else:
+        stats.record_message(chat_id, user_id)
+
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show chat and personal stats"""
+    chat_id = update.effective_chat.id
+    user_id = update.effective_user.id
+    stats = context.bot_data['stats']
+
+    chat_stats = await stats.get_chat_summary(chat_id)
+    user_stats = await stats.get_user_summary(user_id, chat_id)
+
+    stats_text = (
+        "📊 <b>CHAT STATS</b>\n\n"
+        f"💬 <b>Messages (24h):</b> {chat_stats['messages_24h']}\n"
+        f"💬 <b>Messages (7d):</b> {chat_stats['messages_7d']}\n"
+        f"⌨️ <b>Commands (24h):</b> {chat_stats['commands_24h']}\n"
+        f"💎 <b>XP earned (24h):</b> {chat_stats['xp_24h']}\n"
+        f"👥 <b>Active this hour:</b> {chat_stats['active_this_hour']}\n"
+        f"👥 <b>Active today:</b> {chat_stats['active_today']}\n"
+    )
+
+    if chat_stats['hourly']:
+        peak_hour, peak_messages = max(chat_stats['hourly'].items(), key=lambda item: item[1])
+        if peak_messages:
+            peak_time = datetime.fromtimestamp(peak_hour * 3600, tz=timezone.utc).strftime('%H:00')
+            stats_text += f"⏰ <b>Busiest hour:</b> {peak_time} UTC ({peak_messages} messages)\n"
+
+    top_commands = sorted(chat_stats['top_commands'].items(), key=lambda item: item[1], reverse=True)[:3]
+    if top_commands:
+        stats_text += "🔝 <b>Top commands (7d):</b> " + ", ".join(
+            f"/{command} ({uses})" for command, uses in top_commands
+        ) + "\n"
+
+    stats_text += (
+        f"\n👤 <b>YOUR STATS</b>\n\n"
+        f"💬 <b>Messages:</b> {user_stats['messages_today']} today • {user_stats['messages_7d']} this week\n"
+        f"⌨️ <b>Commands:</b> {user_stats['commands_today']} today • {user_stats['commands_7d']} this week\n"
+        f"💎 <b>XP:</b> {user_stats['xp_today']} today • {user_stats['xp_7d']} this week\n"
+    )
+
+    await update.effective_message.reply_text(stats_text, parse_mode='HTML')
+
+async def flush_stats_job(context: ContextTypes.DEFAULT_TYPE):
+    """Periodically roll in-memory stats up into the database"""
+    await context.bot_data['stats'].flush()
+
+def register_stats_handlers(application, db, customizer):
+    """Register stats handlers"""
+    application.bot_data['db'] = db
+    application.bot_data['customizer'] = customizer
+
+    # Runs in its own group so counting never shadows (or is shadowed by) other handlers
+    application.add_handler(MessageHandler(filters.ALL, track_update), group=-1)
+    application.add_handler(CommandHandler("stats", stats_command))
+
+    if application.job_queue:
+        application.job_queue.run_repeating(
+            flush_stats_job,
+            interval=Config.STATS_FLUSH_INTERVAL,
+            first=Config.STATS_FLUSH_INTERVAL
+        )
@@ -1,6 +1,11 @@
 from .main import CustomizableBot
 from .database import BotDatabase
+from .memory_storage import MemoryStorage
+from .storage import Storage
 from .customization import CustomizationSystem
 from .rank_system import RankSystem
+from .stats import StatsCollector
+from .games import GameEngine
+from .metrics import Metrics
 
-__all__ = ['CustomizableBot', 'BotDatabase', 'CustomizationSystem', 'RankSystem']
+__all__ = ['CustomizableBot', 'BotDatabase', 'MemoryStorage', 'Storage', 'CustomizationSystem', 'RankSystem', 'StatsCollector', 'GameEngine', 'Metrics']
@@ -1,26 +1,86 @@
 import asyncio
 import logging
+import signal
+import time
 from telegram.ext import Application
 from bot.database import BotDatabase
+from bot.memory_storage import MemoryStorage
+from bot.query_profiler import QueryProfiler
 from bot.customization import CustomizationSystem
+from bot.stats import StatsCollector
+from bot.games import GameEngine
+from bot.content_packs import ContentLibrary
+from bot.media_index import MediaIndex
+from bot.backup import backup_job
+from bot.retention import retention_job
+from bot.metrics import Metrics, MetricsServer, instrument_application, instrument_database
 from bot.handlers import register_all_handlers
 from config import Config
 
 logger = logging.getLogger(__name__)
 
 class CustomizableBot:
-    def __init__(self):
-        self.db = BotDatabase(Config.DATABASE_PATH)
+    def __init__(self, receive_updates: bool = True):
+        self.receive_updates = receive_updates
+        if Config.STORAGE_BACKEND == 'memory':
+            self.db = MemoryStorage()
+        else:
+            profiler = QueryProfiler(Config.SLOW_QUERY_MS) if Config.DB_PROFILING else None
+            self.db = BotDatabase(Config.DATABASE_PATH, profiler=profiler)
         self.customizer = CustomizationSystem(self.db)
+        self.stats = StatsCollector(self.db)
+        self.games = GameEngine(self.db)
+        self.content = ContentLibrary()
+        self.media_index = MediaIndex()
         self.application = None
+        self.metrics = Metrics() if Config.METRICS_PORT else None
+        self._metrics_server = None
+        self._stop_event = None
     
     async def initialize(self):
-        """Initialize bot components"""
+        """Initialize bot components, logging how long each startup phase took"""
+        timings = []
+        started = phase_started = time.perf_counter()
+        
+        def phase(name: str):
+            nonlocal phase_started
+            now = time.perf_counter()
+            timings.append(f"{name} {(now - phase_started) * 1000:.0f}ms")
+            phase_started = now
+        
         await self.db.initialize()
+        phase("schema")
         await self._set_default_settings()
+        phase("defaults")
+        warmed = await self.db.warm_up(Config.WARMUP_ACTIVE_DAYS, Config.WARMUP_MAX_CHATS, Config.SHARD)
+        phase(f"warm-up ({warmed} chats)")
+        restored = await self.games.restore(Config.SHARD)
+        phase(f"games ({restored} active)")
+        prompts = self.content.load(Config.CONTENT_DIR)
+        phase(f"content ({prompts} prompts)")
+        self.media_index = await MediaIndex.build(self.db)
+        phase(f"media index ({len(self.media_index.items)} items)")
         await self._create_application()
-        await register_all_handlers(self.application, self.db, self.customizer)
-        logger.info("✅ Bot initialized successfully!")
+        register_all_handlers(self.application, self.db, self.customizer)
+        phase("application")
+        if self.metrics:
+            self.db.metrics = self.metrics
+            instrument_database(self.db, self.metrics)
+            instrument_application(self.application, self.metrics)
+        if self.application.job_queue and Config.RUN_MAINTENANCE_JOBS:
+            if isinstance(self.db, BotDatabase):
+                self.application.job_queue.run_repeating(backup_job, interval=3600, first=120)
+                self.application.job_queue.run_repeating(
+                    retention_job, interval=Config.RETENTION_INTERVAL_HOURS * 3600, first=600
+                )
+            if self.db.profiler:
+                self.application.job_queue.run_repeating(
+                    self._capture_query_plans, interval=Config.QUERY_PLAN_INTERVAL, first=Config.QUERY_PLAN_INTERVAL
+                )
+        logger.info(
+            f"✅ Bot initialized successfully in {(time.perf_counter() - started) * 1000:.0f}ms "
+            f"({', '.join(timings)})"
+        )
     
     async def _set_default_settings(self):
         """Set default global settings"""
@@ -31,26 +91,116 @@ class CustomizableBot:
             'backup_interval_hours': 24
         }
         
-        for key, value in default_settings.items():
-            current = await self.db.get_global_setting(key)
-            if current is None:
-                await self.db.set_global_setting(key, value, f"Default {key}")
+        await self.db.set_default_global_settings(default_settings)
     
     async def _create_application(self):
         """Create Telegram application"""
-        self.application = (
-            Application.builder()
-            .token(Config.BOT_TOKEN)
-            .build()
-        )
+        builder = Application.builder().token(Config.BOT_TOKEN).post_shutdown(self._on_shutdown)
+        if Config.BOT_API_BASE_URL:
+            base_url = Config.BOT_API_BASE_URL.rstrip('/')
+            builder = builder.base_url(f"{base_url}/bot").base_file_url(f"{base_url}/file/bot")
+        if not self.receive_updates:
+            builder = builder.updater(None)  # updates arrive from the sharding front process
+        self.application = builder.build()
+        self.application.bot_data['stats'] = self.stats
+        self.application.bot_data['games'] = self.games
+        self.application.bot_data['content'] = self.content
+        self.application.bot_data['media_index'] = self.media_index
+    
+    async def _capture_query_plans(self, context):
+        """Explain the most expensive statements and log full table and index scans"""
+        await self.db.profiler.capture_plans(self.db.db_path)
+        logger.info("📊 Top queries by total time:\n" + self.db.profiler.report())
+    
+    async def _on_shutdown(self, application):
+        """Persist pending in-memory state"""
+        await self.stats.flush()
     
     async def run(self):
-        """Start the bot"""
+        """Start the bot in polling or webhook mode and serve until stopped"""
+        if not self.application:
+            await self.initialize()
+        
+        self._stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+        
+        async with self.application:
+            await self.application.start()
+            
+            if self.metrics:
+                self._metrics_server = MetricsServer(self.metrics, Config.METRICS_HOST, Config.METRICS_PORT)
+                await self._metrics_server.start()
+            
+            if Config.BOT_MODE == 'webhook':
+                await self._start_webhook()
+            else:
+                await self.application.updater.start_polling()
+                logger.info("🤖 Bot is running and ready! (polling)")
+            
+            try:
+                await self._stop_event.wait()
+            finally:
+                if self._metrics_server:
+                    await self._metrics_server.stop()
+                await self.application.updater.stop()
+                await self.application.stop()
+    
+    async def run_worker(self, updates, heartbeat):
+        """Process updates routed to this process by the sharding front process"""
+        from bot.sharding import keep_alive, process_shard_updates
+        
+        # Startup on a large database can outlast the front's heartbeat timeout
+        starting = asyncio.create_task(keep_alive(heartbeat))
         if not self.application:
             await self.initialize()
         
-        logger.info("🤖 Bot is running and ready!")
-        await self.application.run_polling()
+        async with self.application:
+            await self.application.start()
+            
+            if self.metrics:
+                self._metrics_server = MetricsServer(self.metrics, Config.METRICS_HOST, Config.METRICS_PORT)
+                await self._metrics_server.start()
+            
+            logger.info("🤖 Shard worker is running and ready!")
+            starting.cancel()  # process_shard_updates beats from here on
+            try:
+                await process_shard_updates(self.application, updates, heartbeat)
+            finally:
+                if self._metrics_server:
+                    await self._metrics_server.stop()
+                await self.application.stop()
+    
+    async def _start_webhook(self):
+        """Receive updates through the embedded webhook server.
+        
+        The server validates the X-Telegram-Bot-Api-Secret-Token header and
+        puts each update straight onto the application's update queue.
+        """
+        url_path = Config.WEBHOOK_PATH.lstrip('/')
+        webhook_url = f"{Config.WEBHOOK_URL.rstrip('/')}/{url_path}" if Config.WEBHOOK_URL else None
+        
+        await self.application.updater.start_webhook(
+            listen=Config.WEBHOOK_LISTEN,
+            port=Config.WEBHOOK_PORT,
+            url_path=url_path,
+            webhook_url=webhook_url,
+            secret_token=Config.WEBHOOK_SECRET or None,
+            max_connections=Config.WEBHOOK_MAX_CONNECTIONS
+        )
+        logger.info(
+            f"🤖 Bot is running and ready! (webhook on "
+            f"{Config.WEBHOOK_LISTEN}:{Config.WEBHOOK_PORT}/{url_path})"
+        )
+    
+    def stop(self):
+        """Ask a running bot to shut down"""
+        if self._stop_event:
+            self._stop_event.set()
 
 async def main():
     """Main entry point"""
@@ -0,0 +1,111 @@
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+class MediaIndex:
+    """Prefix search over media tags and categories, kept in memory.
+
+    Terms (lowercased tags and categories) live in a character trie whose
+    end nodes hold the ids of the media carrying that term. A query word
+    matches every term it is a prefix of, words are ANDed, and results are
+    ranked by usage_count. Broad queries filter one precomputed ranking of
+    the whole library instead of sorting, and ranked id lists are cached
+    per query so inline paging only slices.
+    """
+    
+    RESULT_CACHE_SIZE = 512
+    
+    def __init__(self):
+        self.items: Dict[int, Tuple[str, str, int]] = {}  # media_id -> (media_type, file_id, usage_count)
+        self.max_id = 0
+        self._root: dict = {}
+        self._results: OrderedDict = OrderedDict()
+        self._order: Optional[List[int]] = None  # every media_id by rank, rebuilt after adds
+    
+    @classmethod
+    async def build(cls, database) -> 'MediaIndex':
+        index = cls()
+        await index.refresh(database)
+        return index
+    
+    async def refresh(self, database) -> int:
+        """Add rows stored since the last build/refresh; returns how many were added"""
+        added = 0
+        async for media in database.iter_media(after_id=self.max_id):
+            self.add(media['media_id'], media['media_type'], media['file_id'],
+                     media['tags'] + [media['category']], media['usage_count'] or 0)
+            added += 1
+        if added:
+            self._rank_all()
+        return added
+    
+    def add(self, media_id: int, media_type: str, file_id: str, terms: List[str], usage_count: int = 0):
+        self.items[media_id] = (media_type, file_id, usage_count)
+        self.max_id = max(self.max_id, media_id)
+        for term in {term.lower() for term in terms if term}:
+            node = self._root
+            for char in term:
+                node = node.setdefault(char, {})
+            node.setdefault(None, set()).add(media_id)  # None key holds the term's postings
+        self._results.clear()
+        self._order = None
+    
+    def _rank_all(self):
+        self._order = sorted(self.items, key=lambda media_id: (-self.items[media_id][2], -media_id))
+    
+    def _prefix_matches(self, prefix: str) -> Set[int]:
+        node = self._root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return set()
+        matches = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for key, child in node.items():
+                if key is None:
+                    matches |= child
+                else:
+                    stack.append(child)
+        return matches
+    
+    def _ranked(self, query: str) -> List[int]:
+        words = query.lower().split()
+        key = ' '.join(words)
+        ranked = self._results.get(key)
+        if ranked is not None:
+            self._results.move_to_end(key)
+            return ranked
+        
+        if self._order is None:
+            self._rank_all()
+        
+        matches = None
+        for word in sorted(words, key=len, reverse=True):  # longest (most selective) first
+            found = self._prefix_matches(word)
+            matches = found if matches is None else matches & found
+            if not matches:
+                break
+        
+        if matches is None:
+            ranked = self._order
+        elif len(matches) * 8 > len(self._order):
+            # Broad queries: filtering the precomputed order beats sorting most of the library
+            ranked = [media_id for media_id in self._order if media_id in matches]
+        else:
+            ranked = sorted(matches, key=lambda media_id: (-self.items[media_id][2], -media_id))
+        
+        self._results[key] = ranked
+        if len(self._results) > self.RESULT_CACHE_SIZE:
+            self._results.popitem(last=False)
+        return ranked
+    
+    def search(self, query: str, offset: int = 0, limit: int = 50) -> Tuple[List[Tuple[int, str, str]], Optional[int]]:
+        """(media_id, media_type, file_id) results and the next offset (None on the last page)"""
+        ranked = self._ranked(query)
+        page = [(media_id,) + self.items[media_id][:2] for media_id in ranked[offset:offset + limit]]
+        next_offset = offset + limit if offset + limit < len(ranked) else None
+        return page, next_offset
@@ -0,0 +1,428 @@
+import copy
+import json
+import random
+from collections import defaultdict
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Any, Optional
+from bot.storage import (
+    Storage, QuotaExceeded, QUOTA_MEDIA, QUOTA_COMMANDS, XP_WINDOW_RETENTION, window_periods, merge_media_tags, collapse_media_items,
+    RankRecord, ChatSettingsRecord, DEFAULT_CHAT_RECORD, DEFAULT_USER_RANK, default_user_settings, default_user_rank
+)
+
+def _timestamp() -> str:
+    return datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
+def _leaderboard_key(rank: RankRecord) -> tuple:
+    return (rank.level, rank.xp, rank.messages_count, rank.user_id)
+
+class MemoryStorage(Storage):
+    """In-memory storage backend for tests, benchmarks and load tests.
+    
+    Behaves like BotDatabase (same defaults, ordering and return shapes) but
+    keeps everything in dicts, so nothing survives a restart. Returned rows
+    are copies, as they would be when read from SQLite.
+    """
+    
+    def __init__(self):
+        self.user_settings: Dict[int, Dict[str, Any]] = {}
+        self.chat_settings: Dict[int, ChatSettingsRecord] = {}
+        self.global_settings: Dict[str, tuple] = {}
+        self.ranks: Dict[int, Dict[int, RankRecord]] = defaultdict(dict)  # chat_id -> user_id -> row
+        self.global_ranks: Dict[int, list] = {}  # user_id -> [total_xp, total_messages, display_name]
+        self.xp_windows: Dict[tuple, Dict[int, int]] = defaultdict(dict)  # (chat_id, window, period) -> xp
+        self.seasons: Dict[int, int] = {}
+        self.season_history: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+        self.media: Dict[int, Dict[str, Any]] = {}
+        self.media_by_unique_id: Dict[str, int] = {}
+        self.quota_counters: Dict[tuple, int] = defaultdict(int)  # (scope, owner_id) -> used
+        self.commands: Dict[int, Dict[str, Any]] = {}
+        self.warnings: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+        self.games: Dict[int, Dict[str, Any]] = {}
+        self.chat_hours: Dict[int, Dict[int, List[int]]] = defaultdict(dict)
+        self.user_days: Dict[int, Dict[tuple, List[int]]] = defaultdict(dict)  # chat_id -> (day, user_id)
+        self.command_days: Dict[int, Dict[tuple, int]] = defaultdict(dict)  # chat_id -> (day, command)
+        self._next_id = {'media': 1, 'command': 1, 'warning': 1, 'game': 1}
+    
+    def _new_id(self, kind: str) -> int:
+        value = self._next_id[kind]
+        self._next_id[kind] += 1
+        return value
+    
+    async def initialize(self):
+        pass
+    
+    # User settings methods
+    async def get_user_settings(self, user_id: int) -> Dict[str, Any]:
+        if user_id not in self.user_settings:
+            return default_user_settings(user_id)
+        return copy.deepcopy(self.user_settings[user_id])
+    
+    async def save_user_settings(self, user_id: int, settings: Dict[str, Any]):
+        self.user_settings[user_id] = copy.deepcopy(settings)
+    
+    # Chat settings methods
+    async def get_chat_settings(self, chat_id: int) -> Dict[str, Any]:
+        return self.chat_settings.get(chat_id, DEFAULT_CHAT_RECORD).to_dict(chat_id)
+    
+    async def is_feature_enabled(self, chat_id: int, feature: str) -> bool:
+        return self.chat_settings.get(chat_id, DEFAULT_CHAT_RECORD).has_feature(feature)
+    
+    async def save_chat_settings(self, chat_id: int, settings: Dict[str, Any]):
+        self.chat_settings[chat_id] = ChatSettingsRecord(settings)
+    
+    # Global settings methods (stored JSON-encoded, like the SQLite backend)
+    async def get_global_setting(self, setting_key: str, default: Any = None) -> Any:
+        value, _ = self.global_settings.get(setting_key, (None, ''))
+        if value:
+            try:
+                return json.loads(value)
+            except ValueError:
+                return value
+        return default
+    
+    async def set_global_setting(self, setting_key: str, setting_value: Any, description: str = ""):
+        value_json = json.dumps(setting_value) if not isinstance(setting_value, str) else setting_value
+        self.global_settings[setting_key] = (value_json, description)
+    
+    # Rank system methods
+    async def get_user_rank(self, user_id: int, chat_id: int) -> Dict[str, Any]:
+        rank = self.ranks.get(chat_id, {}).get(user_id)
+        if rank is None:
+            return default_user_rank(user_id, chat_id)
+        return rank.to_dict()
+    
+    async def save_user_rank(self, user_id: int, chat_id: int, rank_data: Dict[str, Any],
+                             xp_gained: int = 0, messages_gained: int = 0, display_name: Optional[str] = None):
+        self.ranks[chat_id][user_id] = RankRecord.from_dict(dict(rank_data, user_id=user_id, chat_id=chat_id))
+        if xp_gained or messages_gained:
+            totals = self.global_ranks.setdefault(user_id, [0, 0, None])
+            totals[0] += xp_gained
+            totals[1] += messages_gained
+            totals[2] = display_name or totals[2]
+        if xp_gained:
+            for window, period in window_periods().items():
+                bucket = self.xp_windows[(chat_id, window, period)]
+                bucket[user_id] = bucket.get(user_id, 0) + xp_gained
+    
+    async def get_leaderboard(self, chat_id: int, limit: int = 10) -> List[Dict[str, Any]]:
+        rows = sorted(self.ranks.get(chat_id, {}).values(), key=_leaderboard_key, reverse=True)
+        return [row.to_dict() for row in rows[:limit]]
+    
+    async def get_leaderboard_page(self, chat_id: int, after: Optional[tuple] = None,
+                                   before: Optional[tuple] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        if before is not None:
+            rows = sorted(
+                (row for row in self.ranks.get(chat_id, {}).values() if _leaderboard_key(row) > tuple(before)),
+                key=_leaderboard_key
+            )[:limit]
+            return [row.to_dict() for row in reversed(rows)]
+        if after is not None:
+            rows = sorted(
+                (row for row in self.ranks.get(chat_id, {}).values() if _leaderboard_key(row) < tuple(after)),
+                key=_leaderboard_key, reverse=True
+            )
+            return [row.to_dict() for row in rows[:limit]]
+        return await self.get_leaderboard(chat_id, limit)
+    
+    async def get_window_leaderboard(self, chat_id: int, window: str, limit: int = 10) -> List[Dict[str, Any]]:
+        bucket = self.xp_windows.get((chat_id, window, window_periods()[window]), {})
+        rows = sorted(bucket.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [{'user_id': user_id, 'xp': xp} for user_id, xp in rows]
+    
+    async def prune_xp_windows(self) -> int:
+        periods = window_periods()
+        expired = [
+            key for key in self.xp_windows
+            if key[2] <= periods[key[1]] - XP_WINDOW_RETENTION[key[1]]
+        ]
+        return sum(len(self.xp_windows.pop(key)) for key in expired)
+    
+    async def get_user_rank_position(self, user_id: int, chat_id: int) -> int:
+        ranks = self.ranks.get(chat_id, {})
+        rank = ranks.get(user_id)
+        if rank:
+            key = _leaderboard_key(rank)
+        else:
+            key = (DEFAULT_USER_RANK['level'], DEFAULT_USER_RANK['xp'], DEFAULT_USER_RANK['messages_count'], user_id)
+        return 1 + sum(1 for row in ranks.values() if _leaderboard_key(row) > key)
+    
+    # Season methods
+    async def run_season_reset(self, chat_id: Optional[int] = None, prestige_level: int = 10,
+                               reset_prestige: bool = False) -> int:
+        chat_ids = [chat_id] if chat_id is not None else list(self.ranks)
+        for chat in chat_ids:
+            if self.ranks.get(chat):
+                self.seasons.setdefault(chat, 1)
+        
+        archived = 0
+        archived_at = _timestamp()
+        for chat in chat_ids:
+            rows = sorted(
+                self.ranks.get(chat, {}).values(),
+                key=_leaderboard_key, reverse=True
+            )
+            if not rows:
+                continue
+            season = self.seasons[chat]
+            self.season_history[(chat, season)] = [
+                {
+                    'chat_id': chat, 'season': season, 'user_id': row.user_id, 'xp': row.xp,
+                    'level': row.level, 'messages_count': row.messages_count,
+                    'prestige': row.prestige, 'final_position': position, 'archived_at': archived_at
+                }
+                for position, row in enumerate(rows, 1)
+            ]
+            archived += len(rows)
+            
+            for row in rows:
+                row.prestige = 0 if reset_prestige else row.prestige + (row.level >= prestige_level)
+                row.xp = 0
+                row.level = 1
+                row.messages_count = 0
+        
+        for chat in (chat_ids if chat_id is not None else list(self.seasons)):
+            if chat in self.seasons:
+                self.seasons[chat] += 1
+        return archived
+    
+    async def get_current_season(self, chat_id: int) -> int:
+        return self.seasons.get(chat_id, 1)
+    
+    async def get_season_history(self, chat_id: int, season: int, limit: int = 10) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self.season_history.get((chat_id, season), [])[:limit]]
+    
+    # Global leaderboard methods
+    async def get_global_leaderboard(self, limit: int = 10) -> List[Dict[str, Any]]:
+        rows = sorted(self.global_ranks.items(), key=lambda item: (-item[1][0], -item[1][1], item[0]))[:limit]
+        return [
+            {'user_id': user_id, 'total_xp': xp, 'total_messages': messages, 'display_name': name}
+            for user_id, (xp, messages, name) in rows
+        ]
+    
+    async def get_global_rank(self, user_id: int) -> Optional[Dict[str, Any]]:
+        totals = self.global_ranks.get(user_id)
+        if totals is None:
+            return None
+        key = (-totals[0], -totals[1], user_id)
+        position = 1 + sum(1 for other, (xp, messages, _) in self.global_ranks.items() if (-xp, -messages, other) < key)
+        return {
+            'user_id': user_id, 'total_xp': totals[0], 'total_messages': totals[1],
+            'display_name': totals[2], 'position': position
+        }
+    
+    # Media methods
+    async def add_media(self, user_id: int, media_type: str, file_id: str,
+                        tags: List[str] = None, category: str = "general",
+                        file_unique_id: Optional[str] = None, limit: Optional[int] = None) -> bool:
+        existing = self.media.get(self.media_by_unique_id.get(file_unique_id))
+        if existing:
+            existing['tags'] = merge_media_tags(existing['tags'], existing['category'], tags or [], category)
+            return False
+        self._consume_quota(QUOTA_MEDIA, user_id, limit)
+        media_id = self._new_id('media')
+        self.media[media_id] = {
+            'media_id': media_id, 'user_id': user_id, 'media_type': media_type, 'file_id': file_id,
+            'file_unique_id': file_unique_id, 'tags': list(tags or []), 'category': category,
+            'usage_count': 0, 'created_at': _timestamp()
+        }
+        if file_unique_id:
+            self.media_by_unique_id[file_unique_id] = media_id
+        return True
+    
+    async def get_random_media(self, media_type: str, category: str = None,
+                               tags: List[str] = None) -> Optional[Dict[str, Any]]:
+        matches = [
+            media for media in self.media.values()
+            if media['media_type'] == media_type
+            and (not category or media['category'] == category or category in media['tags'])
+            and (not tags or any(tag in media['tags'] for tag in tags))
+        ]
+        if not matches:
+            return None
+        media = random.choice(matches)
+        return dict(media, tags=list(media['tags']))
+    
+    async def get_user_media_page(self, user_id: int, media_type: str = None, after_id: Optional[int] = None,
+                                  before_id: Optional[int] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        ids = sorted(
+            (media_id for media_id, media in self.media.items()
+             if media['user_id'] == user_id and (not media_type or media['media_type'] == media_type)),
+            reverse=True
+        )
+        if before_id is not None:
+            ids = [media_id for media_id in ids if media_id > before_id][-limit:]
+        else:
+            ids = [media_id for media_id in ids if after_id is None or media_id < after_id][:limit]
+        return [dict(self.media[media_id], tags=list(self.media[media_id]['tags'])) for media_id in ids]
+    
+    async def get_media_counts(self, user_id: int) -> Dict[str, int]:
+        counts = defaultdict(int)
+        for media in self.media.values():
+            if media['user_id'] == user_id:
+                counts[media['media_type']] += 1
+        return dict(counts)
+    
+    async def increment_media_usage(self, media_id: int):
+        if media_id in self.media:
+            self.media[media_id]['usage_count'] += 1
+    
+    async def add_media_bulk(self, user_id: int, items: Iterable[Dict[str, Any]],
+                             batch_size: int = 500, limit: Optional[int] = None) -> Dict[str, int]:
+        counts = {'added': 0, 'merged': 0, 'over_quota': 0}
+        for item in collapse_media_items(items):
+            try:
+                created = await self.add_media(
+                    user_id, item['media_type'], item['file_id'], item['tags'], item['category'],
+                    item['file_unique_id'], limit
+                )
+            except QuotaExceeded:
+                counts['over_quota'] += 1
+                continue
+            counts['added' if created else 'merged'] += 1
+        return counts
+    
+    async def iter_media(self, user_id: Optional[int] = None, media_type: str = None,
+                         batch_size: int = 500, after_id: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        for media_id in sorted(media_id for media_id in self.media if media_id > after_id):
+            media = self.media.get(media_id)
+            if media and (user_id is None or media['user_id'] == user_id) \
+                    and (not media_type or media['media_type'] == media_type):
+                yield dict(media, tags=list(media['tags']))
+    
+    async def get_media_without_unique_id(self, after_id: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        rows = sorted(
+            media_id for media_id, media in self.media.items()
+            if media_id > after_id and not media['file_unique_id']
+        )[:limit]
+        return [dict(self.media[media_id], tags=list(self.media[media_id]['tags'])) for media_id in rows]
+    
+    async def set_media_unique_id(self, media_id: int, file_unique_id: str) -> bool:
+        media = self.media.get(media_id)
+        if media is None:
+            return False
+        keep = self.media.get(self.media_by_unique_id.get(file_unique_id))
+        if keep and keep is not media:
+            keep['tags'] = merge_media_tags(keep['tags'], keep['category'], media['tags'], media['category'])
+            keep['usage_count'] += media['usage_count']
+            del self.media[media_id]
+            self.quota_counters[(QUOTA_MEDIA, media['user_id'])] -= 1
+            return True
+        media['file_unique_id'] = file_unique_id
+        self.media_by_unique_id[file_unique_id] = media_id
+        return False
+    
+    # Quota methods
+    def _consume_quota(self, scope: str, owner_id: int, limit: Optional[int]):
+        if limit is not None and self.quota_counters[(scope, owner_id)] >= limit:
+            raise QuotaExceeded(scope, limit)
+        self.quota_counters[(scope, owner_id)] += 1
+    
+    async def get_quota_usage(self, scope: str, owner_id: int) -> int:
+        return self.quota_counters.get((scope, owner_id), 0)
+    
+    # Custom commands methods
+    async def add_custom_command(self, chat_id: int, command_name: str,
+                                 command_response: str, created_by: int, limit: Optional[int] = None):
+        self._consume_quota(QUOTA_COMMANDS, chat_id, limit)
+        command_id = self._new_id('command')
+        self.commands[command_id] = {
+            'command_id': command_id, 'chat_id': chat_id, 'command_name': command_name,
+            'command_response': command_response, 'created_by': created_by,
+            'usage_count': 0, 'created_at': _timestamp()
+        }
+    
+    async def get_custom_commands(self, chat_id: int) -> List[Dict[str, Any]]:
+        return [dict(command) for command in self.commands.values() if command['chat_id'] == chat_id]
+    
+    async def increment_command_usage(self, command_id: int):
+        if command_id in self.commands:
+            self.commands[command_id]['usage_count'] += 1
+    
+    # Warnings methods
+    async def add_warning(self, chat_id: int, user_id: int, reason: str, warned_by: int):
+        self.warnings[(chat_id, user_id)].append({
+            'warning_id': self._new_id('warning'), 'chat_id': chat_id, 'user_id': user_id,
+            'reason': reason, 'warned_by': warned_by, 'created_at': _timestamp()
+        })
+    
+    async def get_user_warnings(self, chat_id: int, user_id: int) -> List[Dict[str, Any]]:
+        return [dict(warning) for warning in reversed(self.warnings.get((chat_id, user_id), []))]
+    
+    async def clear_warnings(self, chat_id: int, user_id: int):
+        self.warnings.pop((chat_id, user_id), None)
+    
+    # Game methods
+    async def create_game(self, chat_id: int, game_type: str, game_state: Dict[str, Any],
+                          players: List[int]) -> int:
+        game_id = self._new_id('game')
+        self.games[game_id] = {
+            'game_id': game_id, 'chat_id': chat_id, 'game_type': game_type,
+            'game_state': json.dumps(game_state), 'players': json.dumps(players),
+            'status': 'active', 'created_at': _timestamp(), 'finished_at': None
+        }
+        return game_id
+    
+    async def update_game(self, game_id: int, game_state: Dict[str, Any], players: List[int]):
+        game = self.games.get(game_id)
+        if game and game['status'] == 'active':
+            game.update(game_state=json.dumps(game_state), players=json.dumps(players))
+    
+    async def finish_game(self, game_id: int, game_state: Dict[str, Any], players: List[int],
+                          status: str = 'finished'):
+        if game_id in self.games:
+            self.games[game_id].update(
+                game_state=json.dumps(game_state), players=json.dumps(players),
+                status=status, finished_at=_timestamp()
+            )
+    
+    async def get_active_games(self) -> List[Dict[str, Any]]:
+        return [dict(game) for game in self.games.values() if game['status'] == 'active']
+    
+    # Stats methods
+    async def flush_stats(self, chat_rows: List[tuple], user_rows: List[tuple], command_rows: List[tuple]):
+        for chat_id, hour, messages, commands, xp, active_users in chat_rows:
+            row = self.chat_hours[chat_id].setdefault(hour, [0, 0, 0, 0])
+            row[0] += messages
+            row[1] += commands
+            row[2] += xp
+            row[3] = max(row[3], active_users)
+        for chat_id, day, user_id, messages, commands, xp in user_rows:
+            row = self.user_days[chat_id].setdefault((day, user_id), [0, 0, 0])
+            row[0] += messages
+            row[1] += commands
+            row[2] += xp
+        for chat_id, day, command, uses in command_rows:
+            days = self.command_days[chat_id]
+            days[(day, command)] = days.get((day, command), 0) + uses
+    
+    async def get_chat_stats(self, chat_id: int, since_hour: int, since_day: int) -> Dict[str, Any]:
+        hours = self.chat_hours.get(chat_id, {})
+        hourly_rows = [(hour, *row) for hour, row in hours.items() if hour >= since_hour]
+        top_commands: Dict[str, int] = {}
+        for (day, command), uses in self.command_days.get(chat_id, {}).items():
+            if day >= since_day:
+                top_commands[command] = top_commands.get(command, 0) + uses
+        
+        active_by_hour = {row[0]: row[4] for row in hourly_rows}
+        return {
+            'hourly': {row[0]: row[1] for row in hourly_rows},
+            'messages_24h': sum(row[1] for row in hourly_rows),
+            'commands_24h': sum(row[2] for row in hourly_rows),
+            'xp_24h': sum(row[3] for row in hourly_rows),
+            'messages_7d': sum(row[0] for hour, row in hours.items() if hour >= since_day * 24),
+            'active_today': sum(1 for day, _ in self.user_days.get(chat_id, {}) if day == since_day + 6),
+            'active_this_hour': active_by_hour.get(since_hour + 23, 0),
+            'top_commands': top_commands
+        }
+    
+    async def get_user_stats(self, user_id: int, chat_id: int, since_day: int) -> Dict[str, Any]:
+        rows = [
+            (day, *row) for (day, row_user), row in self.user_days.get(chat_id, {}).items()
+            if row_user == user_id and day >= since_day
+        ]
+        today = since_day + 6
+        stats = {}
+        for idx, key in enumerate(('messages', 'commands', 'xp'), 1):
+            stats[f'{key}_7d'] = sum(row[idx] for row in rows)
+            stats[f'{key}_today'] = sum(row[idx] for row in rows if row[0] == today)
+        return stats
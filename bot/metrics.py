@@ -0,0 +1,257 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Set while a database method is being timed, so the methods it calls are not counted again
+_db_call_active = contextvars.ContextVar('db_call_active', default=False)
+
+class Histogram:
+    """Fixed-bucket latency histogram (seconds)"""
+
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.total += value
+        self.count += 1
+        for idx, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[idx] += 1
+                break
+
+    def render(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.total:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+class Metrics:
+    """In-process metrics registry rendered in Prometheus text format"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.updates_total = 0
+        self.handler_latency: Dict[str, Histogram] = {}
+        self.handler_errors: Dict[str, int] = {}
+        self.db_latency: Dict[str, Histogram] = {}
+        self.cache_stats: Dict[str, List[int]] = {}
+        self.gauges: Dict[str, Tuple[str, Callable[[], float]]] = {}
+
+    def observe_update(self):
+        self.updates_total += 1
+
+    def observe_handler(self, handler: str, seconds: float, error: bool = False):
+        histogram = self.handler_latency.get(handler)
+        if histogram is None:
+            histogram = self.handler_latency[handler] = Histogram()
+        histogram.observe(seconds)
+        if error:
+            self.handler_errors[handler] = self.handler_errors.get(handler, 0) + 1
+
+    def observe_db(self, method: str, seconds: float):
+        histogram = self.db_latency.get(method)
+        if histogram is None:
+            histogram = self.db_latency[method] = Histogram()
+        histogram.observe(seconds)
+
+    def cache_hit(self, cache: str):
+        self.cache_stats.setdefault(cache, [0, 0])[0] += 1
+
+    def cache_miss(self, cache: str):
+        self.cache_stats.setdefault(cache, [0, 0])[1] += 1
+
+    def register_gauge(self, name: str, description: str, read: Callable[[], float]):
+        """Register a gauge whose value is read at scrape time"""
+        self.gauges[name] = (description, read)
+
+    def render(self) -> str:
+        lines = [
+            '# HELP bot_uptime_seconds Seconds since the bot process started',
+            '# TYPE bot_uptime_seconds gauge',
+            f'bot_uptime_seconds {time.time() - self.started_at:.0f}',
+            '# HELP bot_updates_total Updates received',
+            '# TYPE bot_updates_total counter',
+            f'bot_updates_total {self.updates_total}',
+            '# HELP bot_handler_latency_seconds Handler callback latency',
+            '# TYPE bot_handler_latency_seconds histogram'
+        ]
+        for handler, histogram in sorted(self.handler_latency.items()):
+            lines.extend(histogram.render('bot_handler_latency_seconds', f'handler="{handler}"'))
+
+        lines.append('# HELP bot_handler_errors_total Exceptions raised by handlers')
+        lines.append('# TYPE bot_handler_errors_total counter')
+        for handler, errors in sorted(self.handler_errors.items()):
+            lines.append(f'bot_handler_errors_total{{handler="{handler}"}} {errors}')
+
+        lines.append('# HELP bot_db_query_latency_seconds BotDatabase method latency')
+        lines.append('# TYPE bot_db_query_latency_seconds histogram')
+        for method, histogram in sorted(self.db_latency.items()):
+            lines.extend(histogram.render('bot_db_query_latency_seconds', f'method="{method}"'))
+
+        lines.append('# HELP bot_cache_requests_total Cache lookups by result')
+        lines.append('# TYPE bot_cache_requests_total counter')
+        for cache, (hits, misses) in sorted(self.cache_stats.items()):
+            lines.append(f'bot_cache_requests_total{{cache="{cache}",result="hit"}} {hits}')
+            lines.append(f'bot_cache_requests_total{{cache="{cache}",result="miss"}} {misses}')
+        lines.append('# HELP bot_cache_hit_ratio Cache hit ratio since start')
+        lines.append('# TYPE bot_cache_hit_ratio gauge')
+        for cache, (hits, misses) in sorted(self.cache_stats.items()):
+            ratio = hits / (hits + misses) if hits + misses else 0.0
+            lines.append(f'bot_cache_hit_ratio{{cache="{cache}"}} {ratio:.4f}')
+
+        for name, (description, read) in sorted(self.gauges.items()):
+            try:
+                value = read()
+            except Exception:
+                continue
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+def _timed_handler(callback, metrics: Metrics):
+    # Qualified, so same-named callbacks in different handler modules get separate series
+    if hasattr(callback, '__qualname__'):
+        name = f"{callback.__module__}.{callback.__qualname__}"
+    else:
+        name = repr(callback)
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        start = time.perf_counter()
+        try:
+            result = await callback(update, context)
+        except Exception:
+            metrics.observe_handler(name, time.perf_counter() - start, error=True)
+            raise
+        metrics.observe_handler(name, time.perf_counter() - start)
+        return result
+
+    return wrapper
+
+def _count_outgoing_requests(bot) -> List[int]:
+    """Track Bot API requests that are waiting for a pool connection or in flight.
+    
+    PTB sends straight through its HTTP connection pool, so these pending
+    requests are the bot's send queue. getUpdates long polls are left out.
+    """
+    pending = [0]
+    do_post = bot._do_post
+
+    @functools.wraps(do_post)
+    async def counted(endpoint, data, **kwargs):
+        if endpoint == 'getUpdates':
+            return await do_post(endpoint=endpoint, data=data, **kwargs)
+        pending[0] += 1
+        try:
+            return await do_post(endpoint=endpoint, data=data, **kwargs)
+        finally:
+            pending[0] -= 1
+
+    bot._do_post = counted
+    return pending
+
+def instrument_application(application, metrics: Metrics):
+    """Time every registered handler and count updates, incoming and outgoing queue depth"""
+    from telegram import Update
+    from telegram.ext import TypeHandler
+
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            if inspect.iscoroutinefunction(handler.callback):
+                handler.callback = _timed_handler(handler.callback, metrics)
+
+    async def count_update(update, context):
+        metrics.observe_update()
+
+    application.add_handler(TypeHandler(Update, count_update), group=-100)
+    metrics.register_gauge(
+        'bot_update_queue_depth', 'Updates waiting to be processed',
+        lambda: application.update_queue.qsize()
+    )
+    sending = _count_outgoing_requests(application.bot)
+    metrics.register_gauge(
+        'bot_send_queue_depth', 'Bot API requests (sends, edits, ...) waiting for a connection or in flight',
+        lambda: sending[0]
+    )
+
+def instrument_database(db, metrics: Metrics):
+    """Time every public coroutine method of a BotDatabase instance (outermost calls only)"""
+    for name, method in inspect.getmembers(db, inspect.iscoroutinefunction):
+        if name.startswith('_'):
+            continue
+
+        def bind(name=name, method=method):
+            @functools.wraps(method)
+            async def wrapper(*args, **kwargs):
+                if _db_call_active.get():
+                    return await method(*args, **kwargs)
+                token = _db_call_active.set(True)
+                start = time.perf_counter()
+                try:
+                    return await method(*args, **kwargs)
+                finally:
+                    metrics.observe_db(name, time.perf_counter() - start)
+                    _db_call_active.reset(token)
+            return wrapper
+
+        setattr(db, name, bind())
+
+class MetricsServer:
+    """Minimal HTTP server exposing GET /metrics in Prometheus text format"""
+
+    def __init__(self, metrics: Metrics, host: str = "0.0.0.0", port: int = 9100):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"📈 Metrics available on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+
+            parts = request_line.decode('latin-1').split()
+            if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+                status, body = '200 OK', self.metrics.render().encode()
+            else:
+                status, body = '404 Not Found', b'Not Found\n'
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,187 @@
+import logging
+import re
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+import aiosqlite
+from aiosqlite.context import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+_EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLACE')
+
+def normalize_sql(sql: str) -> str:
+    return _WHITESPACE.sub(' ', sql).strip()
+
+def params_shape(parameters: Any) -> str:
+    """Describe parameters by type (and length) without logging their values"""
+    if not parameters:
+        return "()"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {_value_shape(value)}" for key, value in parameters.items()) + "}"
+    return "(" + ", ".join(_value_shape(value) for value in parameters) + ")"
+
+def _value_shape(value: Any) -> str:
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+class QueryStats:
+    __slots__ = ('count', 'total', 'max', 'last_params', 'plan', 'full_scan')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last_params: Any = None
+        self.plan: Optional[List[str]] = None
+        self.full_scan = False
+
+class QueryProfiler:
+    """Opt-in statement profiler for BotDatabase.
+
+    Times every executed statement, including fetching its rows (SQLite does
+    most of a SELECT's work while stepping through them), logs the ones slower than
+    ``slow_query_ms`` with the shape of their parameters, and can capture
+    EXPLAIN QUERY PLAN for the most expensive statements to flag full table
+    and index scans.
+    """
+
+    def __init__(self, slow_query_ms: float = 50, max_statements: int = 500):
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.max_statements = max_statements
+        self.statements: Dict[str, QueryStats] = {}
+
+    def record(self, sql: str, parameters: Any, seconds: float, rows: Optional[int] = None) -> Optional[QueryStats]:
+        """Time one statement; for executemany ``parameters`` is the first row of ``rows``"""
+        key = normalize_sql(sql)
+        stats = self.statements.get(key)
+        if stats is None:
+            if len(self.statements) >= self.max_statements:
+                return None
+            stats = self.statements[key] = QueryStats()
+
+        stats.count += 1
+        stats.total += seconds
+        stats.max = max(stats.max, seconds)
+        stats.last_params = parameters
+
+        if seconds >= self.slow_query_seconds:
+            shape = params_shape(parameters) + (f" x {rows} rows" if rows is not None else "")
+            logger.warning(f"🐢 Slow query ({seconds * 1000:.1f}ms) params={shape}: {key[:300]}")
+        return stats
+
+    def record_fetch(self, stats: Optional[QueryStats], sql: str, parameters: Any, before: float, seconds: float):
+        """Add a fetch to its statement, ``before`` being the time the statement took so far"""
+        if stats is not None:
+            stats.total += seconds
+            stats.max = max(stats.max, before + seconds)
+        if before < self.slow_query_seconds <= before + seconds:
+            logger.warning(
+                f"🐢 Slow query ({(before + seconds) * 1000:.1f}ms with fetching) "
+                f"params={params_shape(parameters)}: {normalize_sql(sql)[:300]}"
+            )
+
+    def top_statements(self, limit: int = 5) -> List[tuple]:
+        """(sql, stats) pairs ordered by total time spent"""
+        return sorted(self.statements.items(), key=lambda item: item[1].total, reverse=True)[:limit]
+
+    async def capture_plans(self, db_path: str, limit: int = 5) -> List[tuple]:
+        """EXPLAIN the most expensive statements and flag full table and index scans"""
+        flagged = []
+        async with aiosqlite.connect(db_path) as db:
+            for sql, stats in self.top_statements(limit):
+                if not sql.upper().startswith(_EXPLAINABLE):
+                    continue
+                params = stats.last_params if stats.last_params is not None else ()
+                try:
+                    cursor = await db.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                    rows = await cursor.fetchall()
+                except sqlite3.Error as e:
+                    logger.debug(f"Could not explain query: {e}")
+                    continue
+
+                stats.plan = [row[3] for row in rows]
+                # "SCAN t" reads the whole table, "SCAN t USING [COVERING] INDEX i" the whole index
+                stats.full_scan = any(
+                    detail.startswith('SCAN ') and detail != 'SCAN CONSTANT ROW' for detail in stats.plan
+                )
+                if stats.full_scan:
+                    flagged.append((sql, stats))
+                    logger.warning(
+                        f"🔍 Full scan in hot query ({stats.count} calls, "
+                        f"{stats.total * 1000:.0f}ms total): {sql[:300]} -> {'; '.join(stats.plan)}"
+                    )
+        return flagged
+
+    def report(self, limit: int = 10) -> str:
+        lines = []
+        for sql, stats in self.top_statements(limit):
+            avg_ms = stats.total / stats.count * 1000
+            flag = " [FULL SCAN]" if stats.full_scan else ""
+            lines.append(
+                f"{stats.total * 1000:9.1f}ms total  {stats.count:7d} calls  "
+                f"{avg_ms:7.2f}ms avg  {stats.max * 1000:7.1f}ms max{flag}  {sql[:120]}"
+            )
+        return '\n'.join(lines)
+
+class ProfiledCursor(aiosqlite.Cursor):
+    """Cursor that adds the time spent fetching rows to its statement"""
+
+    def __init__(self, cursor: aiosqlite.Cursor, profiler: QueryProfiler, stats: Optional[QueryStats],
+                 sql: str, parameters: Any, elapsed: float):
+        super().__init__(cursor._conn, cursor._cursor)
+        self._profiler = profiler
+        self._stats = stats
+        self._sql = sql
+        self._parameters = parameters
+        self._elapsed = elapsed
+
+    async def _timed(self, fetch, *args):
+        start = time.perf_counter()
+        try:
+            return await fetch(*args)
+        finally:
+            seconds = time.perf_counter() - start
+            self._profiler.record_fetch(self._stats, self._sql, self._parameters, self._elapsed, seconds)
+            self._elapsed += seconds
+
+    async def fetchone(self):
+        return await self._timed(super().fetchone)
+
+    async def fetchmany(self, size: Optional[int] = None):
+        return await self._timed(super().fetchmany, size)
+
+    async def fetchall(self):
+        return await self._timed(super().fetchall)
+
+class ProfiledConnection(aiosqlite.Connection):
+    """aiosqlite connection that reports statement timings to a QueryProfiler"""
+
+    def __init__(self, db_path: str, profiler: QueryProfiler):
+        super().__init__(lambda: sqlite3.connect(db_path), 64)
+        self._profiler = profiler
+
+    @contextmanager
+    async def execute(self, sql: str, parameters=None):
+        start = time.perf_counter()
+        try:
+            cursor = await super().execute(sql, parameters)
+        except Exception:
+            self._profiler.record(sql, parameters, time.perf_counter() - start)
+            raise
+        elapsed = time.perf_counter() - start
+        stats = self._profiler.record(sql, parameters, elapsed)
+        return ProfiledCursor(cursor, self._profiler, stats, sql, parameters, elapsed)
+
+    @contextmanager
+    async def executemany(self, sql: str, parameters):
+        parameters = list(parameters)
+        start = time.perf_counter()
+        try:
+            return await super().executemany(sql, parameters)
+        finally:
+            # Keep one row: enough for EXPLAIN, without holding e.g. a whole bulk import
+            first = parameters[0] if parameters else None
+            self._profiler.record(sql, first, time.perf_counter() - start, rows=len(parameters))
@@ -1,7 +1,11 @@
 import math
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
 
+def display_name(user) -> str:
+    """Name shown for a Telegram user on leaderboards"""
+    return user.username or user.first_name
+
 class RankSystem:
     def __init__(self, database):
         self.db = database
@@ -110,12 +114,14 @@ class RankSystem:
 └────────────────────────┘
 """
     
-    async def calculate_level_up(self, user_id: int, chat_id: int, xp_to_add: int) -> Dict[str, Any]:
-        """Calculate level up and return results"""
+    async def calculate_level_up(self, user_id: int, chat_id: int, xp_to_add: int,
+                                 messages: int = 0, display_name: Optional[str] = None) -> Dict[str, Any]:
+        """Add XP (and optionally counted messages), calculate level up and return results"""
         rank_data = await self.db.get_user_rank(user_id, chat_id)
         old_level = rank_data['level']
         
         rank_data['xp'] += xp_to_add
+        rank_data['messages_count'] += messages
         
         levels_gained = 0
         xp_needed = self.get_level_requirements(rank_data['level'])
@@ -126,8 +132,8 @@ class RankSystem:
             levels_gained += 1
             xp_needed = self.get_level_requirements(rank_data['level'])
         
-        if levels_gained > 0:
-            await self.db.save_user_rank(user_id, chat_id, rank_data)
+        await self.db.save_user_rank(user_id, chat_id, rank_data, xp_gained=xp_to_add,
+                                     messages_gained=messages, display_name=display_name)
         
         return {
             'levels_gained': levels_gained,
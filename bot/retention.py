@@ -0,0 +1,18 @@
+import logging
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+async def retention_job(context):
+    """Apply the configured retention policies, then reclaim free pages"""
+    removed = await context.bot_data['db'].apply_retention(
+        warning_days=Config.WARNING_RETENTION_DAYS,
+        game_days=Config.GAME_RETENTION_DAYS,
+        inactive_months=Config.INACTIVE_USER_MONTHS,
+        batch_size=Config.RETENTION_BATCH_SIZE,
+        vacuum_pages=Config.VACUUM_PAGES
+    )
+    if any(removed.values()):
+        logger.info(
+            "🧹 Retention: " + ", ".join(f"{count} {name.replace('_', ' ')}" for name, count in removed.items())
+        )
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+import signal
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+def shard_for(update: Dict[str, Any], workers: int) -> int:
+    """Pick the worker for an update: by chat, or by user for chat-less updates"""
+    for key in ('message', 'edited_message', 'channel_post', 'edited_channel_post', 'my_chat_member', 'chat_member',
+                'chat_join_request'):
+        if key in update and 'chat' in update[key]:
+            return abs(update[key]['chat']['id']) % workers
+    if 'callback_query' in update:
+        message = update['callback_query'].get('message')
+        if message:
+            return abs(message['chat']['id']) % workers
+        return abs(update['callback_query']['from']['id']) % workers
+    for key in ('inline_query', 'chosen_inline_result', 'shipping_query', 'pre_checkout_query', 'poll_answer'):
+        if key in update:
+            user = update[key].get('from') or update[key].get('user') or {}
+            return abs(user.get('id', 0)) % workers
+    return 0
+
+def worker_main(index: int, workers: int, updates: multiprocessing.Queue, heartbeat):
+    """Entry point of a worker process"""
+    logging.basicConfig(
+        format=f'%(asctime)s - worker{index} - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO,
+        force=True
+    )
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the front process coordinates shutdown
+
+    from config import Config
+    from bot.main import CustomizableBot
+
+    # Only worker 0 runs chat-independent maintenance jobs (seasons, pruning, ...)
+    Config.RUN_MAINTENANCE_JOBS = Config.RUN_MAINTENANCE_JOBS and index == 0
+    Config.SHARD = (index, workers)
+    if Config.METRICS_PORT:
+        Config.METRICS_PORT += index + 1
+
+    bot = CustomizableBot(receive_updates=False)
+    asyncio.run(bot.run_worker(updates, heartbeat))
+
+class ShardedRuntime:
+    """Front process routing updates to N worker processes by chat_id.
+
+    The front receives updates (polling or webhook, as configured) and hands
+    the raw update dicts to the worker that owns the chat, so each worker keeps
+    its chats' in-memory state and per-chat ordering is preserved. Workers send
+    heartbeats; dead or stuck workers are restarted on a fresh queue. Updates
+    still queued for the old process are dropped (and logged): a killed reader
+    can leave the old queue's lock held, so nothing could read them safely.
+    """
+
+    def __init__(self, workers: int, heartbeat_timeout: float = 30.0, health_interval: float = 5.0):
+        self.workers = workers
+        self.heartbeat_timeout = heartbeat_timeout
+        self.health_interval = health_interval
+        self._context = multiprocessing.get_context('spawn')
+        self._queues: List[multiprocessing.Queue] = [self._context.Queue() for _ in range(workers)]
+        self._heartbeats = [self._context.Value('d', 0.0) for _ in range(workers)]
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * workers
+        self.routed = [0] * workers
+        self.restarts = [0] * workers
+        self._stop_event = asyncio.Event()
+
+    def _start_worker(self, index: int):
+        self._heartbeats[index].value = time.time()
+        process = self._context.Process(
+            target=worker_main,
+            args=(index, self.workers, self._queues[index], self._heartbeats[index]),
+            name=f"bot-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        self._processes[index] = process
+        logger.info(f"👷 Worker {index} started (pid {process.pid})")
+
+    def _check_workers(self):
+        now = time.time()
+        for index, process in enumerate(self._processes):
+            stale = now - self._heartbeats[index].value > self.heartbeat_timeout
+            if process.is_alive() and not stale:
+                continue
+
+            reason = "stopped responding" if process.is_alive() else f"exited with code {process.exitcode}"
+            logger.warning(f"⚠️ Worker {index} {reason}; restarting")
+            if process.is_alive():
+                process.kill()
+            process.join(timeout=5)
+            # A killed reader may still hold the queue's lock; start over with a fresh queue
+            try:
+                lost = self._queues[index].qsize()
+            except NotImplementedError:  # macOS
+                lost = 0
+            self._queues[index].close()
+            self._queues[index] = self._context.Queue()
+            if lost:
+                logger.warning(f"⚠️ Dropped {lost} queued updates of worker {index}")
+            self.restarts[index] += 1
+            self._start_worker(index)
+
+    async def _supervise(self):
+        while not self._stop_event.is_set():
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), self.health_interval)
+            except asyncio.TimeoutError:
+                self._check_workers()
+
+    async def _route(self, update_queue: asyncio.Queue):
+        while True:
+            update = await update_queue.get()
+            data = update.to_dict()
+            index = shard_for(data, self.workers)
+            self._queues[index].put(data)
+            self.routed[index] += 1
+
+    def stop(self):
+        self._stop_event.set()
+
+    async def run(self):
+        from telegram import Bot
+        from telegram.ext import Updater
+        from bot.database import BotDatabase
+        from config import Config
+
+        if Config.STORAGE_BACKEND == 'memory':
+            logger.warning("⚠️ STORAGE_BACKEND=memory: every worker keeps its own, unshared data")
+        else:
+            # Create the schema once before workers race to do it
+            await BotDatabase(Config.DATABASE_PATH).initialize()
+
+        for index in range(self.workers):
+            self._start_worker(index)
+
+        base_url = Config.BOT_API_BASE_URL.rstrip('/') if Config.BOT_API_BASE_URL else None
+        bot = Bot(
+            Config.BOT_TOKEN,
+            **({'base_url': f"{base_url}/bot", 'base_file_url': f"{base_url}/file/bot"} if base_url else {})
+        )
+        update_queue: asyncio.Queue = asyncio.Queue()
+        updater = Updater(bot, update_queue)
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        async with updater:
+            if Config.BOT_MODE == 'webhook':
+                url_path = Config.WEBHOOK_PATH.lstrip('/')
+                await updater.start_webhook(
+                    listen=Config.WEBHOOK_LISTEN,
+                    port=Config.WEBHOOK_PORT,
+                    url_path=url_path,
+                    webhook_url=f"{Config.WEBHOOK_URL.rstrip('/')}/{url_path}" if Config.WEBHOOK_URL else None,
+                    secret_token=Config.WEBHOOK_SECRET or None,
+                    max_connections=Config.WEBHOOK_MAX_CONNECTIONS
+                )
+            else:
+                await updater.start_polling()
+            logger.info(f"🚦 Front process routing updates to {self.workers} workers")
+
+            router = asyncio.create_task(self._route(update_queue))
+            try:
+                await self._supervise()
+            finally:
+                router.cancel()
+                await updater.stop()
+
+        # Let workers drain their queues, then stop them
+        for updates in self._queues:
+            updates.put(None)
+        for process in self._processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+        logger.info(f"🛑 Sharded runtime stopped (routed per worker: {self.routed}, restarts: {self.restarts})")
+
+async def keep_alive(heartbeat, interval: float = 1.0):
+    """Heartbeat while a worker starts up (schema, warm-up, media index), before it takes updates"""
+    while True:
+        heartbeat.value = time.time()
+        await asyncio.sleep(interval)
+
+async def process_shard_updates(application, updates: multiprocessing.Queue, heartbeat, concurrency: int = 64):
+    """Worker loop: process updates from the front, in order per chat, concurrently across chats"""
+    from telegram import Update
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    chat_tails: Dict[int, asyncio.Task] = {}
+
+    async def process(previous: Optional[asyncio.Task], update: Update):
+        if previous:
+            await asyncio.wait([previous])
+        async with semaphore:
+            await application.process_update(update)
+
+    while True:
+        heartbeat.value = time.time()
+        try:
+            data = await loop.run_in_executor(None, updates.get, True, 1.0)
+        except queue.Empty:
+            continue
+        if data is None:
+            break
+
+        update = Update.de_json(data, application.bot)
+        chat_key = update.effective_chat.id if update.effective_chat else (
+            update.effective_user.id if update.effective_user else 0
+        )
+        task = asyncio.create_task(process(chat_tails.get(chat_key), update))
+        chat_tails[chat_key] = task
+        task.add_done_callback(
+            lambda done, key=chat_key: chat_tails.pop(key, None) if chat_tails.get(key) is done else None
+        )
+
+    if chat_tails:
+        await asyncio.wait(list(chat_tails.values()))
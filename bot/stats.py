@@ -0,0 +1,145 @@
+import time
+from typing import Dict, Any, List, Set, Tuple
+
+HOUR_SECONDS = 3600
+DAY_SECONDS = 86400
+
+# Counter slots used by the in-memory buckets
+MESSAGES, COMMANDS, XP = 0, 1, 2
+
+class StatsCollector:
+    """Incrementally aggregated chat/user statistics.
+
+    Updates are counted in memory as they arrive and periodically rolled up
+    into the hourly/daily stats tables by ``flush``. Stats views read the
+    rolled-up tables and add whatever is still pending in memory, so they never
+    scan ``user_ranks`` or message history.
+    """
+
+    def __init__(self, database):
+        self.db = database
+        # (chat_id, hour) -> [messages, commands, xp]
+        self._chat_hours: Dict[Tuple[int, int], List[int]] = {}
+        # (chat_id, user_id, day) -> [messages, commands, xp]
+        self._user_days: Dict[Tuple[int, int, int], List[int]] = {}
+        # (chat_id, day, command) -> uses
+        self._command_days: Dict[Tuple[int, int, str], int] = {}
+        # (chat_id, hour) / (chat_id, day) -> users seen; kept until the bucket closes
+        self._hour_users: Dict[Tuple[int, int], Set[int]] = {}
+        self._day_users: Dict[Tuple[int, int], Set[int]] = {}
+
+    @staticmethod
+    def current_hour(now: float = None) -> int:
+        """Hour bucket index (hours since epoch)"""
+        return int((now or time.time()) // HOUR_SECONDS)
+
+    @staticmethod
+    def current_day(now: float = None) -> int:
+        """Day bucket index (days since epoch)"""
+        return int((now or time.time()) // DAY_SECONDS)
+
+    def _bump(self, chat_id: int, user_id: int, slot: int, amount: int = 1):
+        now = time.time()
+        hour = self.current_hour(now)
+        day = self.current_day(now)
+
+        self._chat_hours.setdefault((chat_id, hour), [0, 0, 0])[slot] += amount
+        self._user_days.setdefault((chat_id, user_id, day), [0, 0, 0])[slot] += amount
+        self._hour_users.setdefault((chat_id, hour), set()).add(user_id)
+        self._day_users.setdefault((chat_id, day), set()).add(user_id)
+        return day
+
+    def record_message(self, chat_id: int, user_id: int):
+        """Count a message"""
+        self._bump(chat_id, user_id, MESSAGES)
+
+    def record_command(self, chat_id: int, user_id: int, command: str):
+        """Count a command use"""
+        day = self._bump(chat_id, user_id, COMMANDS)
+        key = (chat_id, day, command.lower())
+        self._command_days[key] = self._command_days.get(key, 0) + 1
+
+    def record_xp(self, chat_id: int, user_id: int, xp: int):
+        """Count XP earned"""
+        self._bump(chat_id, user_id, XP, xp)
+
+    async def flush(self):
+        """Roll pending counters up into the stats tables"""
+        current_hour = self.current_hour()
+        current_day = self.current_day()
+
+        chat_rows = []
+        for (chat_id, hour), counts in self._chat_hours.items():
+            active = len(self._hour_users.get((chat_id, hour), ()))
+            chat_rows.append((chat_id, hour, counts[MESSAGES], counts[COMMANDS], counts[XP], active))
+        user_rows = [
+            (chat_id, day, user_id, counts[MESSAGES], counts[COMMANDS], counts[XP])
+            for (chat_id, user_id, day), counts in self._user_days.items()
+        ]
+        command_rows = [
+            (chat_id, day, command, uses)
+            for (chat_id, day, command), uses in self._command_days.items()
+        ]
+
+        self._chat_hours = {}
+        self._user_days = {}
+        self._command_days = {}
+        # Active-user sets are only needed while their bucket is still open
+        self._hour_users = {
+            key: users for key, users in self._hour_users.items() if key[1] >= current_hour
+        }
+        self._day_users = {
+            key: users for key, users in self._day_users.items() if key[1] >= current_day
+        }
+
+        if chat_rows or user_rows or command_rows:
+            await self.db.flush_stats(chat_rows, user_rows, command_rows)
+
+    async def get_chat_summary(self, chat_id: int) -> Dict[str, Any]:
+        """Chat stats for the last 24 hours, today and the last 7 days"""
+        now = time.time()
+        hour = self.current_hour(now)
+        day = self.current_day(now)
+
+        summary = await self.db.get_chat_stats(chat_id, hour - 23, day - 6)
+
+        for (pending_chat, pending_hour), counts in self._chat_hours.items():
+            if pending_chat != chat_id:
+                continue
+            if pending_hour >= (day - 6) * 24:
+                summary['messages_7d'] += counts[MESSAGES]
+            if pending_hour > hour - 24:
+                summary['messages_24h'] += counts[MESSAGES]
+                summary['commands_24h'] += counts[COMMANDS]
+                summary['xp_24h'] += counts[XP]
+                summary['hourly'][pending_hour] = summary['hourly'].get(pending_hour, 0) + counts[MESSAGES]
+
+        # The in-memory sets cover everything seen since startup, the tables
+        # cover everything flushed, so the larger of the two is the best count
+        summary['active_today'] = max(
+            summary['active_today'], len(self._day_users.get((chat_id, day), ()))
+        )
+        summary['active_this_hour'] = max(
+            summary['active_this_hour'], len(self._hour_users.get((chat_id, hour), ()))
+        )
+
+        for (pending_chat, pending_day, command), uses in self._command_days.items():
+            if pending_chat == chat_id and pending_day > day - 7:
+                summary['top_commands'][command] = summary['top_commands'].get(command, 0) + uses
+
+        return summary
+
+    async def get_user_summary(self, user_id: int, chat_id: int) -> Dict[str, Any]:
+        """User stats for today and the last 7 days"""
+        day = self.current_day()
+        summary = await self.db.get_user_stats(user_id, chat_id, day - 6)
+
+        for (pending_chat, pending_user, pending_day), counts in self._user_days.items():
+            if pending_chat != chat_id or pending_user != user_id or pending_day <= day - 7:
+                continue
+            for key, slot in (('messages', MESSAGES), ('commands', COMMANDS), ('xp', XP)):
+                summary[f'{key}_7d'] += counts[slot]
+                if pending_day == day:
+                    summary[f'{key}_today'] += counts[slot]
+
+        return summary
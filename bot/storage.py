@@ -0,0 +1,478 @@
+import sys
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, Iterable, List, Any, Optional
+from datetime import datetime, date
+from types import MappingProxyType
+
+# Time windows for windowed leaderboards and how many periods of each are kept
+XP_WINDOWS = ('day', 'week', 'month')
+XP_WINDOW_RETENTION = {'day': 7, 'week': 5, 'month': 12}
+
+# game_data statuses of games that are over (retention drops them after GAME_RETENTION_DAYS)
+GAME_END_STATUSES = ('finished', 'expired', 'stopped')
+
+# Quota counters: media items per user, custom commands per chat
+QUOTA_MEDIA = 'media'
+QUOTA_COMMANDS = 'commands'
+
+class QuotaExceeded(Exception):
+    """An insert would take a user/chat past its quota"""
+
+    def __init__(self, scope: str, limit: int):
+        super().__init__(f"{scope} quota of {limit} reached")
+        self.scope = scope
+        self.limit = limit
+
+def window_periods(day: date = None) -> Dict[str, int]:
+    """Period index of each XP window for a date (Monday-based weeks)"""
+    day = day or datetime.now().date()
+    ordinal = day.toordinal()
+    return {
+        'day': ordinal,
+        'week': (ordinal - 1) // 7,
+        'month': day.year * 12 + day.month - 1
+    }
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+# Shared read-only defaults. Rows missing from storage are served as fresh
+# copies of these and only written by the first save, so lookups never write.
+DEFAULT_USER_SETTINGS = _freeze({
+    'username': '',
+    'preferred_language': 'en',
+    'custom_commands': {},
+    'theme': 'default',
+    'notification_preferences': {
+        'game_notifications': True,
+        'rank_updates': True,
+        'daily_rewards': True
+    }
+})
+
+DEFAULT_CHAT_SETTINGS = _freeze({
+    'chat_title': '',
+    'settings': {
+        'welcome_message': "👋 Welcome {name} to {chat}!",
+        'goodbye_message': "👋 Goodbye {name}! We'll miss you!",
+        'rules': "Be respectful to everyone!",
+        'max_warnings': 3,
+        'flood_limit': 5,
+        'flood_window': 10,
+        'mute_duration': 5,
+        'xp_per_message': 10,
+        'xp_per_level': 1000,
+        'daily_bonus_xp': 50
+    },
+    'custom_responses': {},
+    'enabled_features': {
+        'anti_spam': True, 'auto_mute': True, 'keyword_filter': True,
+        'flood_control': True, 'welcome_message': True, 'meme': True,
+        'video': True, 'greet_users': True, 'anti_link': True,
+        'report_system': True, 'message_counter': True, 'random_emoji': True,
+        'ranking_system': True, 'truth_or_dare': True, 'word_games': True,
+        'sticker_packs': True, 'gif_sharing': True, 'custom_commands': True,
+        'auto_detect_admins': True, 'owner_controls': True,
+        'rank_system': True, 'daily_rewards': True
+    },
+    'banned_words': ["badword1", "badword2", "spam"]
+})
+
+DEFAULT_USER_RANK = _freeze({
+    'xp': 0,
+    'level': 1,
+    'messages_count': 0,
+    'daily_streak': 0,
+    'rank_card_style': 'default',
+    'prestige': 0
+})
+
+def default_user_settings(user_id: int) -> Dict[str, Any]:
+    return dict(_thaw(DEFAULT_USER_SETTINGS), user_id=user_id)
+
+def default_chat_settings(chat_id: int) -> Dict[str, Any]:
+    return dict(_thaw(DEFAULT_CHAT_SETTINGS), chat_id=chat_id)
+
+def default_user_rank(user_id: int, chat_id: int) -> Dict[str, Any]:
+    return dict(DEFAULT_USER_RANK, user_id=user_id, chat_id=chat_id,
+                last_active=datetime.now().date().isoformat())
+
+# Bit of each known feature in ChatSettingsRecord.features (in-process only, never stored)
+FEATURES = tuple(DEFAULT_CHAT_SETTINGS['enabled_features'])
+FEATURE_BITS = {feature: 1 << bit for bit, feature in enumerate(FEATURES)}
+ALL_FEATURES = (1 << len(FEATURES)) - 1
+
+def _shared(value: Any, default: Any) -> Any:
+    """Frozen ``value``, or the shared ``default`` object when they are equal"""
+    frozen = _freeze(value)
+    return default if frozen == default else frozen
+
+class RankRecord:
+    """One user's rank in one chat, for backends that keep ranks in process.
+
+    Slots instead of a dict and interned strings (dates and card styles
+    repeat across users) keep a row at well under half the size of a dict.
+    """
+
+    __slots__ = FIELDS = (
+        'user_id', 'chat_id', 'xp', 'level', 'messages_count', 'daily_streak',
+        'last_active', 'rank_card_style', 'prestige'
+    )
+
+    def __init__(self, user_id: int, chat_id: int, xp: int, level: int, messages_count: int,
+                 daily_streak: int, last_active: str, rank_card_style: str, prestige: int):
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.xp = xp
+        self.level = level
+        self.messages_count = messages_count
+        self.daily_streak = daily_streak
+        self.last_active = sys.intern(last_active) if last_active else last_active
+        self.rank_card_style = sys.intern(rank_card_style) if rank_card_style else rank_card_style
+        self.prestige = prestige
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RankRecord':
+        return cls(*(data[field] for field in cls.FIELDS))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+class ChatSettingsRecord:
+    """Read-only chat settings as held in caches.
+
+    Enabled features are packed into the ``features`` bitmask (names not
+    in FEATURES go to ``extra_features``), so feature checks are a bit
+    test. Nested values are frozen, and values equal to the defaults share
+    the default objects, so a chat that changed nothing costs a few slots.
+    The chat id is the cache key and is not stored.
+    """
+
+    __slots__ = (
+        'chat_title', 'settings', 'custom_responses', 'features', 'extra_features',
+        'banned_words', 'welcome_message', 'goodbye_message', 'rules'
+    )
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.chat_title = settings.get('chat_title') or ''
+        self.settings = _shared(settings.get('settings') or {}, DEFAULT_CHAT_SETTINGS['settings'])
+        self.custom_responses = _shared(settings.get('custom_responses') or {}, DEFAULT_CHAT_SETTINGS['custom_responses'])
+        self.banned_words = _shared(settings.get('banned_words') or [], DEFAULT_CHAT_SETTINGS['banned_words'])
+        self.features = ALL_FEATURES  # features missing from the dict are enabled
+        self.extra_features = None
+        for feature, enabled in (settings.get('enabled_features') or {}).items():
+            bit = FEATURE_BITS.get(feature)
+            if bit is None:
+                self.extra_features = self.extra_features or {}
+                self.extra_features[feature] = bool(enabled)
+            elif not enabled:
+                self.features &= ~bit
+        self.welcome_message = settings.get('welcome_message')
+        self.goodbye_message = settings.get('goodbye_message')
+        self.rules = settings.get('rules')
+
+    def has_feature(self, feature: str) -> bool:
+        bit = FEATURE_BITS.get(feature)
+        if bit is not None:
+            return bool(self.features & bit)
+        return self.extra_features.get(feature, True) if self.extra_features else True
+
+    def to_dict(self, chat_id: int) -> Dict[str, Any]:
+        """Mutable settings dict in the shape get_chat_settings returns"""
+        enabled_features = {feature: bool(self.features & bit) for feature, bit in FEATURE_BITS.items()}
+        if self.extra_features:
+            enabled_features.update(self.extra_features)
+        settings = {
+            'chat_id': chat_id,
+            'chat_title': self.chat_title,
+            'settings': _thaw(self.settings),
+            'custom_responses': _thaw(self.custom_responses),
+            'enabled_features': enabled_features,
+            'banned_words': _thaw(self.banned_words)
+        }
+        for key in ('welcome_message', 'goodbye_message', 'rules'):
+            if getattr(self, key) is not None:
+                settings[key] = getattr(self, key)
+        return settings
+
+DEFAULT_CHAT_RECORD = ChatSettingsRecord(default_chat_settings(0))
+
+def merge_media_tags(tags: List[str], category: str, new_tags: List[str], new_category: str) -> List[str]:
+    """Tags of a media item after the same file was added again.
+
+    A row has one category, so a different category is kept as a tag
+    (category filters also match tags).
+    """
+    merged = list(tags)
+    for tag in list(new_tags) + ([new_category] if new_category and new_category != category else []):
+        if tag not in merged:
+            merged.append(tag)
+    return merged
+
+def collapse_media_items(items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Normalize bulk-import items and fold repeats of the same file_unique_id together"""
+    collapsed = []
+    by_unique_id = {}
+    for item in items:
+        entry = {
+            'media_type': item['media_type'], 'file_id': item['file_id'],
+            'file_unique_id': item.get('file_unique_id') or None,
+            'tags': list(item.get('tags') or []), 'category': item.get('category') or 'general'
+        }
+        first = by_unique_id.get(entry['file_unique_id'])
+        if first:
+            first['tags'] = merge_media_tags(first['tags'], first['category'], entry['tags'], entry['category'])
+            continue
+        if entry['file_unique_id']:
+            by_unique_id[entry['file_unique_id']] = entry
+        collapsed.append(entry)
+    return collapsed
+
+class SettingsRepository(ABC):
+    @abstractmethod
+    async def get_user_settings(self, user_id: int) -> Dict[str, Any]: ...
+
+    @abstractmethod
+    async def save_user_settings(self, user_id: int, settings: Dict[str, Any]): ...
+
+    @abstractmethod
+    async def get_chat_settings(self, chat_id: int) -> Dict[str, Any]: ...
+
+    @abstractmethod
+    async def save_chat_settings(self, chat_id: int, settings: Dict[str, Any]): ...
+
+    async def is_feature_enabled(self, chat_id: int, feature: str) -> bool:
+        chat_settings = await self.get_chat_settings(chat_id)
+        return chat_settings['enabled_features'].get(feature, True)
+
+    @abstractmethod
+    async def get_global_setting(self, setting_key: str, default: Any = None) -> Any: ...
+
+    @abstractmethod
+    async def set_global_setting(self, setting_key: str, setting_value: Any, description: str = ""): ...
+
+    async def set_default_global_settings(self, defaults: Dict[str, Any]) -> int:
+        """Store the settings that are not set yet; returns how many were added"""
+        added = 0
+        for key, value in defaults.items():
+            if await self.get_global_setting(key) is None:
+                await self.set_global_setting(key, value, f"Default {key}")
+                added += 1
+        return added
+
+class RankRepository(ABC):
+    @abstractmethod
+    async def get_user_rank(self, user_id: int, chat_id: int) -> Dict[str, Any]: ...
+
+    @abstractmethod
+    async def save_user_rank(self, user_id: int, chat_id: int, rank_data: Dict[str, Any],
+                             xp_gained: int = 0, messages_gained: int = 0, display_name: Optional[str] = None):
+        """Save rank row; gained XP/messages are added to the global and windowed totals.
+
+        ``display_name`` is kept with the global totals for the global leaderboard.
+        """
+
+    @abstractmethod
+    async def get_leaderboard(self, chat_id: int, limit: int = 10) -> List[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def get_leaderboard_page(self, chat_id: int, after: Optional[tuple] = None,
+                                   before: Optional[tuple] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Leaderboard page after/before a (level, xp, messages_count, user_id) key"""
+
+    @abstractmethod
+    async def get_window_leaderboard(self, chat_id: int, window: str, limit: int = 10) -> List[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def prune_xp_windows(self) -> int: ...
+
+    @abstractmethod
+    async def get_user_rank_position(self, user_id: int, chat_id: int) -> int: ...
+
+    @abstractmethod
+    async def run_season_reset(self, chat_id: Optional[int] = None, prestige_level: int = 10,
+                               reset_prestige: bool = False) -> int:
+        """Archive standings and start a new season; returns the number of archived rows"""
+
+    @abstractmethod
+    async def get_current_season(self, chat_id: int) -> int: ...
+
+    @abstractmethod
+    async def get_season_history(self, chat_id: int, season: int, limit: int = 10) -> List[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def get_global_leaderboard(self, limit: int = 10) -> List[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def get_global_rank(self, user_id: int) -> Optional[Dict[str, Any]]: ...
+
+    async def add_user_xp(self, user_id: int, chat_id: int, xp: int):
+        rank_data = await self.get_user_rank(user_id, chat_id)
+        rank_data['xp'] += xp
+        rank_data['messages_count'] += 1
+        rank_data['last_active'] = datetime.now().date().isoformat()
+
+        xp_needed = rank_data['level'] * 1000
+        if rank_data['xp'] >= xp_needed:
+            rank_data['level'] += 1
+            rank_data['xp'] = rank_data['xp'] - xp_needed
+
+        await self.save_user_rank(user_id, chat_id, rank_data, xp_gained=xp, messages_gained=1)
+        return rank_data
+
+    async def update_daily_streak(self, user_id: int, chat_id: int):
+        rank_data = await self.get_user_rank(user_id, chat_id)
+        today = datetime.now().date()
+        last_active = datetime.fromisoformat(rank_data['last_active']).date()
+
+        if last_active == today:
+            return rank_data['daily_streak']
+
+        if (today - last_active).days == 1:
+            rank_data['daily_streak'] += 1
+        else:
+            rank_data['daily_streak'] = 1
+
+        rank_data['last_active'] = today.isoformat()
+        await self.save_user_rank(user_id, chat_id, rank_data)
+        return rank_data['daily_streak']
+
+class MediaRepository(ABC):
+    @abstractmethod
+    async def add_media(self, user_id: int, media_type: str, file_id: str,
+                        tags: List[str] = None, category: str = "general",
+                        file_unique_id: Optional[str] = None, limit: Optional[int] = None) -> bool:
+        """Store a media item; returns False when the file (by file_unique_id) was
+        already stored and its tags were merged into the existing row.
+        Raises QuotaExceeded if the user already has ``limit`` items"""
+
+    @abstractmethod
+    async def get_random_media(self, media_type: str, category: str = None,
+                               tags: List[str] = None) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def get_user_media_page(self, user_id: int, media_type: str = None, after_id: Optional[int] = None,
+                                  before_id: Optional[int] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Newest-first page of a user's media after/before a media_id"""
+
+    @abstractmethod
+    async def get_media_counts(self, user_id: int) -> Dict[str, int]:
+        """Number of items per media type in a user's library"""
+
+    async def get_user_media(self, user_id: int, media_type: str = None) -> List[Dict[str, Any]]:
+        return [media async for media in self.iter_media(user_id, media_type)]
+
+    @abstractmethod
+    async def increment_media_usage(self, media_id: int): ...
+
+    @abstractmethod
+    async def add_media_bulk(self, user_id: int, items: Iterable[Dict[str, Any]],
+                             batch_size: int = 500, limit: Optional[int] = None) -> Dict[str, int]:
+        """Store many items (media_type, file_id and optional file_unique_id, tags,
+        category) in one transaction; returns 'added', 'merged' and 'over_quota' counts.
+
+        New items past the user's remaining ``limit`` are skipped (merges are
+        always allowed, as with add_media).
+        """
+
+    @abstractmethod
+    def iter_media(self, user_id: Optional[int] = None, media_type: str = None,
+                   batch_size: int = 500, after_id: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a user's library (everything without user_id) in media_id order, after ``after_id``"""
+
+    @abstractmethod
+    async def get_media_without_unique_id(self, after_id: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Rows stored before file_unique_id was recorded, in media_id order"""
+
+    @abstractmethod
+    async def set_media_unique_id(self, media_id: int, file_unique_id: str) -> bool:
+        """Record a row's file_unique_id; returns True if it was merged into an existing row"""
+
+class CommandRepository(ABC):
+    @abstractmethod
+    async def add_custom_command(self, chat_id: int, command_name: str,
+                                 command_response: str, created_by: int, limit: Optional[int] = None):
+        """Raises QuotaExceeded if the chat already has ``limit`` commands"""
+
+    @abstractmethod
+    async def get_custom_commands(self, chat_id: int) -> List[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def increment_command_usage(self, command_id: int): ...
+
+class WarningRepository(ABC):
+    @abstractmethod
+    async def add_warning(self, chat_id: int, user_id: int, reason: str, warned_by: int): ...
+
+    @abstractmethod
+    async def get_user_warnings(self, chat_id: int, user_id: int) -> List[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def clear_warnings(self, chat_id: int, user_id: int): ...
+
+class GameRepository(ABC):
+    @abstractmethod
+    async def create_game(self, chat_id: int, game_type: str, game_state: Dict[str, Any],
+                          players: List[int]) -> int: ...
+
+    @abstractmethod
+    async def update_game(self, game_id: int, game_state: Dict[str, Any], players: List[int]):
+        """Rewrite the state of a game that is still active"""
+
+    @abstractmethod
+    async def finish_game(self, game_id: int, game_state: Dict[str, Any], players: List[int],
+                          status: str = 'finished'): ...
+
+    @abstractmethod
+    async def get_active_games(self) -> List[Dict[str, Any]]: ...
+
+class QuotaRepository(ABC):
+    @abstractmethod
+    async def get_quota_usage(self, scope: str, owner_id: int) -> int:
+        """Items counted against a quota (QUOTA_MEDIA per user, QUOTA_COMMANDS per chat)"""
+
+class StatsRepository(ABC):
+    @abstractmethod
+    async def flush_stats(self, chat_rows: List[tuple], user_rows: List[tuple], command_rows: List[tuple]):
+        """Add pending counters: (chat_id, hour, messages, commands, xp, active_users),
+        (chat_id, day, user_id, messages, commands, xp) and (chat_id, day, command, uses) rows"""
+
+    @abstractmethod
+    async def get_chat_stats(self, chat_id: int, since_hour: int, since_day: int) -> Dict[str, Any]: ...
+
+    @abstractmethod
+    async def get_user_stats(self, user_id: int, chat_id: int, since_day: int) -> Dict[str, Any]: ...
+
+class Storage(SettingsRepository, RankRepository, MediaRepository, CommandRepository,
+              WarningRepository, GameRepository, QuotaRepository, StatsRepository):
+    """Everything the bot persists. Handlers only talk to storage through these methods.
+
+    Implementations: BotDatabase (SQLite) and MemoryStorage (tests, benchmarks, load tests).
+    """
+
+    profiler = None
+
+    @abstractmethod
+    async def initialize(self):
+        """Create tables/structures; safe to call more than once"""
+
+    async def warm_up(self, active_days: int = 7, max_chats: int = 5000,
+                      shard: Optional[tuple] = None) -> int:
+        """Preload hot per-chat data into memory; returns the number of chats loaded"""
+        return 0
+
+    async def apply_retention(self, warning_days: int = 0, game_days: int = 0, inactive_months: int = 0,
+                              batch_size: int = 1000, vacuum_pages: int = 2000) -> Dict[str, int]:
+        """Drop or archive data past its retention period; returns counts per policy"""
+        return {}
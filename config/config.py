@@ -9,6 +9,22 @@ class Config:
     
     # Database Configuration
     DATABASE_PATH = os.getenv("DATABASE_PATH", "bot_database.db")
+    # Storage backend: 'sqlite' or 'memory' (nothing persisted; for tests and load tests)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite").lower()
+    
+    # Bot API server (leave empty for api.telegram.org; set for a local/fake server)
+    BOT_API_BASE_URL = os.getenv("BOT_API_BASE_URL", "")
+    
+    # Update delivery: 'polling' or 'webhook'
+    BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+    
+    # Webhook Configuration (BOT_MODE=webhook)
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # public base URL, e.g. https://bot.example.com
+    WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+    WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
     
     # Bot Settings
     ADMIN_IDS = [int(x) for x in os.getenv("ADMIN_IDS", "").split(",") if x]
@@ -36,6 +52,57 @@ class Config:
     # Media Limits
     MAX_MEDIA_PER_USER = int(os.getenv("MAX_MEDIA_PER_USER", "100"))
     MAX_CUSTOM_COMMANDS = int(os.getenv("MAX_CUSTOM_COMMANDS", "50"))
+    # Inline media search: seconds between index rebuilds and Telegram's result cache time
+    MEDIA_INDEX_REFRESH = int(os.getenv("MEDIA_INDEX_REFRESH", "600"))
+    INLINE_CACHE_TIME = int(os.getenv("INLINE_CACHE_TIME", "60"))
+    
+    # Prometheus metrics endpoint (0 disables metrics collection)
+    METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+    
+    # Query profiling (opt-in): slow-query log and periodic EXPLAIN QUERY PLAN
+    DB_PROFILING = os.getenv("DB_PROFILING", "false").lower() in ("1", "true", "yes", "on")
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "50"))
+    QUERY_PLAN_INTERVAL = int(os.getenv("QUERY_PLAN_INTERVAL", "600"))  # seconds
+    
+    # Backups (interval is the 'backup_interval_hours' global setting, 0 disables)
+    BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+    BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+    
+    # Retention (0 disables a policy); runs every RETENTION_INTERVAL_HOURS in small batches
+    WARNING_RETENTION_DAYS = int(os.getenv("WARNING_RETENTION_DAYS", "90"))
+    GAME_RETENTION_DAYS = int(os.getenv("GAME_RETENTION_DAYS", "7"))
+    INACTIVE_USER_MONTHS = int(os.getenv("INACTIVE_USER_MONTHS", "12"))
+    RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "1000"))
+    RETENTION_INTERVAL_HOURS = int(os.getenv("RETENTION_INTERVAL_HOURS", "24"))
+    VACUUM_PAGES = int(os.getenv("VACUUM_PAGES", "2000"))  # free pages returned per run
+    
+    # Startup cache warm-up: preload settings/custom commands of chats active in the last N days
+    WARMUP_ACTIVE_DAYS = int(os.getenv("WARMUP_ACTIVE_DAYS", "7"))
+    WARMUP_MAX_CHATS = int(os.getenv("WARMUP_MAX_CHATS", "5000"))
+    
+    # Game content packs: <CONTENT_DIR>/<language>.json with truths, dares and words per difficulty
+    CONTENT_DIR = os.getenv("CONTENT_DIR", "content")
+    # Game timers: word games reveal WORD_GAME_HINTS hints before timing out (0 = no timeout)
+    WORD_GAME_TIMEOUT = int(os.getenv("WORD_GAME_TIMEOUT", "120"))  # seconds
+    WORD_GAME_HINTS = int(os.getenv("WORD_GAME_HINTS", "2"))
+    TOD_TURN_SECONDS = int(os.getenv("TOD_TURN_SECONDS", "60"))
+    TOD_TURNS = int(os.getenv("TOD_TURNS", "10"))
+    
+    # Stats
+    STATS_FLUSH_INTERVAL = int(os.getenv("STATS_FLUSH_INTERVAL", "60"))  # seconds
+    
+    # Seasons (0 disables automatic season resets)
+    SEASON_LENGTH_DAYS = int(os.getenv("SEASON_LENGTH_DAYS", "0"))
+    SEASON_PRESTIGE_LEVEL = int(os.getenv("SEASON_PRESTIGE_LEVEL", "10"))
+    
+    # Sharding (scripts/run_sharded.py): worker processes and their health checks
+    SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", "4"))
+    SHARD_HEARTBEAT_TIMEOUT = float(os.getenv("SHARD_HEARTBEAT_TIMEOUT", "30"))  # seconds
+    SHARD_HEALTH_INTERVAL = float(os.getenv("SHARD_HEALTH_INTERVAL", "5"))  # seconds
+    # Chat-independent jobs (season resets, pruning, ...); only one process should run them
+    RUN_MAINTENANCE_JOBS = os.getenv("RUN_MAINTENANCE_JOBS", "true").lower() in ("1", "true", "yes", "on")
+    SHARD = None  # (index, workers), set inside worker processes
 
 # Validate required settings
 if not Config.BOT_TOKEN:
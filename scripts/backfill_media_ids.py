@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+One-off pass that records file_unique_id for media stored before deduplication
+
+Looks each old row up with getFile, stores its file_unique_id and merges it
+into an existing row when the same file was already stored (tags, categories
+and usage counts are combined). Safe to rerun; rows that fail (e.g. files over
+the Bot API's 20 MB getFile limit) are left as they are:
+    python scripts/backfill_media_ids.py --delay 0.05
+"""
+
+import argparse
+import asyncio
+from telegram import Bot
+from telegram.error import RetryAfter, TelegramError
+from bot.database import BotDatabase
+from config import Config
+
+async def backfill(db: BotDatabase, bot: Bot, batch_size: int, delay: float) -> dict:
+    counts = {'updated': 0, 'merged': 0, 'failed': 0}
+    after_id = 0
+    while True:
+        rows = await db.get_media_without_unique_id(after_id, batch_size)
+        if not rows:
+            return counts
+        for row in rows:
+            after_id = row['media_id']
+            try:
+                file = await bot.get_file(row['file_id'])
+            except RetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+                file = await bot.get_file(row['file_id'])
+            except TelegramError as e:
+                print(f"⚠️ media {row['media_id']}: {e}")
+                counts['failed'] += 1
+                continue
+            merged = await db.set_media_unique_id(row['media_id'], file.file_unique_id)
+            counts['merged' if merged else 'updated'] += 1
+            await asyncio.sleep(delay)
+
+async def run(batch_size: int, delay: float):
+    db = BotDatabase(Config.DATABASE_PATH)
+    await db.initialize()
+    base_url = Config.BOT_API_BASE_URL.rstrip('/') if Config.BOT_API_BASE_URL else None
+    bot = Bot(
+        Config.BOT_TOKEN,
+        **({'base_url': f"{base_url}/bot", 'base_file_url': f"{base_url}/file/bot"} if base_url else {})
+    )
+    async with bot:
+        counts = await backfill(db, bot, batch_size, delay)
+    print(f"✅ {counts['updated']} rows updated, {counts['merged']} duplicates merged, {counts['failed']} failed")
+
+def main():
+    parser = argparse.ArgumentParser(description="Record file_unique_id for old media rows and merge duplicates")
+    parser.add_argument('--batch-size', type=int, default=100, help="Rows read per query")
+    parser.add_argument('--delay', type=float, default=0.05, help="Seconds between getFile calls")
+    args = parser.parse_args()
+    asyncio.run(run(args.batch_size, args.delay))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for BotDatabase and RankSystem hot paths
+
+Seeds databases of realistic sizes, times each operation and compares the
+results with a JSON baseline. Exits non-zero when an operation got slower
+than the baseline by more than the allowed threshold:
+    python scripts/benchmark.py --ranks 10000,100000 --media 100000
+    python scripts/benchmark.py --update-baseline
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from bot.database import BotDatabase
+from bot.rank_system import RankSystem
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+MEDIA_TYPES = ['sticker', 'gif', 'meme', 'video']
+CATEGORIES = ['general', 'funny', 'cute', 'reaction', 'anime', 'sports', 'music', 'games', 'food', 'memes']
+TAGS = ['happy', 'sad', 'cat', 'dog', 'lol', 'wow', 'love', 'angry', 'party', 'hello', 'bye', 'yes', 'no']
+CHATS = 50
+
+def seed_database(path: str, ranks: int, media: int, seed: int):
+    """Bulk-load rank and media rows straight through sqlite3"""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        'INSERT INTO user_ranks (user_id, chat_id, xp, level, messages_count, daily_streak, last_active) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        (
+            (idx, -(idx % CHATS) - 1, rng.randint(0, 999), rng.randint(1, 60),
+             rng.randint(0, 50000), rng.randint(0, 30), '2024-01-01')
+            for idx in range(ranks)
+        )
+    )
+    conn.executemany(
+        'INSERT INTO media_storage (user_id, media_type, file_id, tags, category, usage_count) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        (
+            (rng.randint(1, 5000), rng.choice(MEDIA_TYPES), f"FILE_{idx}",
+             json.dumps(rng.sample(TAGS, 3)), rng.choice(CATEGORIES), rng.randint(0, 1000))
+            for idx in range(media)
+        )
+    )
+    conn.commit()
+    conn.close()
+
+async def time_operation(operation, iterations: int, warmup: int = 5) -> dict:
+    for _ in range(warmup):
+        await operation()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await operation()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    samples.sort()
+    return {
+        'median_ms': round(statistics.median(samples), 4),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        'iterations': iterations
+    }
+
+async def run_suite(ranks: int, media: int, iterations: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    workdir = tempfile.mkdtemp(prefix='bot-bench-')
+    path = os.path.join(workdir, f'bench_{ranks}.db')
+
+    db = BotDatabase(path)
+    await db.initialize()
+    seed_database(path, ranks, media, seed)
+
+    rank_system = RankSystem(db)
+    chat_ids = [-(idx + 1) for idx in range(CHATS)]
+    rank_data = {
+        'xp': 420, 'level': 12, 'prestige': 1, 'daily_streak': 5,
+        'messages_count': 1234, 'rank_card_style': 'detailed'
+    }
+    user_data = {'username': 'bench_user', 'first_name': 'Bench'}
+
+    def random_member():
+        user_id = rng.randrange(ranks)
+        return user_id, -(user_id % CHATS) - 1
+
+    async def get_chat_settings():
+        # Drop the in-process cache so the query itself is timed, not a dict hit
+        db._chat_settings_cache.clear()
+        await db.get_chat_settings(rng.choice(chat_ids))
+
+    async def get_chat_settings_cached():
+        # One chat, so after the warm-up every call is a cache hit
+        await db.get_chat_settings(chat_ids[0])
+
+    async def add_user_xp():
+        await db.add_user_xp(*random_member(), 10)
+
+    async def get_leaderboard():
+        await db.get_leaderboard(rng.choice(chat_ids), 10)
+
+    async def get_user_rank_position():
+        await db.get_user_rank_position(*random_member())
+
+    async def get_random_media():
+        await db.get_random_media(rng.choice(MEDIA_TYPES), rng.choice(CATEGORIES), [rng.choice(TAGS)])
+
+    async def generate_rank_card():
+        rank_system.generate_rank_card(user_data, rank_data, rng.randint(1, 1000), {})
+
+    operations = {
+        'get_chat_settings': get_chat_settings,
+        'get_chat_settings_cached': get_chat_settings_cached,
+        'add_user_xp': add_user_xp,
+        'get_leaderboard': get_leaderboard,
+        'get_user_rank_position': get_user_rank_position,
+        'get_random_media': get_random_media,
+        'generate_rank_card': generate_rank_card
+    }
+
+    results = {}
+    for name, operation in operations.items():
+        # Every seeded dimension is in the key, so only runs of the same sizes are compared
+        key = f"{name}@ranks={ranks},media={media}"
+        results[key] = await time_operation(operation, iterations)
+        print(f"  {name:<24} ranks={ranks:<8} media={media:<8} median {results[key]['median_ms']:.3f}ms")
+
+    os.remove(path)
+    return results
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Return (name, baseline_ms, current_ms) for every regressed operation"""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]['median_ms']
+        after = result['median_ms']
+        if before > 0 and (after - before) / before > threshold:
+            regressions.append((name, before, after))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BotDatabase and RankSystem operations")
+    parser.add_argument('--ranks', default="10000,100000", help="Comma separated user_ranks sizes to seed")
+    parser.add_argument('--media', type=int, default=100000, help="media_storage rows to seed")
+    parser.add_argument('--iterations', type=int, default=200, help="Timed calls per operation")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed slowdown (0.25 = 25%%)")
+    parser.add_argument('--update-baseline', action='store_true', help="Write results as the new baseline")
+    parser.add_argument('--output', help="Also write this run's results to a JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    for ranks in (int(size) for size in args.ranks.split(',') if size):
+        print(f"🌱 Seeding {ranks} rank rows and {args.media} media rows...")
+        results.update(asyncio.run(run_suite(ranks, args.media, args.iterations, args.seed)))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"ℹ️ No baseline at {args.baseline}; run with --update-baseline to create one")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"❌ {len(regressions)} operation(s) regressed by more than {args.threshold:.0%}:")
+        for name, before, after in regressions:
+            print(f"  {name}: {before:.3f}ms -> {after:.3f}ms")
+        raise SystemExit(1)
+
+    print(f"✅ No regressions beyond {args.threshold:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Telegram Bot API, for offline load and regression tests
+
+Serves /bot<token>/<method> over plain HTTP. Updates pushed with
+``enqueue_update`` are handed out through long-polling getUpdates; outgoing
+calls (sendMessage, restrictChatMember, ...) are answered with plausible
+results and counted per method.
+
+Run standalone with:
+    python scripts/fake_bot_api.py --port 8081
+and point the bot at it with BOT_API_BASE_URL=http://127.0.0.1:8081
+Updates can be injected by POSTing JSON to /_fake/enqueue.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import parse_qs
+
+BOT_USER = {
+    'id': 100000001,
+    'is_bot': True,
+    'first_name': 'FakeBot',
+    'username': 'fake_bot',
+    'can_join_groups': True,
+    'can_read_all_group_messages': True,
+    'supports_inline_queries': True
+}
+
+class FakeBotApi:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8081, admin_ids: Set[int] = None):
+        self.host = host
+        self.port = port
+        self.admin_ids = admin_ids or set()
+        self.calls: Dict[str, int] = {}
+        self.sent_messages: List[Dict[str, Any]] = []
+        self._updates: deque = deque()
+        self._new_updates = asyncio.Event()
+        self._message_ids = itertools.count(1)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.Task] = set()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def pending_updates(self) -> int:
+        return len(self._updates)
+
+    def enqueue_update(self, update: Dict[str, Any]):
+        """Queue an update for the next getUpdates call"""
+        self._updates.append(update)
+        self._new_updates.set()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            # Drop keep-alive connections and pending long polls
+            for task in self._connections:
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                _, path, _ = request_line.decode('latin-1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                if path.startswith('/_fake/enqueue'):
+                    # Test hook: POST one update or a list of updates as JSON
+                    updates = json.loads(body or b'[]')
+                    for update in updates if isinstance(updates, list) else [updates]:
+                        self.enqueue_update(update)
+                    result = len(self._updates)
+                else:
+                    params = self._parse_params(headers.get('content-type', ''), body)
+                    method = path.rstrip('/').rsplit('/', 1)[-1].split('?')[0]
+                    result = await self._dispatch(method, params)
+
+                payload = json.dumps({'ok': True, 'result': result}).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(payload)}\r\nConnection: keep-alive\r\n\r\n".encode()
+                    + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    @staticmethod
+    def _parse_params(content_type: str, body: bytes) -> Dict[str, Any]:
+        if not body:
+            return {}
+        if content_type.startswith('application/json'):
+            return json.loads(body)
+        if content_type.startswith('multipart/form-data'):
+            # File uploads are irrelevant here; keep the plain form fields
+            boundary = content_type.split('boundary=', 1)[1].strip('"').encode()
+            params = {}
+            for part in body.split(b'--' + boundary):
+                head, _, value = part.partition(b'\r\n\r\n')
+                if b'name="' not in head or b'filename=' in head:
+                    continue
+                name = head.split(b'name="', 1)[1].split(b'"', 1)[0].decode()
+                params[name] = value.rstrip(b'\r\n').decode(errors='replace')
+        else:
+            params = {key: values[0] for key, values in parse_qs(body.decode()).items()}
+
+        for key, value in params.items():
+            try:
+                params[key] = json.loads(value)
+            except (TypeError, ValueError):
+                pass
+        return params
+
+    async def _dispatch(self, method: str, params: Dict[str, Any]) -> Any:
+        method = method.lower()
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+        if method == 'getme':
+            return BOT_USER
+        if method == 'getupdates':
+            return await self._get_updates(params)
+        if method in ('sendmessage', 'sendsticker', 'sendanimation', 'sendphoto', 'sendvideo', 'senddocument'):
+            return self._sent_message(method, params)
+        if method == 'editmessagetext':
+            return self._sent_message(method, params)
+        if method == 'getchatmember':
+            return self._chat_member(int(params.get('user_id', 0)))
+        if method == 'getchat':
+            chat_id = int(params.get('chat_id', 0))
+            return {'id': chat_id, 'type': 'supergroup' if chat_id < 0 else 'private', 'title': f'Chat {chat_id}'}
+        # restrictChatMember, deleteMessage, answerCallbackQuery, setWebhook, deleteWebhook, ...
+        return True
+
+    async def _get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        offset = int(params.get('offset') or 0)
+        limit = int(params.get('limit') or 100)
+        timeout = float(params.get('timeout') or 0)
+
+        # Anything below the offset has been confirmed by the client
+        while self._updates and self._updates[0]['update_id'] < offset:
+            self._updates.popleft()
+
+        if not self._updates and timeout:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        return list(itertools.islice(self._updates, limit))
+
+    def _sent_message(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        chat_id = int(params.get('chat_id') or 0)
+        message = {
+            'message_id': int(params.get('message_id') or next(self._message_ids)),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'supergroup' if chat_id < 0 else 'private'},
+            'from': BOT_USER,
+            'text': params.get('text', '')
+        }
+        self.sent_messages.append({
+            'method': method, 'chat_id': chat_id, 'at': time.perf_counter(),
+            'reply_to': int(params.get('reply_to_message_id') or 0)
+        })
+        return message
+
+    def _chat_member(self, user_id: int) -> Dict[str, Any]:
+        user = {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}', 'username': f'user{user_id}'}
+        if user_id in self.admin_ids:
+            return {'status': 'creator', 'user': user, 'is_anonymous': False}
+        return {'status': 'member', 'user': user}
+
+async def serve(host: str, port: int):
+    api = FakeBotApi(host, port)
+    await api.start()
+    print(f"🧪 Fake Bot API listening on {api.base_url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await api.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stand-in Telegram Bot API server")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8081)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
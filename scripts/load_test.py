@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+End-to-end load generator: runs the bot against the fake Bot API
+
+Simulates N chats x M users sending messages and commands, then reports
+updates/sec, p50/p99 handler latency, Bot API calls and DB write counts.
+Every command is expected to get a reply; unanswered commands fail the run.
+No Telegram token or network access is needed:
+    python scripts/load_test.py --chats 50 --users 20 --messages 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+COMMANDS = ['/rank', '/leaderboard', '/stats', '/daily', '/warnings', '/commands']
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def build_updates(chats: int, users: int, messages: int, command_ratio: float, seed: int):
+    """Yield message updates round-robin over chats and users"""
+    rng = random.Random(seed)
+    update_id = 0
+    for round_idx in range(messages):
+        for chat_idx in range(chats):
+            chat_id = -1001000000000 - chat_idx
+            for user_idx in range(users):
+                update_id += 1
+                user_id = 10000 + user_idx
+                message = {
+                    'message_id': update_id,
+                    'date': int(time.time()),
+                    'chat': {'id': chat_id, 'type': 'supergroup', 'title': f'Load Chat {chat_idx}'},
+                    'from': {'id': user_id, 'is_bot': False, 'first_name': f'User{user_idx}', 'username': f'user{user_idx}'}
+                }
+                if rng.random() < command_ratio:
+                    command = rng.choice(COMMANDS)
+                    message['text'] = command
+                    message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(command)}]
+                else:
+                    message['text'] = f"hello from user {user_idx} round {round_idx} " + "x" * rng.randint(0, 40)
+                yield {'update_id': update_id, 'message': message}
+
+async def run_load_test(args) -> dict:
+    from scripts.fake_bot_api import FakeBotApi
+
+    api = FakeBotApi(port=args.port, admin_ids={10000})
+    await api.start()
+
+    os.environ.setdefault('BOT_TOKEN', '123456:LOAD-TEST-TOKEN')
+    os.environ['BOT_API_BASE_URL'] = api.base_url
+    os.environ['BOT_MODE'] = 'polling'
+    db_dir = tempfile.mkdtemp(prefix='bot-load-')
+    os.environ['DATABASE_PATH'] = args.database or os.path.join(db_dir, 'load_test.db')
+    os.environ['STORAGE_BACKEND'] = args.storage
+
+    # Imported late so Config picks up the environment above
+    import aiosqlite
+    from bot.main import CustomizableBot
+
+    db_writes = 0
+    original_commit = aiosqlite.Connection.commit
+
+    async def counting_commit(self):
+        nonlocal db_writes
+        db_writes += 1
+        return await original_commit(self)
+
+    aiosqlite.Connection.commit = counting_commit
+
+    bot = CustomizableBot()
+    await bot.initialize()
+
+    latencies = []
+    original_process_update = bot.application.process_update
+
+    async def timed_process_update(update):
+        start = time.perf_counter()
+        try:
+            await original_process_update(update)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    bot.application.process_update = timed_process_update
+
+    runner = asyncio.create_task(bot.run())
+    while not (bot.application.running and bot.application.updater.running):
+        if runner.done():
+            await api.stop()
+            runner.result()  # re-raises why the bot failed to start
+            raise RuntimeError("Bot stopped before it started polling")
+        await asyncio.sleep(0.05)
+
+    updates = list(build_updates(args.chats, args.users, args.messages, args.command_ratio, args.seed))
+    writes_before = db_writes
+
+    started = time.perf_counter()
+    for update in updates:
+        api.enqueue_update(update)
+
+    deadline = started + args.timeout
+    while len(latencies) < len(updates) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+
+    bot.stop()
+    await runner
+    await api.stop()
+    aiosqlite.Connection.commit = original_commit
+
+    processed = len(latencies)
+    commands = {update['message']['message_id'] for update in updates if 'entities' in update['message']}
+    replied = {message['reply_to'] for message in api.sent_messages if message['method'].startswith('send')}
+    return {
+        'updates_sent': len(updates),
+        'updates_processed': processed,
+        'commands_sent': len(commands),
+        'commands_unanswered': len(commands - replied),
+        'elapsed_seconds': round(elapsed, 3),
+        'updates_per_second': round(processed / elapsed, 1) if elapsed else 0.0,
+        'latency_p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'latency_p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'latency_max_ms': round(max(latencies, default=0) * 1000, 2),
+        'db_writes': db_writes - writes_before,
+        'db_writes_per_update': round((db_writes - writes_before) / processed, 2) if processed else 0.0,
+        'api_calls': dict(sorted(api.calls.items()))
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the bot against a fake Bot API server")
+    parser.add_argument('--chats', type=int, default=20, help="Number of simulated chats")
+    parser.add_argument('--users', type=int, default=10, help="Users per chat")
+    parser.add_argument('--messages', type=int, default=5, help="Messages per user")
+    parser.add_argument('--command-ratio', type=float, default=0.1, help="Fraction of messages that are commands")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--port', type=int, default=8081, help="Port for the fake Bot API")
+    parser.add_argument('--database', help="Database file (default: fresh temp file)")
+    parser.add_argument('--storage', choices=['sqlite', 'memory'], default='sqlite',
+                        help="Storage backend; 'memory' takes disk I/O out of the measurement")
+    parser.add_argument('--timeout', type=float, default=600, help="Give up after this many seconds")
+    parser.add_argument('--json', help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load_test(args))
+
+    print("📈 Load test results")
+    for key, value in report.items():
+        print(f"  {key}: {value}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if report['updates_processed'] < report['updates_sent']:
+        raise SystemExit("❌ Not all updates were processed before the timeout")
+    if report['commands_unanswered']:
+        raise SystemExit(f"❌ {report['commands_unanswered']} commands got no reply")
+
+if __name__ == "__main__":
+    main()
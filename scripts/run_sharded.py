@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Run the bot as one front process plus SHARD_WORKERS worker processes
+
+Updates are routed to workers by chat_id, so every chat is always handled by
+the same process. Dead or unresponsive workers are restarted automatically.
+"""
+
+import argparse
+import asyncio
+import logging
+from bot.sharding import ShardedRuntime
+from config import Config
+
+def main():
+    logging.basicConfig(
+        format='%(asctime)s - front - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    parser = argparse.ArgumentParser(description="Run the bot sharded across worker processes")
+    parser.add_argument('--workers', type=int, default=Config.SHARD_WORKERS, help="Number of worker processes")
+    args = parser.parse_args()
+
+    runtime = ShardedRuntime(
+        args.workers,
+        heartbeat_timeout=Config.SHARD_HEARTBEAT_TIMEOUT,
+        health_interval=Config.SHARD_HEALTH_INTERVAL
+    )
+    print(f"🚀 Starting Telegram Bot with {args.workers} workers...")
+    asyncio.run(runtime.run())
+
+if __name__ == "__main__":
+    main()
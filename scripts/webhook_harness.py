@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Local test harness for webhook mode: POSTs synthetic updates to a running bot
+
+Start the bot with BOT_MODE=webhook, then e.g.:
+    python scripts/webhook_harness.py --count 1000 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+import httpx
+from config import Config
+
+_update_ids = itertools.count(1)
+
+def make_update(chat_id: int, user_id: int, text: str) -> dict:
+    """Build a minimal Telegram message update"""
+    update_id = next(_update_ids)
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'supergroup', 'title': f'Load Chat {chat_id}'},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}', 'username': f'user{user_id}'},
+            'text': text
+        }
+    }
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def post_update(client: httpx.AsyncClient, url: str, secret: str, update: dict):
+    headers = {'X-Telegram-Bot-Api-Secret-Token': secret} if secret else {}
+    start = time.perf_counter()
+    response = await client.post(url, json=update, headers=headers)
+    return response.status_code, time.perf_counter() - start
+
+async def run_harness(args):
+    url = args.url or f"http://127.0.0.1:{Config.WEBHOOK_PORT}/{Config.WEBHOOK_PATH.lstrip('/')}"
+    secret = args.secret if args.secret is not None else Config.WEBHOOK_SECRET
+
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=args.concurrency)) as client:
+        # The server must reject a wrong secret before we measure anything
+        if secret:
+            status, _ = await post_update(client, url, secret + "-wrong", make_update(-1, 1, "secret check"))
+            print(f"🔐 Wrong secret -> HTTP {status} ({'ok' if status == 403 else 'UNEXPECTED'})")
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        statuses = {}
+        latencies = []
+
+        async def send(idx: int):
+            chat_id = -1000000000000 - (idx % args.chats)
+            user_id = 1000 + (idx % args.users)
+            text = "/rank" if idx % 10 == 0 else f"synthetic message {idx}"
+            async with semaphore:
+                status, latency = await post_update(client, url, secret, make_update(chat_id, user_id, text))
+            statuses[status] = statuses.get(status, 0) + 1
+            latencies.append(latency)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(idx) for idx in range(args.count)))
+        elapsed = time.perf_counter() - started
+
+    print(f"📨 Sent {args.count} updates to {url} in {elapsed:.2f}s ({args.count / elapsed:.1f} updates/s)")
+    print(f"📊 Status codes: {statuses}")
+    print(f"⏱️ Latency p50 {percentile(latencies, 50) * 1000:.1f}ms, p99 {percentile(latencies, 99) * 1000:.1f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="POST synthetic updates to the bot's webhook")
+    parser.add_argument('--url', help="Webhook URL (default: built from Config)")
+    parser.add_argument('--secret', help="Secret token (default: Config.WEBHOOK_SECRET)")
+    parser.add_argument('--count', type=int, default=100, help="Number of updates to send")
+    parser.add_argument('--concurrency', type=int, default=10, help="Concurrent requests")
+    parser.add_argument('--chats', type=int, default=5, help="Number of synthetic chats")
+    parser.add_argument('--users', type=int, default=20, help="Number of synthetic users")
+    asyncio.run(run_harness(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+from bot.content_packs import ContentLibrary, ShuffleBag
+
+
+def test_shuffle_bag_draws_each_index_once_per_round():
+    bag = ShuffleBag(7)
+    for _ in range(3):
+        assert sorted(bag.next() for _ in range(7)) == list(range(7))
+
+
+def test_relative_content_dir_does_not_depend_on_working_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    library = ContentLibrary()
+    assert library.load('content') > 0
+    assert library.draw(1, 'truths', 'xx') is not None  # unknown language falls back to 'en'
+
+
+def test_missing_content_dir_loads_nothing():
+    library = ContentLibrary()
+    assert library.load('no-such-content-dir') == 0
+    assert library.draw(1, 'words', 'en') is None
@@ -0,0 +1,13 @@
+import pytest
+
+from bot.handlers.command_handlers import is_greeting
+
+
+@pytest.mark.parametrize('text', ['hi', 'Hi everyone!', 'hey, what is up', 'Hello there', 'good morning all'])
+def test_greetings_match(text):
+    assert is_greeting(text)
+
+
+@pytest.mark.parametrize('text', ['this is fine', 'which one?', 'I think so', 'they left', 'shelloworld', 'good night'])
+def test_words_containing_greetings_do_not_match(text):
+    assert not is_greeting(text)
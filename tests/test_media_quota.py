@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from bot.database import BotDatabase
+from bot.memory_storage import MemoryStorage
+from bot.storage import QUOTA_MEDIA
+
+
+def _items(count, prefix='f'):
+    return [
+        {'media_type': 'sticker', 'file_id': f'{prefix}{i}', 'file_unique_id': f'{prefix}u{i}'}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture(params=['sqlite', 'memory'])
+def storage(request, tmp_path):
+    db = BotDatabase(str(tmp_path / 'bot.db')) if request.param == 'sqlite' else MemoryStorage()
+    asyncio.run(db.initialize())
+    return db
+
+
+def test_bulk_import_stops_at_remaining_quota(storage):
+    async def scenario():
+        await storage.add_media(1, 'sticker', 'single', file_unique_id='single-u', limit=5)
+        counts = await storage.add_media_bulk(1, _items(10), limit=5)
+        assert counts == {'added': 4, 'merged': 0, 'over_quota': 6}
+        assert await storage.get_quota_usage(QUOTA_MEDIA, 1) == 5
+
+        # Full quota: new items are refused, known ones still merge their tags
+        counts = await storage.add_media_bulk(1, _items(2) + _items(3, prefix='g'), limit=5)
+        assert counts == {'added': 0, 'merged': 2, 'over_quota': 3}
+        assert await storage.get_quota_usage(QUOTA_MEDIA, 1) == 5
+
+    asyncio.run(scenario())
+
+
+def test_bulk_import_without_limit_counts_towards_quota(storage):
+    async def scenario():
+        counts = await storage.add_media_bulk(1, _items(1200))
+        assert counts == {'added': 1200, 'merged': 0, 'over_quota': 0}
+        assert await storage.get_quota_usage(QUOTA_MEDIA, 1) == 1200
+
+    asyncio.run(scenario())
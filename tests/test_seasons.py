@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+
+from bot.database import BotDatabase
+from bot.memory_storage import MemoryStorage
+
+
+@pytest.fixture(params=['sqlite', 'memory'])
+def storage(request, tmp_path):
+    db = BotDatabase(str(tmp_path / 'bot.db')) if request.param == 'sqlite' else MemoryStorage()
+    asyncio.run(db.initialize())
+    return db
+
+
+def test_season_archive_breaks_ties_like_the_leaderboard(storage):
+    async def scenario():
+        for user_id in (4, 24, 9):
+            rank = await storage.get_user_rank(user_id, -1)
+            rank.update(level=3, xp=10, messages_count=2)
+            await storage.save_user_rank(user_id, -1, rank)
+        leaderboard = [row['user_id'] for row in await storage.get_leaderboard(-1)]
+
+        assert await storage.run_season_reset(-1) == 3
+        history = await storage.get_season_history(-1, 1)
+        assert [row['user_id'] for row in history] == leaderboard
+        assert [row['final_position'] for row in history] == [1, 2, 3]
+
+    asyncio.run(scenario())
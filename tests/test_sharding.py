@@ -0,0 +1,54 @@
+import logging
+import time
+
+from bot.sharding import ShardedRuntime, shard_for
+
+
+class DeadProcess:
+    exitcode = 1
+
+    def is_alive(self):
+        return False
+
+    def join(self, timeout=None):
+        pass
+
+
+def test_updates_route_by_chat():
+    update = {'update_id': 1, 'message': {'chat': {'id': -1005}}}
+    assert shard_for(update, 4) == 1005 % 4
+
+
+def test_restarted_worker_gets_a_fresh_queue_and_the_loss_is_logged(caplog):
+    runtime = ShardedRuntime(workers=1)
+    started = []
+    runtime._start_worker = started.append
+    runtime._processes = [DeadProcess()]
+    old_queue = runtime._queues[0]
+    old_queue.put({'update_id': 1})
+    old_queue.put({'update_id': 2})
+
+    with caplog.at_level(logging.WARNING, logger='bot.sharding'):
+        runtime._check_workers()
+
+    assert started == [0]
+    assert runtime.restarts == [1]
+    assert runtime._queues[0] is not old_queue
+    assert runtime._queues[0].empty()
+    assert "Dropped 2 queued updates of worker 0" in caplog.text
+
+
+def test_live_worker_with_fresh_heartbeat_is_left_alone():
+    runtime = ShardedRuntime(workers=1, heartbeat_timeout=30)
+    started = []
+    runtime._start_worker = started.append
+
+    class LiveProcess(DeadProcess):
+        def is_alive(self):
+            return True
+
+    runtime._processes = [LiveProcess()]
+    runtime._heartbeats[0].value = time.time()
+    runtime._check_workers()
+    assert started == []
+    assert runtime.restarts == [0]